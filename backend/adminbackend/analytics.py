@@ -0,0 +1,111 @@
+# analytics.py
+import datetime
+from collections import Counter
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from database.analytics import (
+    GRANULARITIES, LATENCY_BUCKETS_MS, MESSAGES, USERS, CHANNEL, ANSWERS, CACHE_HITS, ESCALATIONS, LATENCY,
+    bucket_start,
+)
+from database.database import BotAnalyticsCounter
+
+# Window returned when the caller does not give one
+DEFAULT_WINDOW = {"hour": datetime.timedelta(hours=48), "day": datetime.timedelta(days=30)}
+
+
+def _percentile(histogram: Counter, fraction: float):
+    """Upper bound (ms) of the latency bucket holding the given fraction of answers."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for bound in [str(b) for b in LATENCY_BUCKETS_MS] + ["inf"]:
+        seen += histogram.get(bound, 0)
+        if seen >= rank:
+            # Slower than the largest bound; report that bound rather than infinity
+            return LATENCY_BUCKETS_MS[-1] if bound == "inf" else int(bound)
+    return None
+
+
+def _naive_utc(value: datetime.datetime):
+    # Counters are bucketed on naive UTC timestamps
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _rate(part: int, whole: int):
+    return round(part / whole, 4) if whole else None
+
+
+def _summarize(values: Counter, channels: Counter, latency: Counter) -> dict:
+    return {
+        "messages": values[MESSAGES],
+        "answers": values[ANSWERS],
+        "channels": dict(channels),
+        "cache_hit_rate": _rate(values[CACHE_HITS], values[ANSWERS]),
+        "escalations": values[ESCALATIONS],
+        "escalation_rate": _rate(values[ESCALATIONS], values[ANSWERS]),
+        "latency_p50_ms": _percentile(latency, 0.5),
+        "latency_p95_ms": _percentile(latency, 0.95),
+    }
+
+
+def get_bot_analytics(
+    db: Session,
+    bot_id: int,
+    granularity: str = "day",
+    since: datetime.datetime = None,
+    until: datetime.datetime = None,
+) -> dict:
+    """
+    Dashboard aggregates for one bot: a series of hourly or daily buckets plus
+    totals over the window. Reads a single primary-key range of bot_analytics_counters.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    until = _naive_utc(until) or datetime.datetime.utcnow()
+    since = bucket_start(_naive_utc(since) or until - DEFAULT_WINDOW[granularity], granularity)
+
+    rows = (
+        db.query(BotAnalyticsCounter)
+        .filter(
+            BotAnalyticsCounter.bot_id == bot_id,
+            BotAnalyticsCounter.granularity == granularity,
+            BotAnalyticsCounter.bucket_start >= since,
+            BotAnalyticsCounter.bucket_start <= until,
+        )
+        .all()
+    )
+
+    buckets = {}
+    totals, total_channels, total_latency = Counter(), Counter(), Counter()
+    for row in rows:
+        values, channels, latency = buckets.setdefault(row.bucket_start, (Counter(), Counter(), Counter()))
+        if row.metric == CHANNEL:
+            channels[row.dimension] += row.value
+            total_channels[row.dimension] += row.value
+        elif row.metric == LATENCY:
+            latency[row.dimension] += row.value
+            total_latency[row.dimension] += row.value
+        else:
+            values[row.metric] += row.value
+            totals[row.metric] += row.value
+
+    series = []
+    for start in sorted(buckets):
+        values, channels, latency = buckets[start]
+        series.append({"bucket_start": start, "users": values[USERS], **_summarize(values, channels, latency)})
+
+    return {
+        "bot_id": bot_id,
+        "granularity": granularity,
+        "since": since,
+        "until": until,
+        # Unique users are only known per bucket, so the totals leave them out
+        "totals": _summarize(totals, total_channels, total_latency),
+        "series": series,
+    }
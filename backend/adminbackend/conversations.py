@@ -0,0 +1,73 @@
+# conversations.py
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, aliased
+from database.database import Conversation
+from database.archive import archived_partitions, read_archived_turns, transient_conversation
+from adminbackend.pagination import Page, decode_cursor, paginate, paginate_list, DEFAULT_PAGE_SIZE
+
+
+def get_conversation_turns(
+    db: Session,
+    user_id: int = None,
+    bot_id: int = None,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    archive_root: str = None,
+):
+    """
+    Returns a page of (question, answer) row pairs, newest first. The answer is joined
+    on the turn_id written with the question, so no regrouping happens in Python.
+    Turns moved to the archive are read through, so old history stays listed.
+    """
+    question = aliased(Conversation)
+    answer = aliased(Conversation)
+    query = (
+        db.query(question, answer)
+        .outerjoin(answer, and_(answer.turn_id == question.turn_id, answer.source == "bot"))
+        .filter(question.source == "user")
+    )
+    if user_id:
+        query = query.filter(question.user_id == user_id)
+    if bot_id:
+        query = query.filter(question.bot_id == bot_id)
+    columns = [question.created_at, question.id]
+    key = lambda row: [row[0].created_at, row[0].id]
+    page = paginate(query, columns, cursor, limit, key=key)
+    if not (user_id or bot_id):
+        return page
+    partitions = archived_partitions(bot_id, user_id, root=archive_root)
+    if not partitions:
+        return page
+    if page.next_cursor and partitions[-1][0] < page.items[-1][0].created_at.date():
+        # A full page of hot turns, all newer than anything archived
+        return page
+
+    # Bots have different horizons, so archived turns can be newer than hot ones: merge the two
+    before = decode_cursor(cursor, columns) if cursor else None
+    hot_ids = {row[0].id for row in page.items}
+    archived = [
+        (transient_conversation(q), transient_conversation(a) if a else None)
+        for q, a in read_archived_turns(limit + 1, before, bot_id, user_id, root=archive_root)
+        if q["id"] not in hot_ids
+    ]
+    merged = paginate_list(list(page.items) + archived, columns, key, cursor, limit)
+    if merged.next_cursor is None and page.next_cursor:
+        # The page is all hot rows and more hot rows follow
+        return Page(merged.items, page.next_cursor)
+    return merged
+
+
+def turn_to_response(question: Conversation, answer: Conversation = None) -> dict:
+    """Shape a (question, answer) pair the way the conversation list endpoints return it."""
+    return {
+        "id": question.id,
+        "user_id": question.user_id,
+        "interaction": {
+            "question": question.interaction.get("content", ""),
+            "answer": answer.interaction.get("content", "") if answer else "",
+            "channel": question.channel or "web",
+        },
+        "resolved": question.resolved,
+        "created_at": question.created_at,
+        "updated_at": question.updated_at,
+    }
@@ -0,0 +1,195 @@
+# export.py
+import csv
+import datetime
+import io
+import itertools
+import json
+import os
+import zlib
+from types import SimpleNamespace
+from typing import Callable, Iterable, Iterator, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.database import Conversation, Ticket
+from database.sessions import session_local
+from database.archive import read_archive
+
+load_dotenv()
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CONVERSATION_FIELDS = ["id", "turn_id", "user_id", "bot_id", "channel", "source", "content", "resolved", "created_at"]
+TICKET_FIELDS = ["id", "user_id", "bot_id", "topic", "description", "status", "created_at", "updated_at"]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _conversation_record(row) -> dict:
+    interaction = row.interaction or {}
+    # Legacy single-row turns kept question and answer in one interaction
+    content = interaction.get("content")
+    if content is None and ("question" in interaction or "answer" in interaction):
+        content = json.dumps({"question": interaction.get("question"), "answer": interaction.get("answer")})
+    return {
+        "id": row.id,
+        "turn_id": row.turn_id,
+        "user_id": row.user_id,
+        "bot_id": row.bot_id,
+        "channel": row.channel,
+        "source": row.source,
+        "content": content,
+        "resolved": row.resolved,
+        "created_at": row.created_at,
+    }
+
+
+def _ticket_record(row) -> dict:
+    return {field: getattr(row, field) for field in TICKET_FIELDS}
+
+
+def _stream_rows(statement, to_record: Callable, session_factory: Callable[[], Session]) -> Iterator[dict]:
+    """
+    Yield records from a server-side cursor, EXPORT_BATCH_SIZE rows at a time.
+    Opens its own session because the response outlives the request's dependencies.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for row in result:
+            yield to_record(row)
+    finally:
+        db.close()
+
+
+def conversation_records(
+    bot_id: int,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    channel: Optional[str] = None,
+    session_factory: Callable[[], Session] = session_local,
+    archive_root: Optional[str] = None,
+) -> Iterator[dict]:
+    """Archived rows in the range (older) followed by rows still in the hot table."""
+    archived = read_archive(since, until, bot_id=bot_id, channel=channel, root=archive_root)
+    statement = select(
+        Conversation.id, Conversation.turn_id, Conversation.user_id, Conversation.bot_id, Conversation.channel,
+        Conversation.source, Conversation.interaction, Conversation.resolved, Conversation.created_at,
+    ).where(Conversation.bot_id == bot_id)
+    if since:
+        statement = statement.where(Conversation.created_at >= since)
+    if until:
+        statement = statement.where(Conversation.created_at < until)
+    if channel:
+        statement = statement.where(Conversation.channel == channel)
+    statement = statement.order_by(Conversation.created_at, Conversation.id)
+    return itertools.chain(
+        (_conversation_record(SimpleNamespace(**record)) for record in archived),
+        _stream_rows(statement, _conversation_record, session_factory),
+    )
+
+
+def ticket_records(
+    bot_id: int,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    session_factory: Callable[[], Session] = session_local,
+) -> Iterator[dict]:
+    statement = select(*[getattr(Ticket, field) for field in TICKET_FIELDS]).where(Ticket.bot_id == bot_id)
+    if since:
+        statement = statement.where(Ticket.created_at >= since)
+    if until:
+        statement = statement.where(Ticket.created_at < until)
+    statement = statement.order_by(Ticket.created_at, Ticket.id)
+    return _stream_rows(statement, _ticket_record, session_factory)
+
+
+def to_ndjson(records: Iterable[dict]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, default=_json_default) + "\n"
+
+
+def to_csv(records: Iterable[dict], fields: list) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow({
+            key: value.isoformat() if isinstance(value, datetime.datetime) else value
+            for key, value in record.items()
+        })
+        # Hand out what has been written so far and reuse the buffer
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def encode(records: Iterable[dict], export_format: str, fields: list) -> Iterator[str]:
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if export_format == "csv":
+        return to_csv(records, fields)
+    return to_ndjson(records)
+
+
+def buffered(chunks: Iterable[str], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Coalesce small text chunks into roughly chunk_size byte writes."""
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= chunk_size:
+            yield b"".join(pending)
+            pending, pending_size = [], 0
+    if pending:
+        yield b"".join(pending)
+
+
+def gzip_stream(chunks: Iterable[str], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Gzip a text stream incrementally, emitting roughly chunk_size bytes at a time."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size >= chunk_size:
+            yield b"".join(pending)
+            pending, pending_size = [], 0
+    pending.append(compressor.flush())
+    yield b"".join(pending)
+
+
+def export_filename(kind: str, bot_id: int, export_format: str) -> str:
+    stamp = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    return f"bot{bot_id}-{kind}-{stamp}.{export_format}"
+
+
+def streaming_export(request: Request, records: Iterable[dict], export_format: str, fields: list, filename: str):
+    """Stream records in the requested format, gzipped when the client accepts it."""
+    body = encode(records, export_format, fields)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        stream = gzip_stream(body)
+    else:
+        stream = buffered(body)
+    return StreamingResponse(stream, media_type=EXPORT_FORMATS[export_format], headers=headers)
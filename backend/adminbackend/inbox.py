@@ -1,60 +1,161 @@
 # inbox.py
+import datetime
+import os
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import Integer, cast, func, or_
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from database.sessions import get_db
-from database.database import Conversation, User
+from database.database import Conversation, ConversationRollup, User
+from database.archive import archived_days, read_archive, transient_conversation
+from adminbackend.pagination import paginate, paginate_list, DEFAULT_PAGE_SIZE
+
+load_dotenv()
+
+# Timezone whose midnight starts an inbox day, unless the caller passes one
+INBOX_TIMEZONE = os.getenv("INBOX_TIMEZONE", "UTC")
+
+# Zones whose days are the UTC days the rollups are keyed by
+_UTC_ZONES = {"UTC", "Etc/UTC", "Etc/UCT", "UCT", "Etc/Universal", "Universal", "Etc/Zulu", "Zulu", "GMT", "Etc/GMT"}
 
 
-def get_inbox_dates(db: Session, bot_id: int = None):
+def _zone(tz: str = None) -> ZoneInfo:
+    name = tz or INBOX_TIMEZONE
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {name}")
+
+
+def day_bounds(date: datetime.date, tz: str = None):
     """
-    Returns all distinct dates where interactions happened.
+    [start, end) of a calendar day in `tz`, as naive UTC datetimes matching how
+    created_at is stored. Computed per boundary so DST days come out 23 or 25 hours long.
     """
-    query = db.query(func.date(Conversation.created_at).label("date"))
+    zone = _zone(tz)
+
+    def utc_midnight(day):
+        local = datetime.datetime.combine(day, datetime.time.min, tzinfo=zone)
+        return local.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    return utc_midnight(date), utc_midnight(date + datetime.timedelta(days=1))
+
+
+# All real UTC offsets are whole quarter hours, so a quarter-hour bucket never
+# straddles a local midnight
+_BUCKET_SECONDS = 900
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _bucket(db: Session):
+    """Quarter-hour number (seconds since the epoch // 900) of Conversation.created_at."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.floor(func.extract("epoch", Conversation.created_at) / _BUCKET_SECONDS)
+    return cast(func.strftime("%s", Conversation.created_at), Integer) / _BUCKET_SECONDS
+
+
+def _local_day(created_at: datetime.datetime, zone: ZoneInfo) -> datetime.date:
+    return created_at.replace(tzinfo=datetime.timezone.utc).astimezone(zone).date()
+
+
+def get_inbox_dates(db: Session, bot_id: int = None, tz: str = None):
+    """
+    Returns all distinct dates (days in `tz`) where interactions happened, newest first.
+    """
+    zone = _zone(tz)
+    query = db.query(ConversationRollup.day).filter(ConversationRollup.message_count > 0)
     if bot_id:
-        query = query.filter(Conversation.bot_id == bot_id)
-    dates = (
-        query
-        .distinct()
-        .order_by(func.date(Conversation.created_at).desc())
-        .all()
-    )
-    return [d.date for d in dates]
+        query = query.filter(ConversationRollup.bot_id == bot_id)
+    days = [d.day for d in query.distinct().order_by(ConversationRollup.day.desc()).all()]
+    if zone.key in _UTC_ZONES or not days:
+        return days
 
-def get_users_by_date(db: Session, date, bot_id: int = None):
+    # Rollup days are UTC days, so bucket the hot rows they span by quarter hour in
+    # one query and map each bucket to its local day in Python
+    start = datetime.datetime.combine(days[-1], datetime.time.min)
+    end = datetime.datetime.combine(days[0] + datetime.timedelta(days=1), datetime.time.min)
+    bucket = _bucket(db)
+    buckets = db.query(bucket).filter(Conversation.created_at >= start, Conversation.created_at < end)
+    if bot_id:
+        buckets = buckets.filter(Conversation.bot_id == bot_id)
+    local_days = {
+        _local_day(_EPOCH + datetime.timedelta(seconds=int(b) * _BUCKET_SECONDS), zone)
+        for (b,) in buckets.distinct().all()
+    }
+
+    archived = sorted(set(archived_days(start, end)) & set(days))
+    if archived:
+        since = datetime.datetime.combine(archived[0], datetime.time.min)
+        until = datetime.datetime.combine(archived[-1] + datetime.timedelta(days=1), datetime.time.min)
+        local_days.update(_local_day(r["created_at"], zone) for r in read_archive(since, until, bot_id=bot_id))
+    return sorted(local_days, reverse=True)
+
+def get_channels(db: Session, bot_id: int = None):
     """
-    Returns all unique users who interacted with the bot on a given date.
+    Returns the channel names that have seen messages, read from the daily rollups.
     """
-    query = (
-        db.query(User)
-        .join(Conversation, Conversation.user_id == User.id)
-        .filter(func.date(Conversation.created_at) == date)
-    )
+    query = db.query(ConversationRollup.channel).filter(ConversationRollup.message_count > 0)
     if bot_id:
-        query = query.filter(Conversation.bot_id == bot_id)
-    users = (
-        query
-        .group_by(User.id)
-        .all()
+        query = query.filter(ConversationRollup.bot_id == bot_id)
+    channels = query.distinct().order_by(ConversationRollup.channel).all()
+    return [c.channel for c in channels]
+
+def get_users_by_date(
+    db: Session, date, bot_id: int = None, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, tz: str = None
+):
+    """
+    Returns a page of unique users who interacted with the bot on a given date,
+    including users whose conversations that day have been archived.
+    """
+    start, end = day_bounds(date, tz)
+    user_ids = db.query(Conversation.user_id).filter(
+        Conversation.created_at >= start,
+        Conversation.created_at < end,
     )
-    return users
+    if bot_id:
+        user_ids = user_ids.filter(Conversation.bot_id == bot_id)
+    in_day = User.id.in_(user_ids.distinct())
+    if archived_days(start, end):
+        archived_ids = {r["user_id"] for r in read_archive(start, end, bot_id=bot_id)}
+        in_day = or_(in_day, User.id.in_(archived_ids))
+    query = db.query(User).filter(in_day)
+    return paginate(query, [User.id], cursor, limit, descending=False)
 
-def get_user_conversation_by_date(db: Session, user_id: int, date, bot_id: int = None):
+def get_user_conversation_by_date(
+    db: Session,
+    user_id: int,
+    date,
+    bot_id: int = None,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    tz: str = None,
+):
     """
-    Returns all conversations of a given user on a given date.
+    Returns a page of a given user's conversations on a given date, oldest first,
+    reading through to the archive when that day has been archived.
     """
+    start, end = day_bounds(date, tz)
     query = (
         db.query(Conversation)
         .filter(
             Conversation.user_id == user_id,
-            func.date(Conversation.created_at) == date
+            Conversation.created_at >= start,
+            Conversation.created_at < end,
         )
     )
     if bot_id:
         query = query.filter(Conversation.bot_id == bot_id)
-    conversations = (
-        query
-        .order_by(Conversation.created_at.asc())
-        .all()
+    columns = [Conversation.created_at, Conversation.id]
+    if not archived_days(start, end):
+        return paginate(query, columns, cursor, limit, descending=False)
+
+    # One user's day is small, so merge hot and archived rows in memory
+    rows = {convo.id: convo for convo in query.all()}
+    for record in read_archive(start, end, bot_id=bot_id, user_id=user_id):
+        rows.setdefault(record["id"], transient_conversation(record))
+    return paginate_list(
+        list(rows.values()), columns, key=lambda c: [c.created_at, c.id], cursor=cursor, limit=limit, descending=False
     )
-    return conversations
 
@@ -0,0 +1,109 @@
+# pagination.py
+import base64
+import datetime
+import json
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: list) -> str:
+    raw = [v.isoformat() if isinstance(v, (datetime.datetime, datetime.date)) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise ValueError("cursor does not match the sort key")
+        values = []
+        for value, column in zip(raw, columns):
+            python_type = column.type.python_type
+            if python_type is datetime.datetime:
+                value = datetime.datetime.fromisoformat(value)
+            elif python_type is datetime.date:
+                value = datetime.date.fromisoformat(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(columns: list, values: list, descending: bool):
+    """Lexicographic "comes after (columns) = (values)" predicate for the given sort direction."""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def paginate(
+    query,
+    columns: list,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = True,
+    key: Optional[Callable[[Any], list]] = None,
+) -> Page:
+    """
+    Keyset pagination over `columns` (e.g. [created_at, id]). The last column must be
+    unique so the ordering is total. `key` extracts the sort values from a result row
+    and defaults to reading the column names off the row.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns), descending))
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = key(last) if key else [getattr(last, c.key) for c in columns]
+        next_cursor = encode_cursor(values)
+    return Page(rows, next_cursor)
+
+
+def set_next_cursor(response: Response, page: Page):
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+
+
+def paginate_list(
+    items: list,
+    columns: list,
+    key: Callable[[Any], list],
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = True,
+) -> Page:
+    """Keyset pagination over rows already in memory (e.g. hot rows merged with archived ones)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    items = sorted(items, key=key, reverse=descending)
+    if cursor:
+        after = decode_cursor(cursor, columns)
+        items = [item for item in items if (key(item) < after if descending else key(item) > after)]
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(key(items[-1]))
+    return Page(items, next_cursor)
@@ -0,0 +1,115 @@
+# search.py
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import Float, Integer, String, bindparam, column, func, literal_column, table as sql_table
+from sqlalchemy.orm import Session
+
+from database.database import Conversation, Ticket
+from database.search import SEARCH_CONFIG, SEARCHABLE, fts_table
+from adminbackend.pagination import paginate, DEFAULT_PAGE_SIZE
+
+SEARCH_TYPES = ("conversations", "tickets")
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts5_query(q: str) -> str:
+    """Quote each word so user input is never parsed as FTS5 query syntax; words are ANDed."""
+    words = _WORD.findall(q)
+    if not words:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+    return " ".join(f'"{word}"' for word in words)
+
+
+def _ranked(db: Session, model, q: str):
+    """
+    Query of (row, score, snippet) matching `q`, with score higher-is-better on
+    both backends so keyset pagination can page on (score desc, id desc).
+    """
+    table = model.__tablename__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        vector = literal_column(f"{table}.search_vector")
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, bindparam("search_q", q))
+        score = func.ts_rank_cd(vector, tsquery, type_=Float)
+        document = literal_column(SEARCHABLE[table]["postgresql"])
+        snippet = func.ts_headline(SEARCH_CONFIG, document, tsquery, "MaxFragments=1, MaxWords=20", type_=String)
+        return db.query(model, score.label("score"), snippet.label("snippet")).filter(vector.op("@@")(tsquery)), score
+    if dialect == "sqlite":
+        fts = sql_table(fts_table(table), column("rowid", Integer))
+        # FTS5 auxiliary functions and MATCH take the table itself as their argument
+        fts_ref = literal_column(fts_table(table))
+        score = -func.bm25(fts_ref, type_=Float)
+        snippet = func.snippet(fts_ref, 0, "[", "]", "…", 12, type_=String)
+        query = (
+            db.query(model, score.label("score"), snippet.label("snippet"))
+            .join(fts, fts.c.rowid == model.id)
+            .filter(fts_ref.op("MATCH")(bindparam("search_q", _fts5_query(q))))
+        )
+        return query, score
+    raise HTTPException(status_code=501, detail=f"Full-text search is not available on {dialect}")
+
+
+def _conversation_hit(row) -> dict:
+    convo = row[0]
+    interaction = convo.interaction or {}
+    return {
+        "id": convo.id,
+        "user_id": convo.user_id,
+        "bot_id": convo.bot_id,
+        "channel": convo.channel,
+        "source": convo.source,
+        "turn_id": convo.turn_id,
+        "content": interaction.get("content") or interaction.get("question") or "",
+        "created_at": convo.created_at,
+        "score": row.score,
+        "snippet": row.snippet,
+    }
+
+
+def _ticket_hit(row) -> dict:
+    ticket = row[0]
+    return {
+        "id": ticket.id,
+        "user_id": ticket.user_id,
+        "bot_id": ticket.bot_id,
+        "topic": ticket.topic,
+        "description": ticket.description,
+        "status": ticket.status,
+        "created_at": ticket.created_at,
+        "score": row.score,
+        "snippet": row.snippet,
+    }
+
+
+def search(
+    db: Session,
+    q: str,
+    search_type: str = "conversations",
+    bot_id: int = None,
+    since=None,
+    until=None,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    Ranked full-text search over conversation content or ticket topic/description,
+    best matches first. `since`/`until` bound created_at as a half-open UTC range.
+    """
+    if search_type not in SEARCH_TYPES:
+        raise HTTPException(status_code=400, detail=f"type must be one of {', '.join(SEARCH_TYPES)}")
+    if not q or not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+
+    model, to_hit = (Conversation, _conversation_hit) if search_type == "conversations" else (Ticket, _ticket_hit)
+    query, score = _ranked(db, model, q)
+    if bot_id:
+        query = query.filter(model.bot_id == bot_id)
+    if since:
+        query = query.filter(model.created_at >= since)
+    if until:
+        query = query.filter(model.created_at < until)
+
+    page = paginate(query, [score, model.id], cursor, limit, key=lambda row: [row.score, row[0].id])
+    return page._replace(items=[to_hit(row) for row in page.items])
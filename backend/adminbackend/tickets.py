@@ -1,12 +1,29 @@
 from sqlalchemy.orm import Session
-from database.database import Ticket, User
+from database.database import Conversation, Ticket, User
+from database.rollups import record_escalation
+from database.analytics import analytics_recorder
+from adminbackend.pagination import paginate, DEFAULT_PAGE_SIZE
 import schemas
 
-def create_ticket(db: Session, ticket: schemas.TicketCreate, user_id: int, bot_id: int = None):
+def _latest_channel(db: Session, user_id: int, bot_id: int = None):
+    """Channel of the user's most recent turn with the bot, which is what a ticket escalates."""
+    return (
+        db.query(Conversation.channel)
+        .filter(Conversation.user_id == user_id, Conversation.bot_id == bot_id)
+        .order_by(Conversation.created_at.desc(), Conversation.id.desc())
+        .limit(1)
+        .scalar()
+    )
+
+def create_ticket(db: Session, ticket: schemas.TicketCreate, user_id: int, bot_id: int = None, channel: str = None):
+    if channel is None:
+        channel = _latest_channel(db, user_id, bot_id)
     db_ticket = Ticket(**ticket.dict(), user_id=user_id, bot_id=bot_id)
     db.add(db_ticket)
+    record_escalation(db, bot_id, channel)
     db.commit()
     db.refresh(db_ticket)
+    analytics_recorder.record_escalation(bot_id)
     return db_ticket
 
 def get_user_tickets(db: Session, user_id: int):
@@ -18,6 +35,14 @@ def get_all_tickets(db: Session):
 def get_bot_tickets(db: Session, bot_id: int):
     return db.query(Ticket).filter(Ticket.bot_id == bot_id).all()
 
+def get_all_tickets_page(db: Session, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Newest tickets first, keyset-paginated on (created_at, id)."""
+    return paginate(db.query(Ticket), [Ticket.created_at, Ticket.id], cursor, limit)
+
+def get_bot_tickets_page(db: Session, bot_id: int, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    query = db.query(Ticket).filter(Ticket.bot_id == bot_id)
+    return paginate(query, [Ticket.created_at, Ticket.id], cursor, limit)
+
 def get_bot_ticket_details(db: Session, bot_id: int, ticket_id: int):
     return db.query(Ticket).filter(Ticket.bot_id == bot_id, Ticket.id == ticket_id).first()
 
@@ -0,0 +1,46 @@
+"""add bot analytics counters
+
+Revision ID: 3f8e2a6d9b14
+Revises: e4a17b09c2d6
+Create Date: 2026-10-19 16:08:12.734105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8e2a6d9b14'
+down_revision: Union[str, Sequence[str], None] = 'e4a17b09c2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'bot_analytics_counters',
+        sa.Column('bot_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('dimension', sa.String(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('bot_id', 'granularity', 'bucket_start', 'metric', 'dimension'),
+    )
+    op.create_table(
+        'bot_analytics_users',
+        sa.Column('bot_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.PrimaryKeyConstraint('bot_id', 'granularity', 'bucket_start', 'user_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('bot_analytics_users')
+    op.drop_table('bot_analytics_counters')
@@ -0,0 +1,55 @@
+"""promote conversation channel and source
+
+Revision ID: 510e86766f64
+Revises: c349ffd76972
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '510e86766f64'
+down_revision: Union[str, Sequence[str], None] = 'c349ffd76972'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _json_text(column: str, key: str) -> str:
+    """SQL expression extracting a text value from the interaction JSON column."""
+    if op.get_bind().dialect.name == 'postgresql':
+        return f"{column}->>'{key}'"
+    return f"json_extract({column}, '$.{key}')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('channel', sa.String(), nullable=True))
+    op.add_column('conversations', sa.Column('source', sa.String(), nullable=True))
+
+    # Backfill from the JSON column
+    op.execute(
+        f"UPDATE conversations SET "
+        f"channel = {_json_text('interaction', 'channel')}, "
+        f"source = {_json_text('interaction', 'source')}"
+    )
+
+    op.create_index(op.f('ix_conversations_channel'), 'conversations', ['channel'], unique=False)
+    op.create_index(op.f('ix_conversations_source'), 'conversations', ['source'], unique=False)
+    op.create_index('ix_conversations_bot_id_created_at', 'conversations', ['bot_id', 'created_at'], unique=False)
+    op.create_index('ix_conversations_user_id_created_at', 'conversations', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_conversations_bot_id_channel_user_id', 'conversations', ['bot_id', 'channel', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_conversations_bot_id_channel_user_id', table_name='conversations')
+    op.drop_index('ix_conversations_user_id_created_at', table_name='conversations')
+    op.drop_index('ix_conversations_bot_id_created_at', table_name='conversations')
+    op.drop_index(op.f('ix_conversations_source'), table_name='conversations')
+    op.drop_index(op.f('ix_conversations_channel'), table_name='conversations')
+    op.drop_column('conversations', 'source')
+    op.drop_column('conversations', 'channel')
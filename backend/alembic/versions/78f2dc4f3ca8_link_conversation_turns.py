@@ -0,0 +1,112 @@
+"""link conversation turns
+
+Revision ID: 78f2dc4f3ca8
+Revises: 510e86766f64
+Create Date: 2026-10-19 11:03:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '78f2dc4f3ca8'
+down_revision: Union[str, Sequence[str], None] = '510e86766f64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Runs as a handful of set-based statements so the backfill neither loads the
+# table into Python nor issues an UPDATE per row
+
+
+def _random_hex(bind) -> str:
+    """SQL expression for a random 32-character hex turn id, one per row."""
+    if bind.dialect.name == 'postgresql':
+        return "md5(random()::text || id::text)"
+    return "lower(hex(randomblob(16)))"
+
+
+def _json_text(bind, column: str, key: str) -> str:
+    """SQL expression extracting a text value from the interaction JSON column."""
+    if bind.dialect.name == 'postgresql':
+        return f"{column}->>'{key}'"
+    return f"json_extract({column}, '$.{key}')"
+
+
+def _json_message(bind, source: str, content: str, channel: str) -> str:
+    """SQL expression building a {"source", "content", "channel"} interaction."""
+    builder = 'json_build_object' if bind.dialect.name == 'postgresql' else 'json_object'
+    return f"{builder}('source', '{source}', 'content', {content}, 'channel', {channel})"
+
+
+def _link_two_row_turns(bind):
+    """Give each user row a turn_id and attach the next bot row from the same user and bot to it."""
+    bind.execute(sa.text(
+        f"UPDATE conversations SET turn_id = {_random_hex(bind)} WHERE turn_id IS NULL AND source = 'user'"
+    ))
+    # A bot row answers the row just before it, if that row is a user row
+    bind.execute(sa.text(
+        "UPDATE conversations SET turn_id = previous.turn_id "
+        "FROM ("
+        "  SELECT id, source, "
+        "    LAG(source) OVER turns AS previous_source, "
+        "    LAG(turn_id) OVER turns AS turn_id "
+        "  FROM conversations WHERE source IN ('user', 'bot') "
+        "  WINDOW turns AS (PARTITION BY user_id, bot_id ORDER BY created_at, id)"
+        ") AS previous "
+        "WHERE conversations.id = previous.id AND conversations.turn_id IS NULL "
+        "AND previous.source = 'bot' AND previous.previous_source = 'user'"
+    ))
+    bind.execute(sa.text(
+        f"UPDATE conversations SET turn_id = {_random_hex(bind)} WHERE turn_id IS NULL AND source = 'bot'"
+    ))
+
+
+def _split_single_row_turns(bind):
+    """Rewrite legacy {"question", "answer"} rows as a linked question row and answer row."""
+    question = _json_text(bind, 'interaction', 'question')
+    answer = _json_text(bind, 'interaction', 'answer')
+    channel = f"COALESCE(channel, {_json_text(bind, 'interaction', 'channel')})"
+    answer_message = _json_message(bind, 'bot', f"COALESCE({answer}, '')", channel)
+    question_message = _json_message(bind, 'user', f"COALESCE({question}, '')", channel)
+    if bind.dialect.name == 'postgresql':
+        is_legacy = "(interaction->'question' IS NOT NULL OR interaction->'answer' IS NOT NULL)"
+    else:
+        is_legacy = "(json_type(interaction, '$.question') IS NOT NULL OR json_type(interaction, '$.answer') IS NOT NULL)"
+
+    bind.execute(sa.text(
+        f"UPDATE conversations SET turn_id = {_random_hex(bind)} WHERE source IS NULL AND {is_legacy}"
+    ))
+    bind.execute(sa.text(
+        "INSERT INTO conversations "
+        "(user_id, bot_id, interaction, channel, source, turn_id, resolved, created_at, updated_at) "
+        f"SELECT user_id, bot_id, {answer_message}, "
+        f"{channel}, 'bot', turn_id, resolved, created_at, updated_at "
+        "FROM conversations WHERE source IS NULL AND turn_id IS NOT NULL"
+    ))
+    bind.execute(sa.text(
+        "UPDATE conversations SET "
+        f"interaction = {question_message}, "
+        f"channel = {channel}, source = 'user' "
+        "WHERE source IS NULL AND turn_id IS NOT NULL"
+    ))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('turn_id', sa.String(), nullable=True))
+    op.create_index(op.f('ix_conversations_turn_id'), 'conversations', ['turn_id'], unique=False)
+
+    bind = op.get_bind()
+    # Linking first keeps the rows the split creates out of the pairing
+    _link_two_row_turns(bind)
+    _split_single_row_turns(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rows split by upgrade() are left as separate question and answer rows
+    op.drop_index(op.f('ix_conversations_turn_id'), table_name='conversations')
+    op.drop_column('conversations', 'turn_id')
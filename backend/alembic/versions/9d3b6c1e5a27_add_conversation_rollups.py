@@ -0,0 +1,120 @@
+"""add conversation rollups
+
+Revision ID: 9d3b6c1e5a27
+Revises: 78f2dc4f3ca8
+Create Date: 2026-10-19 14:21:08.552931
+
+"""
+from typing import Sequence, Union
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6c1e5a27'
+down_revision: Union[str, Sequence[str], None] = '78f2dc4f3ca8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+conversations = sa.table(
+    'conversations',
+    sa.column('user_id', sa.Integer),
+    sa.column('bot_id', sa.Integer),
+    sa.column('channel', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+
+tickets = sa.table(
+    'tickets',
+    sa.column('bot_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _as_date(value):
+    # SQLite returns date() as text
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def _insert_batched(bind, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def _backfill(rollups, rollup_users):
+    bind = op.get_bind()
+    bot_id = sa.func.coalesce(conversations.c.bot_id, 0).label('bot_id')
+    channel = sa.func.coalesce(conversations.c.channel, 'web').label('channel')
+    day = sa.func.date(conversations.c.created_at).label('day')
+
+    users = bind.execute(
+        sa.select(bot_id, channel, day, conversations.c.user_id).distinct()
+    ).all()
+    _insert_batched(bind, rollup_users, [
+        {'bot_id': r.bot_id, 'channel': r.channel, 'day': _as_date(r.day), 'user_id': r.user_id}
+        for r in users
+    ])
+
+    buckets = {}
+    for r in bind.execute(
+        sa.select(bot_id, channel, day, sa.func.count().label('messages'),
+                  sa.func.count(sa.distinct(conversations.c.user_id)).label('users'))
+        .group_by(bot_id, channel, day)
+    ):
+        buckets[(r.bot_id, r.channel, _as_date(r.day))] = [r.messages, r.users, 0]
+
+    # Tickets carry no channel; they were all raised from the web chat
+    ticket_day = sa.func.date(tickets.c.created_at).label('day')
+    ticket_bot = sa.func.coalesce(tickets.c.bot_id, 0).label('bot_id')
+    for r in bind.execute(
+        sa.select(ticket_bot, ticket_day, sa.func.count().label('tickets')).group_by(ticket_bot, ticket_day)
+    ):
+        buckets.setdefault((r.bot_id, 'web', _as_date(r.day)), [0, 0, 0])[2] += r.tickets
+
+    now = datetime.datetime.utcnow()
+    _insert_batched(bind, rollups, [
+        {
+            'bot_id': key[0], 'channel': key[1], 'day': key[2],
+            'message_count': counts[0], 'user_count': counts[1], 'escalation_count': counts[2],
+            'updated_at': now,
+        }
+        for key, counts in buckets.items()
+    ])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    rollups = op.create_table(
+        'conversation_rollups',
+        sa.Column('bot_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('user_count', sa.Integer(), nullable=False),
+        sa.Column('escalation_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('bot_id', 'channel', 'day'),
+    )
+    op.create_index(op.f('ix_conversation_rollups_day'), 'conversation_rollups', ['day'], unique=False)
+    rollup_users = op.create_table(
+        'conversation_rollup_users',
+        sa.Column('bot_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.PrimaryKeyConstraint('bot_id', 'channel', 'day', 'user_id'),
+    )
+    _backfill(rollups, rollup_users)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('conversation_rollup_users')
+    op.drop_index(op.f('ix_conversation_rollups_day'), table_name='conversation_rollups')
+    op.drop_table('conversation_rollups')
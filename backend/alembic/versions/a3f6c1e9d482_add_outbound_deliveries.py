@@ -0,0 +1,53 @@
+"""add outbound deliveries
+
+Revision ID: a3f6c1e9d482
+Revises: d2e8b4a1f7c3
+Create Date: 2026-10-19 18:02:37.902115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6c1e9d482'
+down_revision: Union[str, Sequence[str], None] = 'd2e8b4a1f7c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'outbound_deliveries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('turn_id', sa.String(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('recipient', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_outbound_deliveries_id', 'outbound_deliveries', ['id'], unique=False)
+    op.create_index('ix_outbound_deliveries_turn_id', 'outbound_deliveries', ['turn_id'], unique=False)
+    op.create_index(
+        'ix_outbound_deliveries_status_next_attempt_at', 'outbound_deliveries', ['status', 'next_attempt_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbound_deliveries_status_next_attempt_at', table_name='outbound_deliveries')
+    op.drop_index('ix_outbound_deliveries_turn_id', table_name='outbound_deliveries')
+    op.drop_index('ix_outbound_deliveries_id', table_name='outbound_deliveries')
+    op.drop_table('outbound_deliveries')
@@ -0,0 +1,31 @@
+"""add full text search
+
+Revision ID: b6c0d4e8f215
+Revises: 3f8e2a6d9b14
+Create Date: 2026-10-19 17:11:53.406288
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.search import install_search, uninstall_search
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6c0d4e8f215'
+down_revision: Union[str, Sequence[str], None] = '3f8e2a6d9b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Postgres: generated tsvector columns + GIN indexes. SQLite: FTS5 tables + triggers, backfilled.
+    install_search(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    uninstall_search(op.get_bind())
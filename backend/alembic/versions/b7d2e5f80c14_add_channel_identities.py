@@ -0,0 +1,52 @@
+"""add channel identities
+
+Revision ID: b7d2e5f80c14
+Revises: a3f6c1e9d482
+Create Date: 2026-10-19 19:41:08.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e5f80c14'
+down_revision: Union[str, Sequence[str], None] = 'a3f6c1e9d482'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'channel_identities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('external_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_channel_identities_id', 'channel_identities', ['id'], unique=False)
+    op.create_index('ix_channel_identities_user_id', 'channel_identities', ['user_id'], unique=False)
+    op.create_index(
+        'ux_channel_identities_channel_external_id', 'channel_identities', ['channel', 'external_id'], unique=True
+    )
+
+    # Existing users keep being recognised by the email address and phone number they registered with
+    for channel, column in (("web", "email"), ("email", "email"), ("twilio", "phone_number"), ("sms", "phone_number")):
+        op.execute(
+            "INSERT INTO channel_identities (channel, external_id, user_id, created_at)"
+            f" SELECT '{channel}', {column}, id, CURRENT_TIMESTAMP FROM users WHERE {column} IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_channel_identities_channel_external_id', table_name='channel_identities')
+    op.drop_index('ix_channel_identities_user_id', table_name='channel_identities')
+    op.drop_index('ix_channel_identities_id', table_name='channel_identities')
+    op.drop_table('channel_identities')
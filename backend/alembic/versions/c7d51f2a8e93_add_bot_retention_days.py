@@ -0,0 +1,28 @@
+"""add bot retention days
+
+Revision ID: c7d51f2a8e93
+Revises: b6c0d4e8f215
+Create Date: 2026-10-19 18:02:37.118942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d51f2a8e93'
+down_revision: Union[str, Sequence[str], None] = 'b6c0d4e8f215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bots', sa.Column('retention_days', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('bots', 'retention_days')
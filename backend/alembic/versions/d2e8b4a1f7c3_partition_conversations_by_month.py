@@ -0,0 +1,103 @@
+"""partition conversations by month
+
+Revision ID: d2e8b4a1f7c3
+Revises: c7d51f2a8e93
+Create Date: 2026-10-19 18:02:37.514920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.partitions import DEFAULT_PARTITION, ensure_partitions
+from database.search import install_search, uninstall_search
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e8b4a1f7c3'
+down_revision: Union[str, Sequence[str], None] = 'c7d51f2a8e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = "id, user_id, interaction, channel, source, turn_id, resolved, created_at, updated_at, bot_id"
+
+_CREATE_COLUMNS = """
+    id INTEGER NOT NULL DEFAULT nextval('conversations_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    interaction JSONB NOT NULL,
+    channel VARCHAR,
+    source VARCHAR,
+    turn_id VARCHAR,
+    resolved BOOLEAN,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    updated_at TIMESTAMP WITHOUT TIME ZONE,
+    bot_id INTEGER REFERENCES bots (id)
+"""
+
+_INDEXES = [
+    ('ix_conversations_id', ['id']),
+    ('ix_conversations_channel', ['channel']),
+    ('ix_conversations_source', ['source']),
+    ('ix_conversations_turn_id', ['turn_id']),
+    ('ix_conversations_bot_id_created_at', ['bot_id', 'created_at']),
+    ('ix_conversations_user_id_created_at', ['user_id', 'created_at']),
+    ('ix_conversations_bot_id_channel_user_id', ['bot_id', 'channel', 'user_id']),
+    ('ix_conversations_created_at_user_id', ['created_at', 'user_id']),
+]
+
+
+def _create_indexes():
+    for name, columns in _INDEXES:
+        op.create_index(name, 'conversations', columns, unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        print(f"Skipping conversations partitioning on {bind.dialect.name}; it is Postgres only")
+        return
+
+    # The id sequence outlives the old table and keeps handing out the same ids
+    op.execute("ALTER SEQUENCE conversations_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE conversations RENAME TO conversations_unpartitioned")
+    op.execute(f"CREATE TABLE conversations ({_CREATE_COLUMNS}) PARTITION BY RANGE (created_at)")
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF conversations DEFAULT")
+
+    first = bind.execute(sa.text("SELECT min(created_at) FROM conversations_unpartitioned")).scalar()
+    ensure_partitions(bind, first_month=first)
+
+    # Legacy rows without created_at have to land somewhere in the range key
+    op.execute(
+        f"INSERT INTO conversations ({_COLUMNS}) "
+        f"SELECT id, user_id, interaction, channel, source, turn_id, resolved, "
+        f"coalesce(created_at, updated_at, now() AT TIME ZONE 'utc'), updated_at, bot_id "
+        f"FROM conversations_unpartitioned"
+    )
+    op.execute("DROP TABLE conversations_unpartitioned")
+    op.execute("ALTER SEQUENCE conversations_id_seq OWNED BY conversations.id")
+
+    # Unique constraints on a partitioned table must include the partition key
+    op.execute("ALTER TABLE conversations ADD CONSTRAINT conversations_pkey PRIMARY KEY (id, created_at)")
+    _create_indexes()
+    install_search(bind)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    uninstall_search(bind)
+    op.execute("ALTER SEQUENCE conversations_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE conversations RENAME TO conversations_partitioned")
+    op.execute(f"CREATE TABLE conversations ({_CREATE_COLUMNS})")
+    op.execute("ALTER TABLE conversations ALTER COLUMN created_at DROP NOT NULL, ALTER COLUMN created_at DROP DEFAULT")
+    op.execute(f"INSERT INTO conversations ({_COLUMNS}) SELECT {_COLUMNS} FROM conversations_partitioned")
+    op.execute("DROP TABLE conversations_partitioned CASCADE")
+    op.execute("ALTER SEQUENCE conversations_id_seq OWNED BY conversations.id")
+    op.execute("ALTER TABLE conversations ADD CONSTRAINT conversations_pkey PRIMARY KEY (id)")
+    _create_indexes()
+    install_search(bind)
@@ -0,0 +1,28 @@
+"""index conversations created_at
+
+Revision ID: e4a17b09c2d6
+Revises: 9d3b6c1e5a27
+Create Date: 2026-10-19 15:02:44.190377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a17b09c2d6'
+down_revision: Union[str, Sequence[str], None] = '9d3b6c1e5a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_conversations_created_at_user_id', 'conversations', ['created_at', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_conversations_created_at_user_id', table_name='conversations')
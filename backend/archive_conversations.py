@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Move conversations past each bot's retention horizon into the cold archive.
+
+Meant to run from cron, e.g. nightly:
+
+    python archive_conversations.py
+
+A bot's horizon is bots.retention_days, falling back to CONVERSATION_RETENTION_DAYS.
+Files are written under ARCHIVE_DIR (see database/archive.py for the layout).
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+from database.sessions import session_local
+from database.archive import ARCHIVE_DIR, archive_conversations
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=ARCHIVE_DIR, help="Archive directory (default: ARCHIVE_DIR)")
+    args = parser.parse_args()
+
+    db = session_local()
+    try:
+        stats = archive_conversations(db, root=args.root)
+    finally:
+        db.close()
+    total = sum(stats.values())
+    print(f"✅ Archived {total} conversations from {len(stats)} bots into {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,19 +15,42 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # password hashing
-def get_password_hash(password: str) -> str:
+# Stored as pbkdf2_sha256$<iterations>$<salt>$<hash>; legacy "<salt>:<hash>" values used 100k iterations
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+LEGACY_HASH_ITERATIONS = 100000
+HASH_SCHEME = "pbkdf2_sha256"
+
+
+def _parse_hash(hashed_password: str):
+    """(iterations, salt, hash) of a stored password hash."""
+    if hashed_password.startswith(HASH_SCHEME + "$"):
+        _, iterations, salt_hex, pwd_hash_hex = hashed_password.split("$")
+        return int(iterations), bytes.fromhex(salt_hex), bytes.fromhex(pwd_hash_hex)
+    salt_hex, pwd_hash_hex = hashed_password.split(':')
+    return LEGACY_HASH_ITERATIONS, bytes.fromhex(salt_hex), bytes.fromhex(pwd_hash_hex)
+
+
+def get_password_hash(password: str, iterations: int = None) -> str:
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
     salt = os.urandom(16)
-    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-    return salt.hex() + ':' + pwd_hash.hex()
+    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${salt.hex()}${pwd_hash.hex()}"
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
-        salt_hex, pwd_hash_hex = hashed_password.split(':')
-        salt = bytes.fromhex(salt_hex)
-        pwd_hash = bytes.fromhex(pwd_hash_hex)
-        new_pwd_hash = hashlib.pbkdf2_hmac('sha256', plain_password.encode('utf-8'), salt, 100000)
+        iterations, salt, pwd_hash = _parse_hash(hashed_password)
+        new_pwd_hash = hashlib.pbkdf2_hmac('sha256', plain_password.encode('utf-8'), salt, iterations)
         return hmac.compare_digest(new_pwd_hash, pwd_hash)
-    except (ValueError, IndexError):
+    except (ValueError, IndexError, AttributeError):
+        return False
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True for legacy hashes and hashes made with fewer iterations than the current setting."""
+    if not hashed_password.startswith(HASH_SCHEME + "$"):
+        return ":" in hashed_password
+    try:
+        return _parse_hash(hashed_password)[0] < PASSWORD_HASH_ITERATIONS
+    except (ValueError, IndexError, AttributeError):
         return False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
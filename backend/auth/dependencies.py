@@ -0,0 +1,177 @@
+# dependencies.py
+"""
+The FastAPI dependencies that turn a bearer token into the current user or admin.
+
+Decoded tokens and the user/admin rows behind them are cached for
+PRINCIPAL_CACHE_TTL_SECONDS, so chat traffic does not cost a token decode and a
+users-table query per message. Cached rows are merged into the request's session
+without a query (merge(load=False)), so callers get an ordinary attached
+instance. Entries are dropped as soon as a user or admin row is updated or
+deleted in this process; other processes pick the change up within the TTL.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, Request
+from jose import jwt, JWTError
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from auth.auth import SECRET_KEY, ALGORITHM
+from database.database import Admin, User
+from database.sessions import get_db
+
+load_dotenv()
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+class PrincipalCache:
+    """Thread-safe TTL cache of decoded token payloads and detached user/admin rows."""
+
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._tokens = {}      # token -> (expires_at, payload)
+        self._principals = {}  # (model name, email) -> (expires_at, instance)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _get(self, store: dict, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = store.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del store[key]
+            self.misses += 1
+            return None
+
+    def _put(self, store: dict, key, value, expires_at: float):
+        with self._lock:
+            if len(store) >= self.max_entries:
+                # Cheaper than LRU bookkeeping and fine for a cache this short-lived
+                now = time.monotonic()
+                for stale in [k for k, (expires, _) in store.items() if expires <= now]:
+                    del store[stale]
+                if len(store) >= self.max_entries:
+                    store.clear()
+            store[key] = (expires_at, value)
+
+    def get_payload(self, token: str) -> Optional[dict]:
+        return self._get(self._tokens, token)
+
+    def put_payload(self, token: str, payload: dict):
+        expires_at = time.monotonic() + self.ttl_seconds
+        if payload.get("exp"):
+            # Never keep a token past its own expiry
+            expires_at = min(expires_at, time.monotonic() + (payload["exp"] - time.time()))
+        self._put(self._tokens, token, payload, expires_at)
+
+    def get_principal(self, model, email: str):
+        return self._get(self._principals, (model.__name__, email))
+
+    def put_principal(self, model, email: str, instance):
+        self._put(self._principals, (model.__name__, email), instance, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, model, principal_id: int = None, email: str = None):
+        """Drop cached rows for a principal, matched by id or email."""
+        with self._lock:
+            for key, (_, instance) in list(self._principals.items()):
+                if key[0] != model.__name__:
+                    continue
+                if key[1] == email or (principal_id is not None and instance.id == principal_id):
+                    del self._principals[key]
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._principals.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "tokens": len(self._tokens),
+                "principals": len(self._principals),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+@event.listens_for(Admin, "after_update")
+@event.listens_for(Admin, "after_delete")
+def _invalidate_principal(mapper, connection, target):
+    principal_cache.invalidate(mapper.class_, principal_id=target.id, email=target.email)
+
+
+def _bearer_payload(request: Request) -> dict:
+    token = request.headers.get("Authorization")
+    if not token or not token.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Invalid token format")
+
+    token = token.split(" ")[1]
+    payload = principal_cache.get_payload(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        principal_cache.put_payload(token, payload)
+    return payload
+
+
+def _load_principal(db: Session, model, email: str):
+    cached = principal_cache.get_principal(model, email)
+    if cached is not None:
+        return db.merge(cached, load=False)
+    principal = db.query(model).filter(model.email == email).first()
+    if principal is not None:
+        # Cache a detached copy; the request keeps its own attached instance
+        principal_cache.put_principal(model, email, _detached_copy(principal))
+    return principal
+
+
+def _detached_copy(principal):
+    copy = type(principal)(**{attr.key: getattr(principal, attr.key) for attr in principal.__mapper__.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+    payload = _bearer_payload(request)
+    email = payload.get("sub")
+    if email is None:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+
+    user = _load_principal(db, User, email)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+def get_current_admin(request: Request, db: Session = Depends(get_db)) -> Admin:
+    """Get current admin from JWT token"""
+    payload = _bearer_payload(request)
+    email = payload.get("sub")
+    if email is None or payload.get("type") != "admin":
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    admin = _load_principal(db, Admin, email)
+    if not admin:
+        raise HTTPException(status_code=401, detail="Admin not found")
+    return admin
@@ -0,0 +1,221 @@
+# passwords.py
+"""
+Password hashing off the request threadpool, plus login throttling.
+
+PBKDF2 is deliberately slow, and running it on the shared threadpool let a
+burst of logins starve the synchronous chat endpoints. Hashing runs in a small
+process pool instead, and the sign-in endpoints await the result on the event
+loop, so a waiting login holds no request thread at all. At most
+PASSWORD_HASH_MAX_PENDING hashes may be queued or running; callers beyond that
+get a 503 straight away, as do hashes that time out or hit a crashed worker.
+A slot is only freed once its hash has actually finished. LoginThrottle
+rejects bursts from one IP or against one account before any hashing is done.
+"""
+import asyncio
+import collections
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth.auth import get_password_hash, needs_rehash, verify_password
+
+load_dotenv()
+
+# 0 hashes in a threadpool thread instead (still bounded by PASSWORD_HASH_MAX_PENDING)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+LOGIN_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_ATTEMPTS_PER_IP", "20"))
+LOGIN_ATTEMPTS_PER_ACCOUNT = int(os.getenv("LOGIN_ATTEMPTS_PER_ACCOUNT", "10"))
+LOGIN_THROTTLE_WINDOW_SECONDS = float(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", "60"))
+
+# Upper bounds (ms) of the hash latency histogram buckets
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500)
+
+
+class PasswordHasher:
+    """Bounded process-pool executor for password hashing and verification."""
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        timeout_seconds: float = PASSWORD_HASH_TIMEOUT_SECONDS,
+    ):
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.latency_buckets = collections.Counter()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _record(self, elapsed_ms: float):
+        with self._lock:
+            self.completed += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            bucket = next((str(b) for b in LATENCY_BUCKETS_MS if elapsed_ms <= b), "inf")
+            self.latency_buckets[bucket] += 1
+
+    def _unavailable(self) -> HTTPException:
+        return HTTPException(
+            status_code=503, detail="Too many sign-in requests, please retry shortly", headers={"Retry-After": "1"}
+        )
+
+    def _finished(self, started: float):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+        self._record((time.perf_counter() - started) * 1000)
+
+    def _discard_executor(self, executor):
+        """Drop a broken pool so the next hash starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise self._unavailable()
+        with self._lock:
+            self.pending += 1
+        started = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                return await asyncio.to_thread(fn, *args)
+            finally:
+                self._finished(started)
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._finished(started)
+            self._discard_executor(executor)
+            raise self._unavailable()
+        # The slot stays taken until the worker is done, even if this caller gives up first
+        future.add_done_callback(lambda _: self._finished(started))
+        try:
+            # Timing out cancels the wrapper, which cancels the job if no worker has picked it up yet
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise self._unavailable()
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise self._unavailable()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: Optional[str]) -> bool:
+        if not hashed_password:
+            return False
+        return await self._run(verify_password, password, hashed_password)
+
+    async def upgrade(self, db: AsyncSession, principal, password: str) -> bool:
+        """
+        Re-hash a just-verified password with the current parameters if it was
+        stored with weaker ones. Best effort: a full queue just skips it this time.
+        """
+        if not needs_rehash(principal.password):
+            return False
+        try:
+            principal.password = await self.hash(password)
+            await db.commit()
+        except HTTPException:
+            return False
+        with self._lock:
+            self.rehashed += 1
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "avg_ms": round(self.total_ms / self.completed, 1) if self.completed else 0.0,
+                "max_ms": round(self.max_ms, 1),
+                "latency_ms": dict(self.latency_buckets),
+            }
+
+
+class LoginThrottle:
+    """Sliding-window limit on sign-in attempts per client IP and per account."""
+
+    def __init__(
+        self,
+        per_ip: int = LOGIN_ATTEMPTS_PER_IP,
+        per_account: int = LOGIN_ATTEMPTS_PER_ACCOUNT,
+        window_seconds: float = LOGIN_THROTTLE_WINDOW_SECONDS,
+    ):
+        self.limits = {"ip": per_ip, "account": per_account}
+        self.window_seconds = window_seconds
+        self._attempts = {}  # (kind, key) -> deque of attempt times
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def _over_limit(self, kind: str, key: str, now: float) -> bool:
+        attempts = self._attempts.setdefault((kind, key), collections.deque())
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+        return len(attempts) >= self.limits[kind]
+
+    def check(self, ip: Optional[str], account: Optional[str]):
+        """Record an attempt, raising 429 if either the IP or the account is over its limit."""
+        now = time.monotonic()
+        keys = [(kind, key) for kind, key in (("ip", ip), ("account", (account or "").lower())) if key]
+        with self._lock:
+            if any(self._over_limit(kind, key, now) for kind, key in keys):
+                self.throttled += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many sign-in attempts, please wait a minute",
+                    headers={"Retry-After": str(int(self.window_seconds))},
+                )
+            for key in keys:
+                self._attempts[key].append(now)
+            if len(self._attempts) > 10000:
+                # Forget idle keys so one-off IPs do not accumulate forever
+                for key in [k for k, v in self._attempts.items() if not v or v[-1] <= now - self.window_seconds]:
+                    del self._attempts[key]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"tracked_keys": len(self._attempts), "throttled": self.throttled}
+
+
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
@@ -1,25 +1,27 @@
 # ragpipeline.py
+import os
 import sys
 import pickle
+import time
 
 from dotenv import load_dotenv
 import redis
 from fastapi import Depends, HTTPException, APIRouter, Request
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import create_retrieval_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_chroma import Chroma
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.chains.combine_documents import create_stuff_documents_chain
 
-from auth.auth import SECRET_KEY, ALGORITHM
+from auth.dependencies import get_current_user
 from database.sessions import get_db
-from database.database import get_user_by_email, Conversation
+from database.conversation_writer import conversation_writer, build_conversation_row, build_turn_rows
+from database.analytics import analytics_recorder
+from bots.circuit_breaker import get_breaker, invoke_with_breaker
 from .knowledgebase import embeddings
 
 load_dotenv()
@@ -29,7 +31,7 @@ model = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash",
     temperature=0.3,
     max_tokens=None,
-    timeout=None,
+    timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
     max_retries=2,
     callbacks=[StreamingStdOutCallbackHandler()],
 )
@@ -82,49 +84,26 @@ def set_cached_answer(query, answer):
         print(f"Cache storage error: {e}")
 
 
-# Initialize retrieval chain
+# The retriever and the LLM step are kept apart so only model failures trip the breaker
 retriever = vectorstore.as_retriever(search_type="similarity")
 document_chain = create_stuff_documents_chain(llm, system_prompt)
-retrieval_chain = create_retrieval_chain(retriever, document_chain)
 
-# OAuth2 setup
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-
-def get_current_user(request: Request, db: Session = Depends(get_db)):
-    """Get current user from Authorization header for API routes"""
-    print("--- In get_current_user (ragpipeline) ---")
-    sys.stdout.flush()
-
-    # Get token from Authorization header
-    auth_header = request.headers.get("Authorization")
-    print(f"Authorization header: {auth_header}")
-    sys.stdout.flush()
-
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
+# Shared with the bot layer, which calls the same model
+breaker = get_breaker("gemini-2.0-flash")
 
-    token = auth_header.split(" ")[1]
-    print(f"Extracted token: {token}")
-    sys.stdout.flush()
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"Decoded payload: {payload}")
-        sys.stdout.flush()
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError as e:
-        print(f"JWTError: {e}")
-        sys.stdout.flush()
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    user = get_user_by_email(db, email)
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+def answer_question(question):
+    """
+    Answer through the LLM circuit breaker, falling back to retrieved chunks when it is open.
+    Channel turns are not tied to a bot, so their answers count under the unassigned bot.
+    """
+    started = time.perf_counter()
+    result = invoke_with_breaker(breaker, document_chain, retriever, question)
+    analytics_recorder.record_answer(None, (time.perf_counter() - started) * 1000, cache_hit=False)
+    return result
 
-    return user
+# OAuth2 setup
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 class QueryRequest(BaseModel):
@@ -134,18 +113,23 @@ class QueryRequest(BaseModel):
 
 
 def save_conversation(
-    db: Session, user_id: int, source: str, content: str, channel: str = "web", resolved: bool = False
+    db: Session, user_id: int, source: str, content: str, channel: str = "web", resolved: bool = False, wait: bool = False
 ):
-    """Save a single interaction message to the database."""
-    convo = Conversation(
-        user_id=user_id,
-        interaction={"source": source, "content": content, "channel": channel},
-        resolved=resolved,
-    )
-    db.add(convo)
-    db.commit()
-    db.refresh(convo)
-    return convo
+    """Queue a single interaction message for write-behind persistence (wait=True writes it synchronously)."""
+    row = build_conversation_row(user_id, None, source, content, channel, resolved)
+    if wait or not conversation_writer.enqueue(row):
+        return conversation_writer.write_sync(db, row)
+    return None
+
+
+def save_conversation_turn(
+    db: Session, user_id: int, question: str, answer: str, channel: str = "web", resolved: bool = False, wait: bool = False
+):
+    """Save a question and its answer as two rows sharing a turn_id."""
+    rows = build_turn_rows(user_id, None, question, answer, channel, resolved)
+    if wait or not conversation_writer.enqueue_many(rows):
+        return conversation_writer.write_many_sync(db, rows)
+    return None
 
 
 
@@ -166,28 +150,18 @@ def ask_question(
     if cached:
         answer = cached["answer"]
     else:
-        result = retrieval_chain.invoke({"input": question})
+        result = answer_question(question)
         answer = result["answer"]
-        set_cached_answer(question, result)
-
-    # Save the user's question
-    save_conversation(
-        db=db,
-        user_id=current_user.id,
-        source="user",
-        content=question,
-        channel="web",
-        resolved=False,
-    )
+        if not result["degraded"]:
+            set_cached_answer(question, result)
 
-    # Save the bot's answer
-    save_conversation(
+    # Save the question and answer as one linked turn
+    save_conversation_turn(
         db=db,
         user_id=current_user.id,
-        source="bot",
-        content=answer,
+        question=question,
+        answer=answer,
         channel="web",
-        resolved=False, # Or determine based on answer
     )
 
     return {"answer": answer}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark the inbox day filters: func.date(created_at) == day versus the
+half-open created_at range used by adminbackend/inbox.py.
+
+Fills a scratch database with synthetic conversations, then prints the query
+plan and timing of both forms. Uses BENCHMARK_DATABASE_URL (a throwaway
+database - the conversations table is dropped and recreated), defaulting to
+a SQLite file next to this script.
+
+    python benchmark_inbox.py --rows 3000000
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, func, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from database.database import Base, Conversation, User
+from adminbackend.inbox import day_bounds
+
+load_dotenv()
+
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL", "sqlite:///./benchmark_inbox.db")
+INSERT_BATCH = 50000
+
+
+def populate(engine, rows: int, days: int, users: int, bots: int):
+    Base.metadata.drop_all(bind=engine, tables=[Conversation.__table__, User.__table__])
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, Conversation.__table__])
+
+    start = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    span = days * 86400
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"user{i}@example.com", "phone_number": f"+1{i:010d}"} for i in range(1, users + 1)
+        ])
+        for offset in range(0, rows, INSERT_BATCH):
+            batch = []
+            for _ in range(min(INSERT_BATCH, rows - offset)):
+                created = start + datetime.timedelta(seconds=rng.randrange(span))
+                batch.append({
+                    "user_id": rng.randint(1, users),
+                    "bot_id": rng.randint(1, bots),
+                    "interaction": {"source": "user", "content": "hello"},
+                    "channel": "web",
+                    "source": "user",
+                    "created_at": created,
+                    "updated_at": created,
+                })
+            conn.execute(insert(Conversation), batch)
+            print(f"  inserted {offset + len(batch)}/{rows}")
+    return start
+
+
+def explain(conn, statement):
+    compiled = statement.compile(conn, compile_kwargs={"literal_binds": True})
+    if conn.dialect.name == "postgresql":
+        return [r[0] for r in conn.execute(text(f"EXPLAIN ANALYZE {compiled}"))]
+    return [r[-1] for r in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+
+
+def timed(conn, statement, repeat: int):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(statement).all()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(rows)
+
+
+def report(conn, label, statement, repeat):
+    best, count = timed(conn, statement, repeat)
+    print(f"\n{label}: {count} rows, best of {repeat}: {best * 1000:.1f} ms")
+    for line in explain(conn, statement):
+        print(f"    {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--bots", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="Skip populating and reuse the existing rows")
+    args = parser.parse_args()
+
+    engine = create_engine(BENCHMARK_DATABASE_URL)
+    print(f"Benchmark database: {BENCHMARK_DATABASE_URL}")
+    if not args.reuse:
+        print(f"Populating {args.rows} conversations over {args.days} days...")
+        populate(engine, args.rows, args.days, args.users, args.bots)
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE conversations"))
+
+    db = sessionmaker(bind=engine)()
+    day = (datetime.datetime.utcnow() - datetime.timedelta(days=args.days // 2)).date()
+    start, end = day_bounds(day)
+    bot_id = 1
+    user_id = db.query(Conversation.user_id).filter(
+        Conversation.created_at >= start, Conversation.created_at < end
+    ).limit(1).scalar() or 1
+
+    users_before = db.query(Conversation.user_id).filter(func.date(Conversation.created_at) == day).distinct()
+    users_after = db.query(Conversation.user_id).filter(
+        Conversation.created_at >= start, Conversation.created_at < end
+    ).distinct()
+    bot_users_before = users_before.filter(Conversation.bot_id == bot_id)
+    bot_users_after = users_after.filter(Conversation.bot_id == bot_id)
+    convos_before = db.query(Conversation.id).filter(
+        Conversation.user_id == user_id, func.date(Conversation.created_at) == day
+    )
+    convos_after = db.query(Conversation.id).filter(
+        Conversation.user_id == user_id, Conversation.created_at >= start, Conversation.created_at < end
+    )
+
+    with engine.connect() as conn:
+        print(f"\nInbox day {day} (UTC range {start} .. {end})")
+        report(conn, "users by date, func.date()", users_before.statement, args.repeat)
+        report(conn, "users by date, range", users_after.statement, args.repeat)
+        report(conn, f"bot {bot_id} users by date, func.date()", bot_users_before.statement, args.repeat)
+        report(conn, f"bot {bot_id} users by date, range", bot_users_after.statement, args.repeat)
+        report(conn, f"user {user_id} conversations by date, func.date()", convos_before.statement, args.repeat)
+        report(conn, f"user {user_id} conversations by date, range", convos_after.statement, args.repeat)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 # banking_bot.py
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from bots.base_bot import BaseBot, QueryRequest, HumanAssistanceRequest, get_current_user
+from bots.base_bot import BaseBot, QueryRequest, HumanAssistanceRequest, get_current_user, save_conversation_turn
 from database.sessions import get_db
 
 banking_prompt = """
@@ -62,35 +62,16 @@ class EnhancedBankingBot(BaseBot):
     def ask_question(self, request, bot_id, current_user, db):
         """Enhanced ask_question that automatically creates tickets for banking issues"""
         question = request.question
-        cached = self.get_cached_answer(question)
+        answer = self.get_answer(question, bot_id)
 
-        if cached:
-            answer = cached["answer"]
-        else:
-            result = self.retrieval_chain.invoke({"input": question})
-            answer = result["answer"]
-            self.set_cached_answer(question, result)
-
-        # Save conversations
-        from bots.base_bot import save_conversation
-        save_conversation(
-            db=db,
-            user_id=current_user.id,
-            bot_id=bot_id,
-            source="user",
-            content=question,
-            channel="web",
-            resolved=False,
-        )
-
-        save_conversation(
+        # Save the question and answer as one linked turn
+        save_conversation_turn(
             db=db,
             user_id=current_user.id,
             bot_id=bot_id,
-            source="bot",
-            content=answer,
+            question=question,
+            answer=answer,
             channel="web",
-            resolved=False,
         )
 
         # Enhanced human assistance detection
@@ -111,7 +92,8 @@ class EnhancedBankingBot(BaseBot):
                 db=db,
                 ticket=ticket_data,
                 user_id=current_user.id,
-                bot_id=bot_id
+                bot_id=bot_id,
+                channel="web",
             )
             
             return {
@@ -1,13 +1,15 @@
 # base_bot.py
+import os
 import sys
 import pickle
+import time
 
 from dotenv import load_dotenv
 import redis
 from fastapi import Depends, HTTPException, APIRouter, Request
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 
@@ -18,13 +20,18 @@ from langchain_chroma import Chroma
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.chains.combine_documents import create_stuff_documents_chain
 
-from auth.auth import SECRET_KEY, ALGORITHM
+from auth.dependencies import get_current_user
 from database.sessions import get_db
-from database.database import get_user_by_email, Conversation
+from database.conversation_writer import conversation_writer, build_conversation_row, build_turn_rows
+from database.analytics import analytics_recorder
 from backend.knowledgebase import embeddings
+from bots.circuit_breaker import get_breaker, invoke_with_breaker
 
 load_dotenv()
 
+LLM_MODEL_NAME = "gemini-2.0-flash"
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 class QueryRequest(BaseModel):
@@ -34,46 +41,13 @@ class HumanAssistanceRequest(BaseModel):
     topic: str
     description: Optional[str] = None
 
-def get_current_user(request: Request, db: Session = Depends(get_db)):
-    print("--- In get_current_user (base_bot) ---")
-    sys.stdout.flush()
-
-    auth_header = request.headers.get("Authorization")
-    print(f"Authorization header: {auth_header}")
-    sys.stdout.flush()
-
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-
-    token = auth_header.split(" ")[1]
-    print(f"Extracted token: {token}")
-    sys.stdout.flush()
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"Decoded payload: {payload}")
-        sys.stdout.flush()
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError as e:
-        print(f"JWTError: {e}")
-        sys.stdout.flush()
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    user = get_user_by_email(db, email)
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    return user
-
 class BaseBot:
     def __init__(self, system_prompt: str, persist_directory: str = "chroma_db"):
         self.model = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
+            model=LLM_MODEL_NAME,
             temperature=0.3,
             max_tokens=None,
-            timeout=None,
+            timeout=LLM_TIMEOUT_SECONDS,
             max_retries=2,
             callbacks=[StreamingStdOutCallbackHandler()],
         )
@@ -81,7 +55,8 @@ class BaseBot:
         self.vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
         self.cache = self._init_redis()
         self.retrieval_chain = self._init_retrieval_chain()
-        
+        # All bots share one breaker since they call the same upstream model
+        self.breaker = get_breaker(LLM_MODEL_NAME)
 
     def _init_redis(self):
         try:
@@ -94,9 +69,35 @@ class BaseBot:
             return None
 
     def _init_retrieval_chain(self):
-        retriever = self.vectorstore.as_retriever(search_type="similarity")
-        document_chain = create_stuff_documents_chain(self.model, self.system_prompt)
-        return create_retrieval_chain(retriever, document_chain)
+        self.retriever = self.vectorstore.as_retriever(search_type="similarity")
+        self.document_chain = create_stuff_documents_chain(self.model, self.system_prompt)
+        return create_retrieval_chain(self.retriever, self.document_chain)
+
+    def invoke_with_breaker(self, question: str) -> dict:
+        """
+        Retrieve context and call the model behind the LLM circuit breaker. While the breaker
+        is open the answer is built from the top retrieved chunks and flagged "degraded".
+        """
+        return invoke_with_breaker(self.breaker, self.document_chain, self.retriever, question)
+
+    def get_answer_result(self, question: str, bot_id: Optional[int] = None) -> dict:
+        """
+        Answer from the cache, or from the retrieval chain (cached unless degraded),
+        as {"answer", "degraded", ...}. Latency and cache hits are recorded for the bot's analytics.
+        """
+        started = time.perf_counter()
+        cached = self.get_cached_answer(question)
+        if cached:
+            result = {**cached, "degraded": False}
+        else:
+            result = self.invoke_with_breaker(question)
+            if not result["degraded"]:
+                self.set_cached_answer(question, result)
+        analytics_recorder.record_answer(bot_id, (time.perf_counter() - started) * 1000, cache_hit=bool(cached))
+        return result
+
+    def get_answer(self, question: str, bot_id: Optional[int] = None) -> str:
+        return self.get_answer_result(question, bot_id)["answer"]
 
     def get_cached_answer(self, query: str):
         if not self.cache:
@@ -179,35 +180,16 @@ class BaseBot:
         db: Session = Depends(get_db),
     ):
         question = request.question
-        cached = self.get_cached_answer(question)
+        answer = self.get_answer(question, bot_id)
 
-        if cached:
-            answer = cached["answer"]
-        else:
-            result = self.retrieval_chain.invoke({"input": question})
-            answer = result["answer"]
-            self.set_cached_answer(question, result)
-
-        # Save user question
-        save_conversation(
-            db=db,
-            user_id=current_user.id,
-            bot_id=bot_id,
-            source="user",
-            content=question,
-            channel="web",
-            resolved=False,
-        )
-
-        # Save bot answer
-        save_conversation(
+        # Save the question and answer as one linked turn
+        save_conversation_turn(
             db=db,
             user_id=current_user.id,
             bot_id=bot_id,
-            source="bot",
-            content=answer,
+            question=question,
+            answer=answer,
             channel="web",
-            resolved=False,
         )
 
         # Check if human assistance is needed
@@ -254,7 +236,8 @@ class BaseBot:
             db=db, 
             ticket=ticket_data, 
             user_id=current_user.id,
-            bot_id=bot_id  # Now properly set from the calling bot
+            bot_id=bot_id,  # Now properly set from the calling bot
+            channel="web",
         )
         
         # Save conversation about ticket creation
@@ -277,15 +260,59 @@ class BaseBot:
         }
 
 def save_conversation(
-    db: Session, user_id: int, bot_id: int, source: str, content: str, channel: str = "web", resolved: bool = False
+    db: Session,
+    user_id: int,
+    bot_id: int,
+    source: str,
+    content: str,
+    channel: str = "web",
+    resolved: bool = False,
+    wait: bool = False,
+):
+    """
+    Queue a message for batched write-behind persistence. Pass wait=True to insert
+    synchronously and get the saved row (with its id) back.
+    """
+    row = build_conversation_row(user_id, bot_id, source, content, channel, resolved)
+    if wait or not conversation_writer.enqueue(row):
+        return conversation_writer.write_sync(db, row)
+    return None
+
+
+def save_conversation_turn(
+    db: Session,
+    user_id: int,
+    question: str,
+    answer: str,
+    bot_id: Optional[int] = None,
+    channel: str = "web",
+    resolved: bool = False,
+    wait: bool = False,
+    turn_id: Optional[str] = None,
+):
+    """
+    Save a question and its answer as two rows linked by a shared turn_id, so readers
+    can pair them with a join. Queued for write-behind unless wait=True.
+    """
+    rows = build_turn_rows(user_id, bot_id, question, answer, channel, resolved, turn_id)
+    if wait or not conversation_writer.enqueue_many(rows):
+        return conversation_writer.write_many_sync(db, rows)
+    return None
+
+
+async def save_conversation_turn_async(
+    db: AsyncSession,
+    user_id: int,
+    question: str,
+    answer: str,
+    bot_id: Optional[int] = None,
+    channel: str = "web",
+    resolved: bool = False,
+    wait: bool = False,
+    turn_id: Optional[str] = None,
 ):
-    convo = Conversation(
-        user_id=user_id,
-        bot_id=bot_id,
-        interaction={"source": source, "content": content, "channel": channel},
-        resolved=resolved,
-    )
-    db.add(convo)
-    db.commit()
-    db.refresh(convo)
-    return convo
+    """save_conversation_turn() for handlers holding an AsyncSession."""
+    rows = build_turn_rows(user_id, bot_id, question, answer, channel, resolved, turn_id)
+    if wait or not conversation_writer.enqueue_many(rows):
+        return await db.run_sync(conversation_writer.write_many_sync, rows)
+    return None
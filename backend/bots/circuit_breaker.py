@@ -0,0 +1,202 @@
+# circuit_breaker.py
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Breaker tuning (override via environment)
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "3"))
+LLM_BREAKER_RESET_TIMEOUT = float(os.getenv("LLM_BREAKER_RESET_TIMEOUT", "30"))
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+DEGRADED_ANSWER_CHUNKS = int(os.getenv("DEGRADED_ANSWER_CHUNKS", "3"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    closed    -> calls go through; consecutive failures are counted.
+    open      -> calls are rejected until reset_timeout has elapsed.
+    half_open -> a limited number of probe calls go through; a success
+                 closes the breaker, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = LLM_BREAKER_RESET_TIMEOUT,
+        half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+        # Counters exposed through snapshot()
+        self.total_calls = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+        self.degraded_responses = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probes_in_flight = 0
+        self.times_opened += 1
+        print(f"Circuit breaker '{self.name}' opened after {self._consecutive_failures} failures")
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed, reserving a probe slot when half-open."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.total_calls += 1
+            self.total_successes += 1
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                print(f"Circuit breaker '{self.name}' closed, probe succeeded")
+            self._state = CLOSED
+            self._probes_in_flight = 0
+
+    def record_failure(self, error: Exception = None):
+        with self._lock:
+            self.total_calls += 1
+            self.total_failures += 1
+            self._consecutive_failures += 1
+            self.last_error = str(error) if error else None
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def record_degraded(self):
+        with self._lock:
+            self.degraded_responses += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "total_calls": self.total_calls,
+                "total_successes": self.total_successes,
+                "total_failures": self.total_failures,
+                "total_rejected": self.total_rejected,
+                "times_opened": self.times_opened,
+                "degraded_responses": self.degraded_responses,
+                "last_error": self.last_error,
+            }
+
+
+# One breaker per upstream dependency, shared by every bot that uses it
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def get_breaker_metrics() -> List[dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in breakers]
+
+
+def build_degraded_answer(documents: list, max_chunks: int = DEGRADED_ANSWER_CHUNKS) -> str:
+    """
+    Build an extractive answer from the top retrieved chunks, used while the LLM is unavailable.
+    """
+    excerpts = []
+    for doc in documents[:max_chunks]:
+        text = " ".join((getattr(doc, "page_content", "") or "").split())
+        if not text:
+            continue
+        sentences = [s.strip() for s in text.split(". ") if s.strip()]
+        excerpt = ". ".join(sentences[:2])
+        if not excerpt.endswith((".", "!", "?")):
+            excerpt += "."
+        excerpts.append(f"- {excerpt}")
+
+    if not excerpts:
+        return (
+            "I'm having trouble answering right now and couldn't find anything relevant. "
+            "Would you like to flag this for human assistance?"
+        )
+
+    return (
+        "Our assistant is temporarily running in limited mode. "
+        "Here is what I found in our knowledge base:\n\n" + "\n".join(excerpts)
+    )
+
+
+def invoke_with_breaker(breaker: CircuitBreaker, document_chain, retriever, question: str) -> dict:
+    """
+    Retrieve context, then run only the LLM step (document_chain) through the breaker.
+    When the breaker is open, or the LLM call fails, answer from the retrieved chunks
+    alone. Retriever errors are raised as-is and never count against the LLM breaker.
+    The result has the same shape as a retrieval chain's invoke() plus a "degraded" flag.
+    """
+    documents = retriever.invoke(question)
+
+    if breaker.allow_request():
+        try:
+            answer = document_chain.invoke({"input": question, "context": documents})
+            breaker.record_success()
+            return {"input": question, "context": documents, "answer": answer, "degraded": False}
+        except Exception as e:
+            print(f"LLM call failed ({breaker.name}): {e}")
+            breaker.record_failure(e)
+
+    breaker.record_degraded()
+    return {
+        "input": question,
+        "context": documents,
+        "answer": build_degraded_answer(documents),
+        "degraded": True,
+    }
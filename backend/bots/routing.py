@@ -0,0 +1,119 @@
+# routing.py
+"""
+In-memory bot routing table: bot id -> name, type and the bot instance serving it.
+
+The chat endpoints used to load the Bot row on every message and then pick
+the implementation by type. Routes are now cached for BOT_ROUTE_TTL_SECONDS,
+including "no such bot" answers, so a message reaches the retriever without a
+database round trip. Creating, updating or deleting a Bot in this process drops
+its route immediately; other processes pick the change up within the TTL.
+"""
+import os
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from database.database import Bot
+from database.sessions import session_local
+
+load_dotenv()
+
+BOT_ROUTE_TTL_SECONDS = float(os.getenv("BOT_ROUTE_TTL_SECONDS", "300"))
+
+
+class BotRoute(NamedTuple):
+    bot_id: int
+    name: str
+    bot_type: str
+    instance: object  # None when the type has no implementation
+
+
+def _resolve_bot_type(bot_type: str):
+    # Imported on first use: loading the bots builds their LLM clients and vector stores
+    from bot_loader import get_bot_by_type
+    return get_bot_by_type(bot_type)
+
+
+class BotRoutingTable:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = session_local,
+        resolve: Callable[[str], object] = _resolve_bot_type,
+        ttl_seconds: float = BOT_ROUTE_TTL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.resolve = resolve
+        self.ttl_seconds = ttl_seconds
+        self._routes = {}  # bot_id -> (expires_at, BotRoute or None)
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped on every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, bot_id: int) -> Optional[BotRoute]:
+        db = self.session_factory()
+        try:
+            row = db.query(Bot.name, Bot.bot_type).filter(Bot.id == bot_id).first()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        return BotRoute(bot_id, row.name, row.bot_type, self.resolve(row.bot_type))
+
+    def get(self, bot_id: int) -> Optional[BotRoute]:
+        """The route for `bot_id`, or None if there is no such bot."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._routes.get(bot_id)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        route = self._load(bot_id)
+        with self._lock:
+            # A change committed while loading may not be in `route`; let the next call reload
+            if generation == self._generation:
+                self._routes[bot_id] = (now + self.ttl_seconds, route)
+        return route
+
+    def invalidate(self, bot_id: int = None):
+        with self._lock:
+            self._generation += 1
+            if bot_id is None:
+                self._routes.clear()
+            else:
+                self._routes.pop(bot_id, None)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"routes": len(self._routes), "hits": self.hits, "misses": self.misses}
+
+
+bot_routes = BotRoutingTable()
+
+
+@event.listens_for(Bot, "after_insert")
+@event.listens_for(Bot, "after_update")
+@event.listens_for(Bot, "after_delete")
+def _invalidate_bot_route(mapper, connection, target):
+    bot_routes.invalidate(target.id)
+    # Again once committed, in case another request reloaded the old row in between
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_bot_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_bot_routes(session):
+    for bot_id in session.info.pop("changed_bot_ids", ()):
+        bot_routes.invalidate(bot_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_bot_routes(session):
+    session.info.pop("changed_bot_ids", None)
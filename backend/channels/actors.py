@@ -0,0 +1,116 @@
+# actors.py
+"""
+Per-conversation ordering for inbound channel messages.
+
+The webhook workers run claimed jobs concurrently, so two messages from the
+same user could be answered out of order (the second reply first, or both
+answered without the other's turn in the history). ConversationDispatcher
+gives every active conversation an actor: a mailbox drained by one task, so
+messages of a conversation run one at a time in the order they were submitted,
+while different conversations run in parallel.
+
+Mailboxes hold at most CONVERSATION_MAILBOX_SIZE messages; submitting to a full
+one raises MailboxFull, and the caller hands the job back to the queue for later.
+An actor with nothing to do for CONVERSATION_ACTOR_IDLE_SECONDS is stopped and
+forgotten, so memory follows the number of active conversations, not all of them.
+
+Ordering holds within one process; with several app processes a conversation's
+messages can still be claimed by different processes.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONVERSATION_MAILBOX_SIZE = int(os.getenv("CONVERSATION_MAILBOX_SIZE", "16"))
+CONVERSATION_ACTOR_IDLE_SECONDS = float(os.getenv("CONVERSATION_ACTOR_IDLE_SECONDS", "60"))
+
+
+class MailboxFull(Exception):
+    """The conversation already has a full mailbox of messages waiting."""
+
+
+class _Actor:
+    def __init__(self, dispatcher: "ConversationDispatcher", key: str):
+        self.dispatcher = dispatcher
+        self.key = key
+        self.mailbox: asyncio.Queue = asyncio.Queue(maxsize=dispatcher.mailbox_size)
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                work, args, future = await asyncio.wait_for(self.mailbox.get(), timeout=self.dispatcher.idle_seconds)
+            except asyncio.TimeoutError:
+                # Nothing can be submitted between this check and the removal (no await in between)
+                if self.mailbox.empty():
+                    self.dispatcher._evict(self)
+                    return
+                continue
+            if future.cancelled():
+                continue
+            try:
+                result = await work(*args)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            self.dispatcher.processed += 1
+
+
+class ConversationDispatcher:
+    def __init__(self, mailbox_size: int = CONVERSATION_MAILBOX_SIZE, idle_seconds: float = CONVERSATION_ACTOR_IDLE_SECONDS):
+        self.mailbox_size = mailbox_size
+        self.idle_seconds = idle_seconds
+        self._actors: Dict[str, _Actor] = {}
+        self.processed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def submit(self, key: str, work: Callable[..., Awaitable[Any]], *args) -> asyncio.Future:
+        """
+        Queue `await work(*args)` behind the earlier work of conversation `key`.
+        Not a coroutine, so calls made in order are queued in that order.
+        Returns a future for the result; raises MailboxFull if the mailbox is full.
+        """
+        actor = self._actors.get(key)
+        if actor is None:
+            actor = self._actors[key] = _Actor(self, key)
+        future = asyncio.get_running_loop().create_future()
+        try:
+            actor.mailbox.put_nowait((work, args, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise MailboxFull(f"conversation {key} has {self.mailbox_size} messages waiting")
+        return future
+
+    def _evict(self, actor: _Actor):
+        if self._actors.get(actor.key) is actor:
+            del self._actors[actor.key]
+            self.evicted += 1
+
+    async def stop(self):
+        """Cancel every actor; work still waiting in a mailbox is cancelled too."""
+        actors, self._actors = list(self._actors.values()), {}
+        for actor in actors:
+            actor.task.cancel()
+            while not actor.mailbox.empty():
+                actor.mailbox.get_nowait()[2].cancel()
+        await asyncio.gather(*(actor.task for actor in actors), return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        depths = [actor.mailbox.qsize() for actor in self._actors.values()]
+        return {
+            "actors": len(depths),
+            "queued": sum(depths),
+            "deepest_mailbox": max(depths, default=0),
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
@@ -23,6 +23,20 @@ class EmailMessageBuilder(MessageBuilderBase):
         """
         super().__init__(payload)
 
+    def _message_id(self):
+        """
+        The Message-ID header, given directly or inside the raw headers block
+        that SendGrid Inbound Parse posts.
+        """
+        message_id = self.payload.get("message_id") or self.payload.get("Message-ID")
+        if not message_id and self.payload.get("headers"):
+            for line in str(self.payload["headers"]).splitlines():
+                name, _, value = line.partition(":")
+                if name.strip().lower() == "message-id":
+                    message_id = value
+                    break
+        return message_id.strip() if message_id else None
+
     def build(self) -> StandardizedMessage:
         sender_id = self.payload.get("from") or self.payload.get("sender")
         if not sender_id:
@@ -62,5 +76,6 @@ class EmailMessageBuilder(MessageBuilderBase):
             content=content.strip(),
             conversation_id=conversation_id,
             attachments=attachments,
+            message_id=self._message_id(),
             metadata=self.payload # Store original email data
         )
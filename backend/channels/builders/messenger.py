@@ -1,13 +1,13 @@
-from .base import MessageBuilderBase
-from ..schemas import StandardizedMessage
+from .meta import MetaMessageBuilderBase
 from typing import Dict, Any
 
-class MessengerMessageBuilder(MessageBuilderBase):
+class MessengerMessageBuilder(MetaMessageBuilderBase):
     """
     Builds a StandardizedMessage from a raw Messenger webhook payload.
     Messenger uses Facebook Graph API for messaging.
     """
     CHANNEL_NAME = "messenger"
+    PLATFORM_LABEL = "Messenger"
 
     def __init__(self, payload: Dict[str, Any]):
         """
@@ -39,57 +39,20 @@ class MessengerMessageBuilder(MessageBuilderBase):
         """
         super().__init__(payload)
 
-    def build(self) -> StandardizedMessage:
-        entry = self.payload.get("entry", [])
-        if not entry:
-            raise ValueError("Missing 'entry' in Messenger payload")
-
-        # Get the first entry (usually there's only one)
-        first_entry = entry[0]
-        messaging = first_entry.get("messaging", [])
-        
-        if not messaging:
-            raise ValueError("Missing 'messaging' in Messenger entry")
-
-        # Get the first message
-        message_event = messaging[0]
-        sender = message_event.get("sender", {})
-        message = message_event.get("message", {})
-        
-        # Extract sender ID and message content
-        sender_id = sender.get("id")
-        if not sender_id:
-            raise ValueError("Missing sender ID in Messenger payload")
-
-        message_text = message.get("text", "")
-        if not message_text:
-            # Handle other message types (images, attachments, quick replies, etc.)
-            if "attachments" in message:
-                attachments = message["attachments"]
-                if attachments and len(attachments) > 0:
-                    attachment_type = attachments[0].get("type", "unknown")
-                    message_text = f"[{attachment_type.title()} attachment received]"
-                else:
-                    message_text = "[Media message received]"
-            elif "quick_reply" in message:
-                message_text = message["quick_reply"].get("payload", "[Quick reply]")
-            else:
-                message_text = "[Unsupported message type]"
-
-        # Generate conversation ID
-        conversation_id = self._generate_conversation_id(sender_id, self.CHANNEL_NAME)
+    def _non_text_content(self, message: Dict[str, Any]) -> str:
+        # Handle other message types (images, attachments, quick replies, etc.)
+        if "attachments" in message:
+            attachments = message["attachments"]
+            if attachments and len(attachments) > 0:
+                attachment_type = attachments[0].get("type", "unknown")
+                return f"[{attachment_type.title()} attachment received]"
+            return "[Media message received]"
+        if "quick_reply" in message:
+            return message["quick_reply"].get("payload", "[Quick reply]")
+        return "[Unsupported message type]"
 
-        # Try to get sender name from the payload (if available in postback or referral)
-        sender_name = f"Messenger User {sender_id[-8:]}"  # Use last 8 digits for privacy
-        
-        return StandardizedMessage(
-            conversation_id=conversation_id,
-            sender_id=sender_id,
-            content=message_text,
-            channel=self.CHANNEL_NAME,
-            sender_name=sender_name,
-            timestamp=message_event.get("timestamp", 0)
-        )
+    def _sender_name(self, sender_id: str) -> str:
+        return f"Messenger User {sender_id[-8:]}"  # Use last 8 digits for privacy
 
     def get_sender_psid(self) -> str:
         """
@@ -0,0 +1,80 @@
+from .base import MessageBuilderBase
+from ..schemas import StandardizedMessage
+from typing import Dict, Any, List, Optional
+
+class MetaMessageBuilderBase(MessageBuilderBase):
+    """
+    Shared parsing for Meta (Graph API) webhooks: Messenger and Instagram.
+
+    Meta batches events into one POST under load: several entries, each with
+    several messaging events, possibly from different users. build_all()
+    returns a StandardizedMessage for every message or postback in the batch;
+    delivery/read receipts and echoes of the page's own messages are skipped.
+    """
+    CHANNEL_NAME = None
+    PLATFORM_LABEL = None  # e.g. "Messenger", used in errors and sender names
+
+    def _non_text_content(self, message: Dict[str, Any]) -> str:
+        """Content for a message without text (attachments, stickers, ...)."""
+        if "attachments" in message:
+            return "[Media message received]"
+        return "[Unsupported message type]"
+
+    def _sender_name(self, sender_id: str) -> str:
+        return f"{self.PLATFORM_LABEL} User {sender_id}"
+
+    def _build_event(self, entry: Dict[str, Any], event: Dict[str, Any]) -> Optional[StandardizedMessage]:
+        sender_id = event.get("sender", {}).get("id")
+        if not sender_id:
+            return None
+
+        attachments = []
+        if "postback" in event:
+            # Button clicks and persistent menu selections
+            postback = event["postback"]
+            content = f"User clicked: {postback.get('payload', '')}"
+            message_id = postback.get("mid")
+        elif "message" in event:
+            message = event["message"]
+            if message.get("is_echo"):
+                return None
+            content = message.get("text") or self._non_text_content(message)
+            attachments = message.get("attachments", [])
+            message_id = message.get("mid")
+        else:
+            return None
+
+        return StandardizedMessage(
+            channel_name=self.CHANNEL_NAME,
+            sender_id=sender_id,
+            content=content,
+            conversation_id=self._generate_conversation_id(sender_id, self.CHANNEL_NAME),
+            attachments=attachments,
+            message_id=message_id,
+            metadata={
+                "entry_id": entry.get("id"),
+                "sender_name": self._sender_name(sender_id),
+                "timestamp": event.get("timestamp", 0),
+                "event": event,
+            },
+        )
+
+    def build_all(self) -> List[StandardizedMessage]:
+        entries = self.payload.get("entry", [])
+        if not entries:
+            raise ValueError(f"Missing 'entry' in {self.PLATFORM_LABEL} payload")
+
+        messages = []
+        for entry in entries:
+            for event in entry.get("messaging", []):
+                message = self._build_event(entry, event)
+                if message is not None:
+                    messages.append(message)
+        return messages
+
+    def build(self) -> StandardizedMessage:
+        """The first message in the payload; use build_all() for batched deliveries."""
+        messages = self.build_all()
+        if not messages:
+            raise ValueError(f"No messages in {self.PLATFORM_LABEL} payload")
+        return messages[0]
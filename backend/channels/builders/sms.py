@@ -39,5 +39,6 @@ class SmsMessageBuilder(MessageBuilderBase):
             content=content,
             conversation_id=conversation_id,
             attachments=[],
+            message_id=self.payload.get("MessageSid") or self.payload.get("SmsSid"),
             metadata=self.payload
         )
\ No newline at end of file
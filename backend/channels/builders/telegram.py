@@ -82,5 +82,6 @@ class TelegramMessageBuilder(MessageBuilderBase):
             content=content,
             conversation_id=conversation_id,
             attachments=[],
+            message_id=str(self.payload["update_id"]) if self.payload.get("update_id") is not None else None,
             metadata={**self.payload, "user_info": user_info}
         )
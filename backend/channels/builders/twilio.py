@@ -42,5 +42,6 @@ class TwilioMessageBuilder(MessageBuilderBase):
             content=content,
             conversation_id=conversation_id,
             attachments=[], # Twilio media handling would go here
+            message_id=self.payload.get("MessageSid") or self.payload.get("SmsSid"),
             metadata=self.payload # Store original payload in metadata
         )
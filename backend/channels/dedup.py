@@ -0,0 +1,117 @@
+# dedup.py
+"""
+Drops provider redeliveries of a webhook before any work is done for them.
+
+Twilio, Telegram, Meta and SendGrid all resend a webhook they think was not
+acknowledged, with the same provider message id. Each id is remembered for
+WEBHOOK_DEDUP_TTL_SECONDS: in Redis (SET NX EX, shared by every process) when
+REDIS_URL answers, otherwise in a bounded in-process map.
+"""
+import collections
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from channels.inbound_queue import REDIS_URL, connect_redis
+
+load_dotenv()
+
+WEBHOOK_DEDUP_TTL_SECONDS = int(os.getenv("WEBHOOK_DEDUP_TTL_SECONDS", "86400"))
+WEBHOOK_DEDUP_MAX_ENTRIES = int(os.getenv("WEBHOOK_DEDUP_MAX_ENTRIES", "100000"))
+
+REDIS_KEY_PREFIX = "webhooks:seen"
+
+
+class DeliveryDedup:
+    def __init__(
+        self,
+        redis_url: Optional[str] = REDIS_URL,
+        ttl_seconds: int = WEBHOOK_DEDUP_TTL_SECONDS,
+        max_entries: int = WEBHOOK_DEDUP_MAX_ENTRIES,
+    ):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._client = None
+        self._connected = False
+        self._seen = collections.OrderedDict()  # key -> expires_at, oldest first
+        self._lock = threading.Lock()
+        self.duplicates = 0
+        self.redis_errors = 0
+
+    def _redis(self):
+        # Connect on first use so importing this module opens nothing
+        with self._lock:
+            if not self._connected:
+                self._client = connect_redis(self.redis_url)
+                self._connected = True
+            return self._client
+
+    @staticmethod
+    def _key(channel: str, message_id: str) -> str:
+        return f"{channel}:{message_id}"
+
+    def _seen_locally(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._seen and next(iter(self._seen.values())) <= now:
+                self._seen.popitem(last=False)
+            if key in self._seen:
+                return True
+            while len(self._seen) >= self.max_entries:
+                self._seen.popitem(last=False)
+            self._seen[key] = now + self.ttl_seconds
+            return False
+
+    def seen(self, channel: str, message_id: Optional[str]) -> bool:
+        """
+        True if this delivery was already accepted within the TTL; otherwise
+        record it and return False. Messages without an id are never duplicates.
+        """
+        if not message_id:
+            return False
+        key = self._key(channel, message_id)
+        duplicate = None
+        client = self._redis()
+        if client is not None:
+            try:
+                duplicate = not client.set(f"{REDIS_KEY_PREFIX}:{key}", 1, nx=True, ex=self.ttl_seconds)
+            except Exception as e:
+                print(f"Webhook dedup: Redis error, using the in-process store: {e}")
+                with self._lock:
+                    self.redis_errors += 1
+        if duplicate is None:
+            duplicate = self._seen_locally(key)
+        if duplicate:
+            with self._lock:
+                self.duplicates += 1
+        return duplicate
+
+    def forget(self, channel: str, message_id: Optional[str]):
+        """Un-record a delivery that was not accepted after all, so the provider's retry gets through."""
+        if not message_id:
+            return
+        key = self._key(channel, message_id)
+        with self._lock:
+            self._seen.pop(key, None)
+        client = self._redis()
+        if client is not None:
+            try:
+                client.delete(f"{REDIS_KEY_PREFIX}:{key}")
+            except Exception as e:
+                print(f"Webhook dedup: Redis error forgetting {key}: {e}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "redis" if self._client is not None else "memory",
+                "tracked": len(self._seen),
+                "duplicates": self.duplicates,
+                "redis_errors": self.redis_errors,
+            }
+
+
+webhook_dedup = DeliveryDedup()
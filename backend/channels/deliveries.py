@@ -0,0 +1,232 @@
+# deliveries.py
+"""
+Persistent delivery of channel replies, with retries.
+
+A reply that failed to send used to be printed and dropped, even though its
+answer had already been generated and saved. Every reply is now recorded in
+outbound_deliveries (keyed to its conversation turn) before the first send.
+If the send fails, the row stays pending and a background loop retries it
+with exponential backoff, up to OUTBOUND_DELIVERY_MAX_ATTEMPTS, after which it
+is marked failed. Retries resend the stored text; the LLM is never asked again.
+
+answer_once() makes a queued message's answer idempotent as well: the turn and
+its pending delivery are committed together under a turn id derived from the
+message, so a webhook job retried after that commit finds the turn and returns
+without asking the LLM again or saving a second turn.
+"""
+import asyncio
+import datetime
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+
+from channels.schemas import StandardizedMessage
+from database.conversation_writer import build_turn_rows, conversation_writer
+from database.database import Conversation, OutboundDelivery
+from database.sessions import async_session_local
+
+load_dotenv()
+
+OUTBOUND_DELIVERY_MAX_ATTEMPTS = int(os.getenv("OUTBOUND_DELIVERY_MAX_ATTEMPTS", "8"))
+OUTBOUND_DELIVERY_RETRY_BASE_SECONDS = float(os.getenv("OUTBOUND_DELIVERY_RETRY_BASE_SECONDS", "30"))
+OUTBOUND_DELIVERY_RETRY_MAX_SECONDS = float(os.getenv("OUTBOUND_DELIVERY_RETRY_MAX_SECONDS", "3600"))
+OUTBOUND_DELIVERY_POLL_SECONDS = float(os.getenv("OUTBOUND_DELIVERY_POLL_SECONDS", "10"))
+OUTBOUND_DELIVERY_BATCH_SIZE = int(os.getenv("OUTBOUND_DELIVERY_BATCH_SIZE", "50"))
+# A delivery being attempted is not picked up by another process for this long
+OUTBOUND_DELIVERY_LEASE_SECONDS = float(os.getenv("OUTBOUND_DELIVERY_LEASE_SECONDS", "120"))
+
+# sender(recipient, text, **extras); raising or returning False means the send failed
+Sender = Callable[..., Awaitable[Any]]
+
+
+def message_turn_id(message: StandardizedMessage) -> str:
+    """Turn id for an inbound message, the same every time its job is retried."""
+    key = f"{message.channel_name}:{message.message_id}" if message.message_id else message.model_dump_json()
+    return uuid.uuid5(uuid.NAMESPACE_URL, key).hex
+
+
+class OutboundDeliveryQueue:
+    def __init__(
+        self,
+        session_factory=async_session_local,
+        max_attempts: int = OUTBOUND_DELIVERY_MAX_ATTEMPTS,
+        retry_base_seconds: float = OUTBOUND_DELIVERY_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = OUTBOUND_DELIVERY_RETRY_MAX_SECONDS,
+        poll_seconds: float = OUTBOUND_DELIVERY_POLL_SECONDS,
+        batch_size: int = OUTBOUND_DELIVERY_BATCH_SIZE,
+        lease_seconds: float = OUTBOUND_DELIVERY_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self._senders: Dict[str, Sender] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.retried = 0
+        self.deferred = 0
+        self.failed = 0
+
+    def register(self, channel: str, sender: Sender):
+        self._senders[channel] = sender
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+
+    def _pending(
+        self, channel: str, recipient: str, text: str, turn_id: str = None, user_id: int = None, **extras
+    ) -> OutboundDelivery:
+        return OutboundDelivery(
+            turn_id=turn_id,
+            user_id=user_id,
+            channel=channel,
+            recipient=recipient,
+            payload={"text": text, **extras},
+            status="pending",
+            attempts=0,
+            # Leased to the first attempt, so the retry loop leaves it alone meanwhile
+            next_attempt_at=datetime.datetime.utcnow() + datetime.timedelta(seconds=self.lease_seconds),
+        )
+
+    async def deliver(
+        self, channel: str, recipient: str, text: str, turn_id: str = None, user_id: int = None, **extras
+    ) -> bool:
+        """Record a reply and make the first attempt; False means it was left for a retry (or failed)."""
+        async with self.session_factory() as db:
+            delivery = self._pending(channel, recipient, text, turn_id, user_id, **extras)
+            db.add(delivery)
+            await db.commit()
+            return await self._attempt(db, delivery)
+
+    async def answer_once(
+        self,
+        db,
+        message: StandardizedMessage,
+        user_id: int,
+        channel: str,
+        answer: Callable[[str], Awaitable[str]],
+        recipient: Optional[str] = None,
+        **extras,
+    ) -> Optional[str]:
+        """
+        Answer a queued message with `await answer(question)`, then commit its turn
+        and (given a recipient) its pending reply in one transaction and make the
+        first send. Returns the answer, or None if an earlier run of the job already
+        committed them; a reply it left pending is sent by the retry loop.
+        """
+        turn_id = message_turn_id(message)
+        answered = (await db.execute(select(Conversation.id).where(Conversation.turn_id == turn_id).limit(1))).first()
+        if answered:
+            print(f"Message {turn_id} ({channel}) was already answered; not answering it again")
+            return None
+
+        text = await answer(message.content)
+        rows = build_turn_rows(user_id, None, message.content, text, channel, turn_id=turn_id)
+        delivery = self._pending(channel, recipient, text, turn_id, user_id, **extras) if recipient else None
+        await db.run_sync(conversation_writer.write_many_sync, rows, [delivery] if delivery else [])
+        if delivery is not None:
+            await self._attempt(db, delivery)
+        return text
+
+    async def _attempt(self, db, delivery: OutboundDelivery) -> bool:
+        extras = {k: v for k, v in delivery.payload.items() if k != "text"}
+        error = None
+        sender = self._senders.get(delivery.channel)
+        try:
+            if sender is None:
+                raise RuntimeError(f"no sender registered for channel '{delivery.channel}'")
+            if await sender(delivery.recipient, delivery.payload["text"], **extras) is False:
+                error = "send reported failure"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        now = datetime.datetime.utcnow()
+        delivery.attempts += 1
+        delivery.last_error = error
+        if error is None:
+            delivery.status = "sent"
+            delivery.delivered_at = now
+            delivery.next_attempt_at = None
+            self.sent += 1
+        elif delivery.attempts >= self.max_attempts:
+            print(f"Delivery {delivery.id} ({delivery.channel}) failed after {delivery.attempts} attempts: {error}")
+            delivery.status = "failed"
+            delivery.next_attempt_at = None
+            self.failed += 1
+        else:
+            delay = self.retry_delay(delivery.attempts)
+            print(f"Delivery {delivery.id} ({delivery.channel}) failed, retrying in {delay:.0f}s: {error}")
+            delivery.next_attempt_at = now + datetime.timedelta(seconds=delay)
+            self.deferred += 1
+        await db.commit()
+        return error is None
+
+    async def retry_due(self) -> int:
+        """Attempt every pending delivery whose retry time has come; returns how many were attempted."""
+        now = datetime.datetime.utcnow()
+        attempted = 0
+        async with self.session_factory() as db:
+            due = (await db.execute(
+                select(OutboundDelivery)
+                .where(OutboundDelivery.status == "pending", OutboundDelivery.next_attempt_at <= now)
+                .order_by(OutboundDelivery.next_attempt_at)
+                .limit(self.batch_size)
+            )).scalars().all()
+            for delivery in due:
+                # Claim it; another process may have picked it up since the select
+                claimed = await db.execute(
+                    update(OutboundDelivery)
+                    .where(
+                        OutboundDelivery.id == delivery.id,
+                        OutboundDelivery.status == "pending",
+                        OutboundDelivery.next_attempt_at == delivery.next_attempt_at,
+                    )
+                    .values(next_attempt_at=now + datetime.timedelta(seconds=self.lease_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                if claimed.rowcount != 1:
+                    continue
+                attempted += 1
+                self.retried += 1
+                await self._attempt(db, delivery)
+        return attempted
+
+    async def _run(self):
+        while True:
+            try:
+                await self.retry_due()
+            except Exception as e:
+                print(f"Outbound delivery retry loop error: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "sent": self.sent,
+            "deferred": self.deferred,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+outbound_deliveries = OutboundDeliveryQueue()
@@ -0,0 +1,267 @@
+# email_sender.py
+"""
+Outbound email for the email channel: a reused SendGrid client and a pooled SMTP sender.
+
+The SMTP fallback used to connect, run STARTTLS and log in for every reply.
+SMTPSender keeps SMTP_POOL_SIZE authenticated connections open, one per
+background worker. Workers take queued replies in batches of up to
+SMTP_BATCH_SIZE and send them back to back over their connection. A dropped
+connection is re-established and the message retried once. Connections idle
+for SMTP_MAX_IDLE_SECONDS, or used for SMTP_MAX_MESSAGES_PER_CONNECTION
+messages, are closed and reopened on demand.
+
+SendGridSender posts to the v3 API over one keep-alive HTTP session, with at
+most SENDGRID_MAX_CONCURRENCY sends in flight.
+"""
+import os
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_BATCH_SIZE = int(os.getenv("SMTP_BATCH_SIZE", "20"))
+SMTP_MAX_IDLE_SECONDS = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "60"))
+# Many providers cap messages per session (Gmail ~100); reconnect before hitting it
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+SMTP_QUEUE_MAX = int(os.getenv("SMTP_QUEUE_MAX", "1000"))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+SENDGRID_MAX_CONCURRENCY = int(os.getenv("SENDGRID_MAX_CONCURRENCY", "8"))
+SENDGRID_TIMEOUT_SECONDS = float(os.getenv("SENDGRID_TIMEOUT_SECONDS", "10"))
+
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# SMTP errors after which the connection is unusable (as are socket errors); any other
+# SMTPException, e.g. a refused recipient, only fails that message
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPHeloError)
+
+# Put on the queue to wake a worker when stopping
+_STOP = object()
+
+
+class PooledSMTPConnection:
+    """One authenticated SMTP session that reconnects when it has gone away."""
+
+    def __init__(self, sender: "SMTPSender"):
+        self.sender = sender
+        self.smtp: Optional[smtplib.SMTP] = None
+        self.messages = 0
+        self.last_used = 0.0
+
+    def _connect(self):
+        smtp = self.sender.connect(self.sender.host, self.sender.port, timeout=SMTP_TIMEOUT_SECONDS)
+        smtp.starttls()
+        if self.sender.username:
+            smtp.login(self.sender.username, self.sender.password)
+        self.smtp = smtp
+        self.messages = 0
+        self.sender._count("connects")
+
+    def close(self):
+        if self.smtp is not None:
+            smtp, self.smtp = self.smtp, None
+            try:
+                smtp.quit()
+            except Exception:
+                smtp.close()
+
+    def send(self, from_addr: str, to_addr: str, message: str):
+        if self.smtp is not None and (
+            self.messages >= SMTP_MAX_MESSAGES_PER_CONNECTION or time.monotonic() - self.last_used > SMTP_MAX_IDLE_SECONDS
+        ):
+            # The server has probably dropped an idle session already
+            self.close()
+        for attempt in (1, 2):
+            if self.smtp is None:
+                self._connect()
+            try:
+                self.smtp.sendmail(from_addr, to_addr, message)
+                break
+            except OSError as e:  # SMTPException is an OSError
+                if isinstance(e, smtplib.SMTPException) and not isinstance(e, CONNECTION_ERRORS):
+                    raise
+                self.close()
+                if attempt == 2:
+                    raise
+                self.sender._count("reconnects")
+            finally:
+                self.messages += 1
+                self.last_used = time.monotonic()
+
+
+class SMTPSender:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str],
+        password: Optional[str],
+        pool_size: int = SMTP_POOL_SIZE,
+        batch_size: int = SMTP_BATCH_SIZE,
+        max_queue: int = SMTP_QUEUE_MAX,
+        connect: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.connect = connect
+        self._queue: "queue.Queue[Tuple[str, str, str, Future]]" = queue.Queue(maxsize=max_queue)
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.connects = 0
+        self.reconnects = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host and self.username and self.password)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def start(self):
+        with self._start_lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.pool_size):
+                thread = threading.Thread(target=self._run, name=f"smtp-sender-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, from_addr: str, to_addr: str, message: str) -> Future:
+        """Queue a message; the future resolves to True once the server accepted it."""
+        self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait((from_addr, to_addr, message, future))
+        except queue.Full:
+            self._count("failed")
+            future.set_exception(RuntimeError("SMTP send queue is full"))
+        return future
+
+    def send(self, from_addr: str, to_addr: str, message: str, timeout: float = SMTP_TIMEOUT_SECONDS * 2) -> bool:
+        """Queue a message and wait for the result."""
+        return self.submit(from_addr, to_addr, message).result(timeout=timeout)
+
+    def _collect_batch(self) -> Optional[list]:
+        try:
+            first = self._queue.get(timeout=SMTP_MAX_IDLE_SECONDS)
+        except queue.Empty:
+            return []
+        if first is _STOP:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Leave it for this worker's next loop, after the batch is sent
+                self._queue.put(item)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        connection = PooledSMTPConnection(self)
+        try:
+            while True:
+                batch = self._collect_batch()
+                if batch is None:
+                    return
+                if not batch:
+                    connection.close()  # idle; reconnect on the next message
+                    continue
+                for from_addr, to_addr, message, future in batch:
+                    try:
+                        connection.send(from_addr, to_addr, message)
+                    except Exception as e:
+                        print(f"ERROR: SMTP send to {to_addr} failed: {e}")
+                        self._count("failed")
+                        future.set_exception(e)
+                    else:
+                        self._count("sent")
+                        future.set_result(True)
+                self._count("batches")
+        finally:
+            connection.close()
+
+    def stop(self, timeout: float = 30.0):
+        """Send everything already queued, then close the connections."""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": len([t for t in self._threads if t.is_alive()]),
+                "queued": self._queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "batches": self.batches,
+                "connects": self.connects,
+                "reconnects": self.reconnects,
+            }
+
+
+class SendGridSender:
+    """SendGrid v3 mail sends over a shared keep-alive session, at most `max_concurrency` at a time."""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        max_concurrency: int = SENDGRID_MAX_CONCURRENCY,
+        timeout_seconds: float = SENDGRID_TIMEOUT_SECONDS,
+        session: Optional[requests.Session] = None,
+    ):
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.session = session or requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency))
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+        self.sent = 0
+        self.failed = 0
+        self.saturated = 0
+
+    def send(self, mail) -> int:
+        """Send a sendgrid.helpers.mail.Mail; returns the HTTP status, raising on errors."""
+        if not self._slots.acquire(timeout=self.timeout_seconds):
+            with self._lock:
+                self.saturated += 1
+            raise RuntimeError("SendGrid concurrency limit reached")
+        try:
+            response = self.session.post(SENDGRID_SEND_URL, json=mail.get(), timeout=self.timeout_seconds)
+            response.raise_for_status()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            self._slots.release()
+        with self._lock:
+            self.sent += 1
+        return response.status_code
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"sent": self.sent, "failed": self.failed, "saturated": self.saturated}
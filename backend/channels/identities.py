@@ -0,0 +1,178 @@
+# identities.py
+"""
+Maps channel senders to users through the channel_identities table.
+
+Telegram, Instagram and Messenger messages used to be attributed to whichever
+user the database returned first, and Twilio and email queried users by phone
+number or address for every message. Each sender is now a (channel,
+external_id) row, found through its unique index, and the user id behind it is
+kept in a bounded in-process LRU cache for CHANNEL_IDENTITY_CACHE_TTL_SECONDS,
+so a returning sender costs no query.
+
+A sender seen for the first time is linked to the registered user with the same
+phone number (twilio, sms) or email address (email, web) if there is one, and
+otherwise gets a guest user of its own. Registering later takes over the guest
+identities for that phone number and address (claim_identities). Other
+processes still have the guest cached until the entry expires.
+"""
+import collections
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from channels.schemas import StandardizedMessage
+from database.database import ChannelIdentity, User
+
+load_dotenv()
+
+CHANNEL_IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("CHANNEL_IDENTITY_CACHE_MAX_ENTRIES", "100000"))
+CHANNEL_IDENTITY_CACHE_TTL_SECONDS = float(os.getenv("CHANNEL_IDENTITY_CACHE_TTL_SECONDS", "300"))
+
+# Channels whose sender id is something a registered user has on their account
+PHONE_CHANNELS = ("twilio", "sms")
+EMAIL_CHANNELS = ("email", "web")
+
+
+def display_name(message: StandardizedMessage) -> Optional[str]:
+    """The sender's name as the channel reports it, used to name guest users."""
+    user_info = message.metadata.get("user_info") or {}
+    name = " ".join(part for part in (user_info.get("first_name"), user_info.get("last_name")) if part)
+    return message.metadata.get("sender_name") or name or None
+
+
+class ChannelIdentityResolver:
+    def __init__(
+        self, max_entries: int = CHANNEL_IDENTITY_CACHE_MAX_ENTRIES, ttl_seconds: float = CHANNEL_IDENTITY_CACHE_TTL_SECONDS
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # (channel, external_id) -> (expires_at, user_id)
+        self._cache: "collections.OrderedDict[Tuple[str, str], Tuple[float, int]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.linked = 0
+        self.guests = 0
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._cache[key]
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _remember(self, key: Tuple[str, str], user_id: int):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl_seconds, user_id)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def forget(self, channel: str, external_id: str):
+        with self._lock:
+            self._cache.pop((channel, external_id), None)
+
+    @staticmethod
+    async def _registered_user_id(db, channel: str, external_id: str) -> Optional[int]:
+        if channel in PHONE_CHANNELS:
+            column = User.phone_number
+        elif channel in EMAIL_CHANNELS:
+            column = User.email
+        else:
+            return None
+        return (await db.execute(select(User.id).where(column == external_id))).scalars().first()
+
+    async def resolve(
+        self, db, channel: str, external_id: str, name: Optional[str] = None, create_guest: bool = True
+    ) -> Optional[int]:
+        """
+        The user id behind a channel sender. Unknown senders are linked to a
+        registered user, else to a new guest user (or None if `create_guest` is False).
+        """
+        key = (channel, external_id)
+        user_id = self._cached(key)
+        if user_id is not None:
+            return user_id
+
+        query = select(ChannelIdentity.user_id).where(
+            ChannelIdentity.channel == channel, ChannelIdentity.external_id == external_id
+        )
+        user_id = (await db.execute(query)).scalars().first()
+        if user_id is None:
+            user_id = await self._registered_user_id(db, channel, external_id)
+            if user_id is None and not create_guest:
+                return None
+            is_guest = user_id is None
+            try:
+                if is_guest:
+                    guest = User(name=name or f"{channel.title()} guest {external_id}")
+                    db.add(guest)
+                    await db.flush()
+                    user_id = guest.id
+                db.add(ChannelIdentity(channel=channel, external_id=external_id, user_id=user_id))
+                await db.commit()
+            except IntegrityError:
+                # Another process linked this sender first; use its identity
+                await db.rollback()
+                user_id = (await db.execute(query)).scalars().one()
+            else:
+                if is_guest:
+                    self.guests += 1
+                else:
+                    self.linked += 1
+
+        self._remember(key, user_id)
+        return user_id
+
+    async def resolve_message(self, db, message: StandardizedMessage, create_guest: bool = True) -> Optional[int]:
+        return await self.resolve(db, message.channel_name, message.sender_id, display_name(message), create_guest)
+
+    def claim_identities(self, db: Session, user: User) -> int:
+        """Move identities for `user`'s phone number and email address onto `user`; returns how many moved."""
+        matches = []
+        if user.phone_number:
+            matches.append(ChannelIdentity.channel.in_(PHONE_CHANNELS) & (ChannelIdentity.external_id == user.phone_number))
+        if user.email:
+            matches.append(ChannelIdentity.channel.in_(EMAIL_CHANNELS) & (ChannelIdentity.external_id == user.email))
+        if not matches:
+            return 0
+        claimed = db.execute(
+            select(ChannelIdentity.channel, ChannelIdentity.external_id)
+            .where(or_(*matches), ChannelIdentity.user_id != user.id)
+        ).all()
+        if claimed:
+            db.execute(
+                update(ChannelIdentity)
+                .where(or_(*matches))
+                .values(user_id=user.id)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            for channel, external_id in claimed:
+                self.forget(channel, external_id)
+        return len(claimed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "linked": self.linked,
+                "guests": self.guests,
+            }
+
+
+channel_identities = ChannelIdentityResolver()
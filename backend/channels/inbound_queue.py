@@ -0,0 +1,380 @@
+# inbound_queue.py
+"""
+Durable storage for inbound channel messages waiting to be answered.
+
+Webhook handlers persist the StandardizedMessage here and acknowledge the
+provider straight away; channels.workers consumes it. Two backends:
+
+- RedisStreamQueue: one stream per channel read through a consumer group,
+  used when REDIS_URL is set and reachable. Retries wait in a sorted set and
+  dead letters go to a capped list.
+- SQLiteQueue: a webhook_jobs table in a local SQLite file (WEBHOOK_QUEUE_PATH),
+  the fallback when Redis is unavailable.
+
+A claimed job is leased for WEBHOOK_LEASE_SECONDS, and the workers extend the
+lease while the job waits or runs. If the process dies before acknowledging it,
+the job is handed out again once the lease runs out, so every message is
+processed at least once.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from channels.schemas import StandardizedMessage
+
+load_dotenv()
+
+# "auto" uses Redis when REDIS_URL answers a ping, otherwise SQLite
+WEBHOOK_QUEUE_BACKEND = os.getenv("WEBHOOK_QUEUE_BACKEND", "auto").lower()
+WEBHOOK_QUEUE_PATH = os.getenv("WEBHOOK_QUEUE_PATH", "webhook_queue.db")
+WEBHOOK_LEASE_SECONDS = float(os.getenv("WEBHOOK_LEASE_SECONDS", "300"))
+WEBHOOK_DEAD_LETTER_MAX = int(os.getenv("WEBHOOK_DEAD_LETTER_MAX", "10000"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+REDIS_KEY_PREFIX = "webhooks"
+REDIS_GROUP = "webhook-workers"
+
+
+class WebhookJob(NamedTuple):
+    job_id: str
+    channel: str
+    message: StandardizedMessage
+    attempts: int  # deliveries so far, including this one
+
+
+def _dump(message: StandardizedMessage) -> str:
+    return message.model_dump_json()
+
+
+def _load(payload: str) -> StandardizedMessage:
+    return StandardizedMessage.model_validate_json(payload)
+
+
+class SQLiteQueue:
+    """Webhook jobs in a local SQLite table; safe to share between processes on one host."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = WEBHOOK_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_webhook_jobs_claim ON webhook_jobs (status, channel, available_at)"
+        )
+
+    def enqueue(self, message: StandardizedMessage) -> str:
+        return self.enqueue_many([message])[0]
+
+    def enqueue_many(self, messages: List[StandardizedMessage]) -> List[str]:
+        """Store several messages in one transaction; returns their job ids in order."""
+        now = time.time()
+        job_ids = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for message in messages:
+                    cursor = self._conn.execute(
+                        "INSERT INTO webhook_jobs (channel, payload, available_at, created_at) VALUES (?, ?, ?, ?)",
+                        (message.channel_name, _dump(message), now, now),
+                    )
+                    job_ids.append(str(cursor.lastrowid))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_ids
+
+    def claim(self, channel: str, limit: int, lease_seconds: float = WEBHOOK_LEASE_SECONDS) -> List[WebhookJob]:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes cannot claim the same rows
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, payload, attempts FROM webhook_jobs"
+                    " WHERE status = 'pending' AND channel = ? AND available_at <= ? ORDER BY id LIMIT ?",
+                    (channel, now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE webhook_jobs SET attempts = attempts + 1, available_at = ? WHERE id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [WebhookJob(str(job_id), channel, _load(payload), attempts + 1) for job_id, payload, attempts in rows]
+
+    def ack(self, job: WebhookJob):
+        with self._lock:
+            self._conn.execute("DELETE FROM webhook_jobs WHERE id = ?", (int(job.job_id),))
+
+    def retry(self, job: WebhookJob, error: str, delay_seconds: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE webhook_jobs SET available_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay_seconds, error, int(job.job_id)),
+            )
+
+    def extend(self, jobs: List[WebhookJob], lease_seconds: float = WEBHOOK_LEASE_SECONDS):
+        """Push back the lease of jobs still being worked on."""
+        until = time.time() + lease_seconds
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE webhook_jobs SET available_at = ? WHERE id = ? AND status = 'pending'",
+                [(until, int(job.job_id)) for job in jobs],
+            )
+
+    def release(self, job: WebhookJob, delay_seconds: float):
+        """Hand a claimed job back unprocessed, without counting the attempt."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE webhook_jobs SET available_at = ?, attempts = attempts - 1 WHERE id = ?",
+                (time.time() + delay_seconds, int(job.job_id)),
+            )
+
+    def dead_letter(self, job: WebhookJob, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE webhook_jobs SET status = 'dead', last_error = ? WHERE id = ?", (error, int(job.job_id))
+            )
+            # Keep the newest WEBHOOK_DEAD_LETTER_MAX dead letters
+            self._conn.execute(
+                "DELETE FROM webhook_jobs WHERE status = 'dead' AND id NOT IN"
+                " (SELECT id FROM webhook_jobs WHERE status = 'dead' ORDER BY id DESC LIMIT ?)",
+                (WEBHOOK_DEAD_LETTER_MAX,),
+            )
+
+    def dead_letters(self, limit: int = 100) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, channel, payload, attempts, last_error FROM webhook_jobs"
+                " WHERE status = 'dead' ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"job_id": str(job_id), "channel": channel, "message": json.loads(payload), "attempts": attempts, "error": error}
+            for job_id, channel, payload, attempts, error in rows
+        ]
+
+    def requeue_dead(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE webhook_jobs SET status = 'pending', attempts = 0, available_at = ?, last_error = NULL"
+                " WHERE id = ? AND status = 'dead'",
+                (time.time(), int(job_id)),
+            )
+        return cursor.rowcount == 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT channel, status, COUNT(*) FROM webhook_jobs GROUP BY channel, status"
+            ).fetchall()
+        depth = {}
+        dead = 0
+        for channel, status, count in rows:
+            if status == "dead":
+                dead += count
+            else:
+                depth[channel] = count
+        return {"backend": self.name, "depth": depth, "dead_letters": dead}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStreamQueue:
+    """Webhook jobs in Redis Streams, one stream per channel, consumed through a consumer group."""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = REDIS_KEY_PREFIX, group: str = REDIS_GROUP, consumer: str = None):
+        self.client = client
+        self.prefix = prefix
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._groups = set()
+        self._lock = threading.Lock()
+
+    def _stream(self, channel: str) -> str:
+        return f"{self.prefix}:{channel}"
+
+    @property
+    def _delayed_key(self) -> str:
+        return f"{self.prefix}:delayed"
+
+    @property
+    def _dead_key(self) -> str:
+        return f"{self.prefix}:dead"
+
+    def _ensure_group(self, stream: str):
+        if stream in self._groups:
+            return
+        try:
+            self.client.xgroup_create(stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        with self._lock:
+            self._groups.add(stream)
+
+    def _add(self, channel: str, payload: str, attempts: int) -> str:
+        stream = self._stream(channel)
+        self._ensure_group(stream)
+        entry_id = self.client.xadd(stream, {"payload": payload, "attempts": attempts})
+        return entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+
+    def enqueue(self, message: StandardizedMessage) -> str:
+        return self._add(message.channel_name, _dump(message), 0)
+
+    def enqueue_many(self, messages: List[StandardizedMessage]) -> List[str]:
+        """Add several messages in one round trip; returns their entry ids in order."""
+        for channel in {message.channel_name for message in messages}:
+            self._ensure_group(self._stream(channel))
+        pipe = self.client.pipeline(transaction=False)
+        for message in messages:
+            pipe.xadd(self._stream(message.channel_name), {"payload": _dump(message), "attempts": 0})
+        return [entry_id.decode() if isinstance(entry_id, bytes) else entry_id for entry_id in pipe.execute()]
+
+    def _promote_due(self):
+        """Move retries whose delay has passed back onto their stream."""
+        due = self.client.zrangebyscore(self._delayed_key, "-inf", time.time(), start=0, num=100)
+        for member in due:
+            # ZREM succeeds for exactly one process, so a retry is re-added once
+            if not self.client.zrem(self._delayed_key, member):
+                continue
+            entry = json.loads(member)
+            self._add(entry["channel"], entry["payload"], entry["attempts"])
+
+    def _job(self, channel: str, entry_id, fields: dict) -> WebhookJob:
+        fields = {(k.decode() if isinstance(k, bytes) else k): v for k, v in fields.items()}
+        payload = fields["payload"].decode() if isinstance(fields["payload"], bytes) else fields["payload"]
+        entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+        return WebhookJob(entry_id, channel, _load(payload), int(fields.get("attempts", 0)) + 1)
+
+    def claim(self, channel: str, limit: int, lease_seconds: float = WEBHOOK_LEASE_SECONDS) -> List[WebhookJob]:
+        stream = self._stream(channel)
+        self._ensure_group(stream)
+        self._promote_due()
+        jobs = []
+        # Entries left unacknowledged by a consumer that went away
+        _, stale, *_ = self.client.xautoclaim(
+            stream, self.group, self.consumer, min_idle_time=int(lease_seconds * 1000), start_id="0-0", count=limit
+        )
+        jobs.extend(self._job(channel, entry_id, fields) for entry_id, fields in stale if fields)
+        if len(jobs) < limit:
+            for _, entries in self.client.xreadgroup(self.group, self.consumer, {stream: ">"}, count=limit - len(jobs)) or []:
+                jobs.extend(self._job(channel, entry_id, fields) for entry_id, fields in entries)
+        return jobs
+
+    def _remove(self, job: WebhookJob):
+        stream = self._stream(job.channel)
+        self.client.xack(stream, self.group, job.job_id)
+        self.client.xdel(stream, job.job_id)
+
+    def ack(self, job: WebhookJob):
+        self._remove(job)
+
+    def retry(self, job: WebhookJob, error: str, delay_seconds: float):
+        entry = json.dumps({
+            "channel": job.channel, "payload": _dump(job.message), "attempts": job.attempts, "error": error,
+        })
+        self.client.zadd(self._delayed_key, {entry: time.time() + delay_seconds})
+        self._remove(job)
+
+    def extend(self, jobs: List[WebhookJob], lease_seconds: float = WEBHOOK_LEASE_SECONDS):
+        # Re-claiming by the same consumer resets the entries' idle time, which is what xautoclaim checks
+        pipe = self.client.pipeline(transaction=False)
+        for job in jobs:
+            pipe.xclaim(self._stream(job.channel), self.group, self.consumer, 0, [job.job_id], justid=True)
+        pipe.execute()
+
+    def release(self, job: WebhookJob, delay_seconds: float):
+        self.retry(job._replace(attempts=job.attempts - 1), None, delay_seconds)
+
+    def dead_letter(self, job: WebhookJob, error: str):
+        entry = json.dumps({
+            "job_id": job.job_id, "channel": job.channel, "message": json.loads(_dump(job.message)),
+            "attempts": job.attempts, "error": error,
+        })
+        self.client.lpush(self._dead_key, entry)
+        self.client.ltrim(self._dead_key, 0, WEBHOOK_DEAD_LETTER_MAX - 1)
+        self._remove(job)
+
+    def dead_letters(self, limit: int = 100) -> List[dict]:
+        return [json.loads(entry) for entry in self.client.lrange(self._dead_key, 0, limit - 1)]
+
+    def requeue_dead(self, job_id: str) -> bool:
+        for entry in self.client.lrange(self._dead_key, 0, -1):
+            letter = json.loads(entry)
+            if letter["job_id"] == job_id and self.client.lrem(self._dead_key, 1, entry):
+                self._add(letter["channel"], json.dumps(letter["message"]), 0)
+                return True
+        return False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            streams = sorted(self._groups)
+        depth = {stream.split(":", 1)[1]: self.client.xlen(stream) for stream in streams}
+        return {
+            "backend": self.name,
+            "depth": depth,
+            "delayed": self.client.zcard(self._delayed_key),
+            "dead_letters": self.client.llen(self._dead_key),
+        }
+
+    def close(self):
+        self.client.close()
+
+
+def connect_redis(url: Optional[str]):
+    """A connected Redis client for `url`, or None if Redis is not installed or not answering."""
+    if not url:
+        return None
+    try:
+        import redis
+
+        client = redis.Redis.from_url(url, socket_connect_timeout=2, socket_timeout=5)
+        client.ping()
+        return client
+    except Exception as e:
+        print(f"Redis at {url} unavailable ({e})")
+        return None
+
+
+def create_queue(backend: str = WEBHOOK_QUEUE_BACKEND, redis_url: Optional[str] = REDIS_URL, path: str = WEBHOOK_QUEUE_PATH):
+    """The configured queue backend, falling back to SQLite when Redis cannot be reached."""
+    if backend in ("auto", "redis"):
+        client = connect_redis(redis_url)
+        if client is not None:
+            print("Webhook queue: using Redis Streams")
+            return RedisStreamQueue(client)
+        if backend == "redis":
+            print("Webhook queue: falling back to SQLite")
+    print(f"Webhook queue: using SQLite at {path}")
+    return SQLiteQueue(path)
@@ -0,0 +1,181 @@
+# outbound.py
+"""
+Shared HTTP transport for replies sent to channel platforms (Telegram, Instagram, Messenger).
+
+One httpx.AsyncClient keeps connections to each platform alive (HTTP/2 when
+the h2 package is installed), instead of a new TCP+TLS handshake per reply.
+On top of it, each platform gets its own timeout and a token-bucket rate
+limit. Connection errors, timeouts, 429s and 5xx responses are retried with
+jittered exponential backoff; a 429's Retry-After is respected.
+"""
+import asyncio
+import collections
+import os
+import random
+import time
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OUTBOUND_MAX_CONNECTIONS = int(os.getenv("OUTBOUND_MAX_CONNECTIONS", "100"))
+OUTBOUND_MAX_KEEPALIVE = int(os.getenv("OUTBOUND_MAX_KEEPALIVE", "20"))
+OUTBOUND_KEEPALIVE_SECONDS = float(os.getenv("OUTBOUND_KEEPALIVE_SECONDS", "60"))
+OUTBOUND_HTTP2 = os.getenv("OUTBOUND_HTTP2", "True").lower() == "true"
+# Defaults for every platform, with overrides such as "telegram=30,messenger=50"
+OUTBOUND_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_TIMEOUT_SECONDS", "10"))
+OUTBOUND_TIMEOUTS = os.getenv("OUTBOUND_TIMEOUTS", "")
+OUTBOUND_RATE_PER_SECOND = float(os.getenv("OUTBOUND_RATE_PER_SECOND", "20"))
+OUTBOUND_RATE_LIMITS = os.getenv("OUTBOUND_RATE_LIMITS", "telegram=30")
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+OUTBOUND_RETRY_BASE_SECONDS = float(os.getenv("OUTBOUND_RETRY_BASE_SECONDS", "0.5"))
+OUTBOUND_RETRY_MAX_SECONDS = float(os.getenv("OUTBOUND_RETRY_MAX_SECONDS", "10"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_overrides(spec: str) -> Dict[str, float]:
+    """{"telegram": 30.0} from "telegram=30"; malformed entries are ignored."""
+    overrides = {}
+    for item in spec.split(","):
+        platform, _, value = item.partition("=")
+        try:
+            overrides[platform.strip()] = float(value)
+        except ValueError:
+            continue
+    overrides.pop("", None)
+    return overrides
+
+
+def _http2_available() -> bool:
+    if not OUTBOUND_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("Outbound HTTP: h2 not installed, using HTTP/1.1 keep-alive")
+        return False
+
+
+class RateLimiter:
+    """Token bucket; callers over the rate wait for their turn rather than fail."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None):
+        self.rate = rate_per_second
+        self.burst = burst if burst is not None else max(1.0, rate_per_second)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waits = 0
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # No await before the reservation, so concurrent callers queue up in order
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            self.waits += 1
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class OutboundClient:
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        timeout_seconds: float = OUTBOUND_TIMEOUT_SECONDS,
+        timeouts: Optional[Dict[str, float]] = None,
+        rate_per_second: float = OUTBOUND_RATE_PER_SECOND,
+        rate_limits: Optional[Dict[str, float]] = None,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+        retry_base_seconds: float = OUTBOUND_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = OUTBOUND_RETRY_MAX_SECONDS,
+    ):
+        self.transport = transport
+        self.timeout_seconds = timeout_seconds
+        self.timeouts = parse_overrides(OUTBOUND_TIMEOUTS) if timeouts is None else timeouts
+        self.rate_per_second = rate_per_second
+        self.rate_limits = parse_overrides(OUTBOUND_RATE_LIMITS) if rate_limits is None else rate_limits
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiters: Dict[str, RateLimiter] = {}
+        self.stats = collections.defaultdict(collections.Counter)  # platform -> counters
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Built on first use, inside the event loop that will use it
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.transport is None and _http2_available(),
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=OUTBOUND_MAX_CONNECTIONS,
+                    max_keepalive_connections=OUTBOUND_MAX_KEEPALIVE,
+                    keepalive_expiry=OUTBOUND_KEEPALIVE_SECONDS,
+                ),
+            )
+        return self._client
+
+    def _limiter(self, platform: str) -> RateLimiter:
+        if platform not in self._limiters:
+            self._limiters[platform] = RateLimiter(self.rate_limits.get(platform, self.rate_per_second))
+        return self._limiters[platform]
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.retry_max_seconds)
+        # Full jitter, so a burst of failed replies does not retry in lockstep
+        return random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+
+    async def post(self, platform: str, url: str, **kwargs) -> httpx.Response:
+        """
+        POST to a platform API with its timeout, rate limit and retries. Returns
+        the final response (which may still be an error status) or raises the
+        last transport error once retries are used up.
+        """
+        timeout = self.timeouts.get(platform, self.timeout_seconds)
+        stats = self.stats[platform]
+        for attempt in range(self.max_retries + 1):
+            await self._limiter(platform).acquire()
+            response = None
+            stats["requests"] += 1
+            try:
+                response = await self._get_client().post(url, timeout=timeout, **kwargs)
+            except httpx.TransportError as e:
+                stats["transport_errors"] += 1
+                if attempt == self.max_retries:
+                    stats["failures"] += 1
+                    raise
+                print(f"Outbound {platform}: {type(e).__name__}, retrying")
+            else:
+                if response.status_code not in RETRYABLE_STATUS or attempt == self.max_retries:
+                    if response.is_error:
+                        stats["failures"] += 1
+                    return response
+                print(f"Outbound {platform}: HTTP {response.status_code}, retrying")
+            stats["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def close(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    def snapshot(self) -> dict:
+        return {
+            "open": self._client is not None,
+            "platforms": {
+                platform: {**counters, "rate_limited": self._limiters[platform].waits if platform in self._limiters else 0}
+                for platform, counters in self.stats.items()
+            },
+        }
+
+
+outbound_client = OutboundClient()
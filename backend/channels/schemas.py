@@ -13,4 +13,5 @@ class StandardizedMessage(BaseModel):
 
     # Optional fields
     attachments: Optional[list] = None
+    message_id: Optional[str] = None  # Provider's id for this delivery; the same on redeliveries
     metadata: Optional[Dict[str, Any]] = None
@@ -0,0 +1,344 @@
+# workers.py
+"""
+Worker pool that answers inbound channel messages from the durable queue.
+
+Runs on the application's event loop. A dispatcher claims jobs for every
+channel with a registered handler, keeping at most WEBHOOK_WORKERS conversations
+in flight overall and at most the channel's limit per channel, so a slow provider
+(or a burst on one channel) cannot take every worker. A handler that raises is
+retried with exponential backoff; after WEBHOOK_MAX_ATTEMPTS deliveries the job
+is moved to the dead-letter list, where admins can inspect and requeue it.
+
+Claimed jobs are handed to a ConversationDispatcher in claim (i.e. arrival)
+order, so messages of one conversation are answered one at a time and in order
+while other conversations proceed in parallel. A conversation counts once
+against the limits however many of its messages wait in its mailbox, so one
+chatty sender does not hold back everyone else. When a message is handed back
+to the queue (its mailbox was full, or its handler failed and will be retried),
+the conversation's later messages are handed back too until it returns, so they
+cannot overtake it. Leases of jobs waiting in a mailbox or running are extended
+every third of WEBHOOK_LEASE_SECONDS, so a long wait behind slow answers does not
+get the job handed out (and answered) a second time.
+"""
+import asyncio
+import bisect
+import collections
+import itertools
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from channels.actors import ConversationDispatcher, MailboxFull
+from channels.inbound_queue import WEBHOOK_LEASE_SECONDS, WebhookJob, create_queue
+from channels.schemas import StandardizedMessage
+
+load_dotenv()
+
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+# Default per-channel limit, with optional overrides such as "email=2,telegram=4"
+WEBHOOK_CHANNEL_CONCURRENCY = int(os.getenv("WEBHOOK_CHANNEL_CONCURRENCY", "4"))
+WEBHOOK_CHANNEL_LIMITS = os.getenv("WEBHOOK_CHANNEL_LIMITS", "")
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+WEBHOOK_RETRY_BASE_SECONDS = float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "2"))
+WEBHOOK_RETRY_MAX_SECONDS = float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", "300"))
+# How often an idle dispatcher looks for work enqueued by other processes (or due retries)
+WEBHOOK_POLL_INTERVAL_MS = int(os.getenv("WEBHOOK_POLL_INTERVAL_MS", "500"))
+# How long a job rejected by a full conversation mailbox waits before it is claimed again
+WEBHOOK_MAILBOX_RETRY_SECONDS = float(os.getenv("WEBHOOK_MAILBOX_RETRY_SECONDS", "1"))
+
+Handler = Callable[[StandardizedMessage], Awaitable[None]]
+
+
+def parse_channel_limits(spec: str) -> Dict[str, int]:
+    """{"email": 2} from "email=2"; malformed entries are ignored."""
+    limits = {}
+    for item in spec.split(","):
+        channel, _, value = item.partition("=")
+        if channel.strip() and value.strip().isdigit():
+            limits[channel.strip()] = int(value)
+    return limits
+
+
+class _Deferred(Exception):
+    """The job must wait for an earlier message of its conversation that was handed back."""
+
+
+class _HeldMessage(NamedTuple):
+    seq: int  # claim order, so held messages go back in the order they arrived
+    key: str  # recognizes the message when claimed again (Redis re-adds it under a new id)
+    expires: float  # forgotten after this, e.g. if another process claimed it meanwhile
+
+
+def _message_key(message: StandardizedMessage) -> str:
+    return message.message_id or message.model_dump_json()
+
+
+def retry_delay(attempts: int, base: float = WEBHOOK_RETRY_BASE_SECONDS, cap: float = WEBHOOK_RETRY_MAX_SECONDS) -> float:
+    """Seconds to wait before delivery number `attempts + 1`."""
+    return min(cap, base * 2 ** (attempts - 1))
+
+
+class WebhookWorkerPool:
+    def __init__(
+        self,
+        queue=None,
+        workers: int = WEBHOOK_WORKERS,
+        channel_concurrency: int = WEBHOOK_CHANNEL_CONCURRENCY,
+        channel_limits: Optional[Dict[str, int]] = None,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        poll_interval_ms: int = WEBHOOK_POLL_INTERVAL_MS,
+        lease_seconds: float = WEBHOOK_LEASE_SECONDS,
+        conversations: Optional[ConversationDispatcher] = None,
+    ):
+        self._queue = queue  # created on first use so importing this module opens nothing
+        self.workers = workers
+        self.channel_concurrency = channel_concurrency
+        self.channel_limits = parse_channel_limits(WEBHOOK_CHANNEL_LIMITS) if channel_limits is None else channel_limits
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval_ms / 1000
+        self.lease_seconds = lease_seconds
+        self.conversations = conversations or ConversationDispatcher()
+        self._handlers: Dict[str, Handler] = {}
+        # Conversations with unfinished jobs, per channel, and those jobs per conversation
+        self._in_flight = collections.Counter()
+        self._active: "collections.Counter[Tuple[str, str]]" = collections.Counter()
+        # Messages handed back to the queue, per conversation, earliest first
+        self._held: Dict[str, List[_HeldMessage]] = {}
+        self._sequence = itertools.count()
+        # Claimed jobs whose lease the heartbeat keeps extending, by job id
+        self._leased: Dict[str, WebhookJob] = {}
+        self._lease_lock: Optional[asyncio.Lock] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running = False
+        self.enqueued = 0
+        self.processed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.deferred = 0
+
+    @property
+    def queue(self):
+        if self._queue is None:
+            self._queue = create_queue()
+        return self._queue
+
+    def register(self, channel: str, handler: Handler):
+        """Answer messages whose channel_name is `channel` with `handler`."""
+        self._handlers[channel] = handler
+
+    def limit(self, channel: str) -> int:
+        return self.channel_limits.get(channel, self.channel_concurrency)
+
+    async def submit(self, message: StandardizedMessage) -> str:
+        """Persist `message` for processing; returns once it is durably queued."""
+        return (await self.submit_many([message]))[0]
+
+    async def submit_many(self, messages: List[StandardizedMessage]) -> List[str]:
+        """
+        Persist a batch (e.g. one multi-event Meta delivery) in one write. The
+        messages become separate jobs, answered in parallel up to the channel's limit.
+        """
+        if not messages:
+            return []
+        job_ids = await asyncio.to_thread(self.queue.enqueue_many, messages)
+        self.enqueued += len(job_ids)
+        if self._wake is not None:
+            self._wake.set()
+        return job_ids
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._wake = asyncio.Event()
+        self._lease_lock = asyncio.Lock()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        print(f"Webhook workers started ({self.workers} workers, channels: {', '.join(sorted(self._handlers))})")
+
+    async def stop(self, timeout: float = 30):
+        """Stop claiming work and wait up to `timeout` seconds for jobs in flight."""
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        await self._dispatcher
+        if self._tasks:
+            # Anything still running is redelivered once its lease expires
+            await asyncio.wait(self._tasks, timeout=timeout)
+        await self.conversations.stop()
+        self._heartbeat.cancel()
+        await asyncio.gather(self._heartbeat, return_exceptions=True)
+
+    async def _dispatch_loop(self):
+        while self._running:
+            self._wake.clear()
+            claimed = 0
+            try:
+                claimed = await self._claim_available()
+            except Exception as e:
+                print(f"Webhook workers: claiming jobs failed: {e}")
+            if not claimed:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            # Settling a job waits for this lock, so a lease is never extended after the job is settled
+            async with self._lease_lock:
+                jobs = list(self._leased.values())
+                if not jobs:
+                    continue
+                try:
+                    await asyncio.to_thread(self.queue.extend, jobs, self.lease_seconds)
+                except Exception as e:
+                    print(f"Webhook workers: extending {len(jobs)} leases failed: {e}")
+
+    async def _claim_available(self) -> int:
+        claimed = 0
+        for channel in list(self._handlers):
+            free = min(self.limit(channel) - self._in_flight[channel], self.workers - sum(self._in_flight.values()))
+            if free <= 0:
+                continue
+            jobs = await asyncio.to_thread(self.queue.claim, channel, free, self.lease_seconds)
+            for job in jobs:
+                # Dispatched here, not in a task, so the mailbox keeps claim order
+                self._dispatch(job)
+            claimed += len(jobs)
+        return claimed
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _held_for(self, conversation: str) -> List[_HeldMessage]:
+        held = self._held.get(conversation)
+        if held:
+            now = time.monotonic()
+            held[:] = [entry for entry in held if entry.expires > now]
+        if not held:
+            self._held.pop(conversation, None)
+            return []
+        return held
+
+    def _hold(self, job: WebhookJob, seq: int, delay: float):
+        """Remember a message going back to the queue, so its conversation waits for it."""
+        held = self._held.setdefault(job.message.conversation_id, [])
+        key = _message_key(job.message)
+        held[:] = [entry for entry in held if entry.key != key]
+        bisect.insort(held, _HeldMessage(seq, key, time.monotonic() + delay + self.lease_seconds))
+
+    def _defer(self, job: WebhookJob, seq: int):
+        self._hold(job, seq, WEBHOOK_MAILBOX_RETRY_SECONDS)
+        self._spawn(self._release(job))
+
+    def _dispatch(self, job: WebhookJob):
+        conversation = job.message.conversation_id
+        seq = next(self._sequence)
+        held = self._held_for(conversation)
+        if held:
+            key = _message_key(job.message)
+            returning = next((entry for entry in held if entry.key == key), None)
+            if returning is not None:
+                seq = returning.seq
+            if returning is not held[0]:
+                # An earlier message of this conversation is back in the queue; wait behind it
+                self._defer(job, seq)
+                return
+            held.pop(0)
+        try:
+            future = self.conversations.submit(conversation, self._handle, job, seq)
+        except MailboxFull:
+            # Back-pressure from a busy conversation, not a failure of this job
+            self._defer(job, seq)
+            return
+        if not self._active[(job.channel, conversation)]:
+            self._in_flight[job.channel] += 1
+        self._active[(job.channel, conversation)] += 1
+        self._leased[job.job_id] = job
+        self._spawn(self._run(job, future))
+
+    async def _handle(self, job: WebhookJob, seq: int):
+        """Runs in the conversation's actor."""
+        held = self._held_for(job.message.conversation_id)
+        if held and held[0].seq < seq:
+            # An earlier message failed after this one was queued behind it
+            self._hold(job, seq, WEBHOOK_MAILBOX_RETRY_SECONDS)
+            raise _Deferred()
+        try:
+            return await self._handlers[job.channel](job.message)
+        except Exception:
+            if job.attempts < self.max_attempts:
+                # Held before the actor starts the next message, which must wait for the retry
+                self._hold(job, seq, retry_delay(job.attempts))
+            raise
+
+    async def _release(self, job: WebhookJob):
+        await asyncio.to_thread(self.queue.release, job, WEBHOOK_MAILBOX_RETRY_SECONDS)
+        self.deferred += 1
+
+    async def _run(self, job: WebhookJob, future: asyncio.Future):
+        try:
+            try:
+                await future
+            finally:
+                async with self._lease_lock:
+                    self._leased.pop(job.job_id, None)
+        except _Deferred:
+            await self._release(job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts >= self.max_attempts:
+                print(f"Webhook job {job.job_id} ({job.channel}) failed {job.attempts} times, dead-lettering: {error}")
+                await asyncio.to_thread(self.queue.dead_letter, job, error)
+                self.dead_lettered += 1
+            else:
+                delay = retry_delay(job.attempts)
+                print(f"Webhook job {job.job_id} ({job.channel}) failed, retrying in {delay:.0f}s: {error}")
+                await asyncio.to_thread(self.queue.retry, job, error, delay)
+                self.retried += 1
+        else:
+            await asyncio.to_thread(self.queue.ack, job)
+            self.processed += 1
+        finally:
+            key = (job.channel, job.message.conversation_id)
+            self._active[key] -= 1
+            if not self._active[key]:
+                del self._active[key]
+                self._in_flight[job.channel] -= 1
+            self._wake.set()
+
+    def dead_letters(self, limit: int = 100):
+        return self.queue.dead_letters(limit)
+
+    def requeue_dead(self, job_id: str) -> bool:
+        # Picked up by the dispatcher's next poll
+        return self.queue.requeue_dead(job_id)
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._running,
+            "workers": self.workers,
+            "in_flight": {channel: count for channel, count in self._in_flight.items() if count},
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "deferred": self.deferred,
+            "held": sum(len(held) for held in self._held.values()),
+            "leased": len(self._leased),
+            "conversations": self.conversations.snapshot(),
+            "queue": self.queue.snapshot() if self._queue is not None else None,
+        }
+
+
+webhook_workers = WebhookWorkerPool()
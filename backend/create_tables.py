@@ -5,6 +5,7 @@ Create database tables script
 import os
 from sqlalchemy import create_engine
 from database.database import Base
+import database.search  # installs the full-text search indexes after create_all
 from dotenv import load_dotenv
 
 # Load environment variables
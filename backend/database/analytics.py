@@ -0,0 +1,176 @@
+# analytics.py
+import datetime
+import os
+import threading
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from database.database import BotAnalyticsCounter, BotAnalyticsUser
+from database.rollups import dialect_insert, DEFAULT_CHANNEL, UNASSIGNED_BOT_ID
+from database.sessions import session_local
+
+load_dotenv()
+
+# How often buffered counter deltas are written to the database
+ANALYTICS_FLUSH_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_FLUSH_INTERVAL_SECONDS", "5"))
+
+GRANULARITIES = ("hour", "day")
+
+# Upper bounds (ms) of the answer latency histogram; anything slower lands in "inf"
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000)
+
+# Metric names
+MESSAGES = "messages"
+USERS = "users"
+CHANNEL = "channel"
+ANSWERS = "answers"
+CACHE_HITS = "cache_hits"
+ESCALATIONS = "escalations"
+LATENCY = "latency"
+
+
+def bucket_start(at: datetime.datetime, granularity: str) -> datetime.datetime:
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def latency_bucket(latency_ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if latency_ms <= bound:
+            return str(bound)
+    return "inf"
+
+
+class AnalyticsRecorder:
+    """
+    Streaming per-bot counters. Events are folded into in-memory deltas and a
+    background thread merges them into bot_analytics_counters with upserts, so
+    recording never touches the database on the request path.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = session_local,
+        flush_interval: float = ANALYTICS_FLUSH_INTERVAL_SECONDS,
+    ):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+        self._users: set = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-recorder", daemon=True)
+            self._thread.start()
+
+    def record(self, bot_id: Optional[int], metric: str, dimension: str = "", amount: int = 1, at=None):
+        # Like the rollups, traffic without a bot (channel hooks) is counted under bot 0
+        bot_id = bot_id or UNASSIGNED_BOT_ID
+        at = at or datetime.datetime.utcnow()
+        self.start()
+        with self._lock:
+            for granularity in GRANULARITIES:
+                self._counters[(bot_id, granularity, bucket_start(at, granularity), metric, dimension)] += amount
+
+    def record_user(self, bot_id: Optional[int], user_id: int, at=None):
+        bot_id = bot_id or UNASSIGNED_BOT_ID
+        at = at or datetime.datetime.utcnow()
+        self.start()
+        with self._lock:
+            for granularity in GRANULARITIES:
+                self._users.add((bot_id, granularity, bucket_start(at, granularity), user_id))
+
+    def record_messages(self, rows: Iterable[dict]):
+        """Count saved conversation rows (see conversation_writer.build_conversation_row)."""
+        for row in rows:
+            at = row["created_at"]
+            self.record(row.get("bot_id"), MESSAGES, at=at)
+            self.record(row.get("bot_id"), CHANNEL, row.get("channel") or DEFAULT_CHANNEL, at=at)
+            self.record_user(row.get("bot_id"), row["user_id"], at=at)
+
+    def record_answer(self, bot_id: Optional[int], latency_ms: float, cache_hit: bool):
+        self.record(bot_id, ANSWERS)
+        self.record(bot_id, LATENCY, latency_bucket(latency_ms))
+        if cache_hit:
+            self.record(bot_id, CACHE_HITS)
+
+    def record_escalation(self, bot_id: Optional[int]):
+        self.record(bot_id, ESCALATIONS)
+
+    def flush(self):
+        """Merge buffered deltas into the database. On failure they are kept for the next flush."""
+        with self._lock:
+            counters, self._counters = self._counters, Counter()
+            users, self._users = self._users, set()
+        if not counters and not users:
+            return
+
+        db = self._session_factory()
+        try:
+            new_users = Counter()
+            for bot_id, granularity, start, user_id in users:
+                result = db.execute(
+                    dialect_insert(db, BotAnalyticsUser)
+                    .values(bot_id=bot_id, granularity=granularity, bucket_start=start, user_id=user_id)
+                    .on_conflict_do_nothing()
+                )
+                if result.rowcount == 1:
+                    new_users[(bot_id, granularity, start, USERS, "")] += 1
+
+            table = BotAnalyticsCounter.__table__
+            for (bot_id, granularity, start, metric, dimension), amount in (counters + new_users).items():
+                stmt = dialect_insert(db, BotAnalyticsCounter).values(
+                    bot_id=bot_id,
+                    granularity=granularity,
+                    bucket_start=start,
+                    metric=metric,
+                    dimension=dimension,
+                    value=amount,
+                )
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=["bot_id", "granularity", "bucket_start", "metric", "dimension"],
+                    set_={"value": table.c.value + amount},
+                ))
+            db.commit()
+            self.flushes += 1
+        except Exception as e:
+            db.rollback()
+            self.flush_errors += 1
+            print(f"Analytics flush failed, keeping {len(counters)} counters for retry: {e}")
+            with self._lock:
+                self._counters.update(counters)
+                self._users.update(users)
+        finally:
+            db.close()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            pending = len(self._counters)
+        return {"pending_counters": pending, "flushes": self.flushes, "flush_errors": self.flush_errors}
+
+
+analytics_recorder = AnalyticsRecorder()
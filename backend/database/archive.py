@@ -0,0 +1,343 @@
+# archive.py
+"""
+Cold storage for conversations past their bot's retention horizon.
+
+Archived rows are removed from the hot table and written as gzipped JSON lines,
+partitioned by day and bot:
+
+    ARCHIVE_DIR/conversations/date=2024-01-31/bot_id=3/part-20250131T020000123456.jsonl.gz
+
+Small per-user and per-bot index files list the partitions holding their rows,
+so a user's or bot's history is read without opening files that cannot match:
+
+    ARCHIVE_DIR/conversations/index/user_id=7.json   [["2024-01-31", 3], ...]
+    ARCHIVE_DIR/conversations/index/bot_id=3.json    ["2024-01-31", ...]
+
+Rows are archived a whole turn at a time, so a question and its answer are
+never split between the archive and the hot table. Readers (inbox, export,
+conversation lists) merge the archive with the hot table for ranges that reach
+back past the horizon. Rollups and analytics counters are kept, so
+dashboards still cover archived days.
+"""
+import datetime
+import gzip
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from database.database import Bot, Conversation
+from database.rollups import UNASSIGNED_BOT_ID
+
+load_dotenv()
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Default horizon for bots without retention_days; 0 keeps conversations in the hot table forever
+CONVERSATION_RETENTION_DAYS = int(os.getenv("CONVERSATION_RETENTION_DAYS", "365"))
+ARCHIVE_DELETE_BATCH = 500
+
+ARCHIVED_COLUMNS = [
+    "id", "user_id", "bot_id", "interaction", "channel", "source", "turn_id", "resolved", "created_at", "updated_at",
+]
+_DATETIME_COLUMNS = ("created_at", "updated_at")
+
+
+def _root(root: Optional[str]) -> Path:
+    return Path(root or ARCHIVE_DIR) / "conversations"
+
+
+def _day_dir(root: Path, day: datetime.date) -> Path:
+    return root / f"date={day.isoformat()}"
+
+
+def _bot_dir(root: Path, day: datetime.date, bot_id: Optional[int]) -> Path:
+    return _day_dir(root, day) / f"bot_id={bot_id or UNASSIGNED_BOT_ID}"
+
+
+def retention_cutoff(retention_days: Optional[int], now: datetime.datetime = None) -> Optional[datetime.datetime]:
+    """Start of the oldest day kept hot, or None when the bot keeps everything."""
+    days = CONVERSATION_RETENTION_DAYS if retention_days is None else retention_days
+    if days <= 0:
+        return None
+    now = now or datetime.datetime.utcnow()
+    return datetime.datetime.combine((now - datetime.timedelta(days=days)).date(), datetime.time.min)
+
+
+def _to_line(convo: Conversation) -> str:
+    record = {}
+    for name in ARCHIVED_COLUMNS:
+        value = getattr(convo, name)
+        record[name] = value.isoformat() if isinstance(value, datetime.datetime) else value
+    return json.dumps(record) + "\n"
+
+
+def _from_line(line: str) -> dict:
+    record = json.loads(line)
+    for name in _DATETIME_COLUMNS:
+        if record.get(name):
+            record[name] = datetime.datetime.fromisoformat(record[name])
+    return record
+
+
+def _read_parts(bot_dir: Path) -> Iterator[dict]:
+    for part in sorted(bot_dir.glob("part-*.jsonl.gz")):
+        with gzip.open(part, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield _from_line(line)
+
+
+def _write_part(bot_dir: Path, rows: List[Conversation]):
+    """Write rows to a new part file; the rename makes it visible only once complete."""
+    bot_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    final = bot_dir / f"part-{stamp}.jsonl.gz"
+    tmp = bot_dir / f".part-{stamp}.jsonl.gz.tmp"
+    with open(tmp, "wb") as raw:
+        with gzip.open(raw, "wt", encoding="utf-8") as f:
+            for convo in rows:
+                f.write(_to_line(convo))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, final)
+
+
+def _index_dir(root: Path) -> Path:
+    return root / "index"
+
+
+def _read_index(path: Path) -> list:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _write_index(path: Path, entries: list):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(entries, f)
+    os.replace(tmp, path)
+
+
+def _index_rows(root: Path, bot_id: Optional[int], rows: Iterable[Conversation]):
+    """Add the partitions now holding `rows` to their users' and their bot's index files."""
+    bot_key = bot_id or UNASSIGNED_BOT_ID
+    by_user: Dict[int, Set[str]] = {}
+    for convo in rows:
+        by_user.setdefault(convo.user_id, set()).add(convo.created_at.date().isoformat())
+    for user_id, days in by_user.items():
+        path = _index_dir(root) / f"user_id={user_id}.json"
+        entries = {tuple(entry) for entry in _read_index(path)} | {(day, bot_key) for day in days}
+        _write_index(path, sorted(entries))
+    path = _index_dir(root) / f"bot_id={bot_key}.json"
+    days = set(_read_index(path)).union(*by_user.values())
+    _write_index(path, sorted(days))
+
+
+def rebuild_index(root: str = None) -> int:
+    """Recreate every index file from the part files; returns how many were written."""
+    base = _root(root)
+    users: Dict[int, Set[Tuple[str, int]]] = {}
+    bots: Dict[int, Set[str]] = {}
+    for day in archived_days(root=root):
+        for bot_dir in _day_dir(base, day).glob("bot_id=*"):
+            bot_key = int(bot_dir.name[len("bot_id="):])
+            for record in _read_parts(bot_dir):
+                users.setdefault(record["user_id"], set()).add((day.isoformat(), bot_key))
+                bots.setdefault(bot_key, set()).add(day.isoformat())
+    for user_id, entries in users.items():
+        _write_index(_index_dir(base) / f"user_id={user_id}.json", sorted(entries))
+    for bot_key, days in bots.items():
+        _write_index(_index_dir(base) / f"bot_id={bot_key}.json", sorted(days))
+    return len(users) + len(bots)
+
+
+def archived_partitions(bot_id: int = None, user_id: int = None, root: str = None) -> List[Tuple[datetime.date, int]]:
+    """(day, bot_id) partitions holding a user's or a bot's archived rows, oldest first, from the index."""
+    base = _root(root)
+    if user_id:
+        entries = [(datetime.date.fromisoformat(day), bot) for day, bot in _read_index(_index_dir(base) / f"user_id={user_id}.json")]
+        return [entry for entry in entries if not bot_id or entry[1] == bot_id]
+    if bot_id:
+        return [(datetime.date.fromisoformat(day), bot_id) for day in _read_index(_index_dir(base) / f"bot_id={bot_id}.json")]
+    raise ValueError("archived_partitions needs a bot_id or a user_id")
+
+
+def archived_days(since: datetime.datetime = None, until: datetime.datetime = None, root: str = None) -> List[datetime.date]:
+    """Days with archived conversations overlapping [since, until)."""
+    base = _root(root)
+    if not base.exists():
+        return []
+    days = []
+    for entry in base.iterdir():
+        if not entry.name.startswith("date="):
+            continue
+        day = datetime.date.fromisoformat(entry.name[len("date="):])
+        day_start = datetime.datetime.combine(day, datetime.time.min)
+        if since and day_start + datetime.timedelta(days=1) <= since:
+            continue
+        if until and day_start >= until:
+            continue
+        days.append(day)
+    return sorted(days)
+
+
+def read_archive(
+    since: datetime.datetime = None,
+    until: datetime.datetime = None,
+    bot_id: int = None,
+    user_id: int = None,
+    channel: str = None,
+    root: str = None,
+) -> Iterator[dict]:
+    """
+    Archived conversation rows in [since, until), oldest first. Holds at most one
+    day of matching rows in memory at a time.
+    """
+    base = _root(root)
+    for day in archived_days(since, until, root):
+        if bot_id:
+            bot_dirs = [_bot_dir(base, day, bot_id)]
+        else:
+            bot_dirs = sorted(_day_dir(base, day).glob("bot_id=*"))
+        matches = []
+        for bot_dir in bot_dirs:
+            for record in _read_parts(bot_dir):
+                if since and record["created_at"] < since:
+                    continue
+                if until and record["created_at"] >= until:
+                    continue
+                if user_id and record["user_id"] != user_id:
+                    continue
+                if channel and record["channel"] != channel:
+                    continue
+                matches.append(record)
+        matches.sort(key=lambda r: (r["created_at"], r["id"]))
+        yield from matches
+
+
+def read_archived_turns(
+    limit: int,
+    before: Optional[list] = None,
+    bot_id: int = None,
+    user_id: int = None,
+    root: str = None,
+) -> List[Tuple[dict, Optional[dict]]]:
+    """
+    Up to `limit` archived (question, answer) record pairs of a user or a bot,
+    newest question first, keeping only questions that sort before `before`
+    ([created_at, id]). Only the partitions listed in the index are read, one day
+    at a time from the newest, stopping once `limit` questions are found.
+    """
+    partitions = archived_partitions(bot_id, user_id, root)
+    if before:
+        # Answers are saved with their question, at most just past midnight
+        last_day = before[0].date() + datetime.timedelta(days=1)
+        partitions = [entry for entry in partitions if entry[0] <= last_day]
+    by_day: Dict[datetime.date, List[int]] = {}
+    for day, bot in partitions:
+        by_day.setdefault(day, []).append(bot)
+
+    base = _root(root)
+    answers: Dict[str, dict] = {}
+    questions: List[dict] = []
+    for day in sorted(by_day, reverse=True):
+        records = []
+        for bot in by_day[day]:
+            records.extend(r for r in _read_parts(_bot_dir(base, day, bot)) if not user_id or r["user_id"] == user_id)
+        records.sort(key=lambda r: (r["created_at"], r["id"]), reverse=True)
+        for record in records:
+            if record["source"] == "bot" and record["turn_id"]:
+                answers.setdefault(record["turn_id"], record)
+            elif record["source"] == "user" and (not before or [record["created_at"], record["id"]] < before):
+                questions.append(record)
+        if len(questions) >= limit:
+            break
+    return [(q, answers.get(q["turn_id"]) if q["turn_id"] else None) for q in questions[:limit]]
+
+
+def _archive_bot(db: Session, bot_id: Optional[int], cutoff: datetime.datetime, root: Path) -> int:
+    bot_filter = Conversation.bot_id == bot_id if bot_id else Conversation.bot_id.is_(None)
+    archived = 0
+    while True:
+        oldest = (
+            db.query(Conversation.created_at)
+            .filter(bot_filter, Conversation.created_at < cutoff)
+            .order_by(Conversation.created_at)
+            .limit(1)
+            .scalar()
+        )
+        if oldest is None:
+            return archived
+
+        # One day per transaction: write the part file, then delete the rows it holds
+        day = oldest.date()
+        day_end = min(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min), cutoff)
+        rows = (
+            db.query(Conversation)
+            .filter(bot_filter, Conversation.created_at >= oldest, Conversation.created_at < day_end)
+            .order_by(Conversation.created_at, Conversation.id)
+            .all()
+        )
+        # Whole turns only: rows of these turns saved after day_end (an answer past
+        # midnight or past the cutoff) go along, each into its own day's partition
+        turn_ids = sorted({convo.turn_id for convo in rows if convo.turn_id})
+        for start in range(0, len(turn_ids), ARCHIVE_DELETE_BATCH):
+            rows += (
+                db.query(Conversation)
+                .filter(Conversation.turn_id.in_(turn_ids[start:start + ARCHIVE_DELETE_BATCH]), Conversation.created_at >= day_end)
+                .order_by(Conversation.created_at, Conversation.id)
+                .all()
+            )
+
+        by_day: Dict[datetime.date, List[Conversation]] = {}
+        for convo in rows:
+            by_day.setdefault(convo.created_at.date(), []).append(convo)
+        for row_day, day_rows in by_day.items():
+            bot_dir = _bot_dir(root, row_day, bot_id)
+            # Rows a previous, interrupted run already wrote are only deleted
+            already = {record["id"] for record in _read_parts(bot_dir)} if bot_dir.exists() else set()
+            pending = [convo for convo in day_rows if convo.id not in already]
+            if pending:
+                _write_part(bot_dir, pending)
+                archived += len(pending)
+        # Indexed before the rows leave the hot table, so a crash cannot hide them
+        _index_rows(root, bot_id, rows)
+
+        ids = [convo.id for convo in rows]
+        for start in range(0, len(ids), ARCHIVE_DELETE_BATCH):
+            db.execute(delete(Conversation).where(Conversation.id.in_(ids[start:start + ARCHIVE_DELETE_BATCH])))
+        db.commit()
+        db.expunge_all()
+
+
+def archive_conversations(db: Session, now: datetime.datetime = None, root: str = None) -> dict:
+    """Move every bot's conversations older than its retention horizon to the archive."""
+    base = _root(root)
+    if archived_days(root=root) and not _index_dir(base).exists():
+        print(f"Indexed {rebuild_index(root)} users and bots of an archive written before index files existed")
+    horizons = [(bot.id, bot.retention_days) for bot in db.query(Bot.id, Bot.retention_days).all()]
+    horizons.append((None, None))  # conversations saved without a bot
+
+    stats = {}
+    for bot_id, retention_days in horizons:
+        cutoff = retention_cutoff(retention_days, now)
+        if cutoff is None:
+            continue
+        count = _archive_bot(db, bot_id, cutoff, base)
+        if count:
+            stats[bot_id or UNASSIGNED_BOT_ID] = count
+            print(f"Archived {count} conversations for bot {bot_id or 'unassigned'} older than {cutoff.date()}")
+    return stats
+
+
+def transient_conversation(record: dict) -> Conversation:
+    """An unsaved Conversation built from an archived record, for code that expects ORM rows."""
+    return Conversation(**{name: record.get(name) for name in ARCHIVED_COLUMNS})
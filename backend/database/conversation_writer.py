@@ -0,0 +1,359 @@
+# conversation_writer.py
+import collections
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from database.database import Conversation
+from database.rollups import apply_conversation_rows
+from database.analytics import analytics_recorder
+from database.sessions import session_local
+
+load_dotenv()
+
+# Flush when either this many milliseconds pass or this many rows are queued
+CONVERSATION_FLUSH_INTERVAL_MS = int(os.getenv("CONVERSATION_FLUSH_INTERVAL_MS", "200"))
+CONVERSATION_FLUSH_BATCH_SIZE = int(os.getenv("CONVERSATION_FLUSH_BATCH_SIZE", "100"))
+# Upper bound on queued rows; beyond this callers write synchronously
+CONVERSATION_QUEUE_MAX = int(os.getenv("CONVERSATION_QUEUE_MAX", "10000"))
+CONVERSATION_FLUSH_MAX_ATTEMPTS = 3
+# A batch that still fails is kept and retried with backoff up to this long apart
+CONVERSATION_RETRY_MAX_SECONDS = float(os.getenv("CONVERSATION_RETRY_MAX_SECONDS", "30"))
+# Rows that could not be saved by shutdown are written here and re-flushed on the next start
+CONVERSATION_SPILL_PATH = os.getenv("CONVERSATION_SPILL_PATH", "conversation_spill.jsonl")
+# Rows the database refuses outright (constraint or data errors) are set aside here with the error
+CONVERSATION_REJECTED_PATH = os.getenv("CONVERSATION_REJECTED_PATH", "conversation_rejected.jsonl")
+
+# Put on the queue to wake the flusher when stopping
+_WAKE = object()
+
+
+def build_conversation_row(
+    user_id: int,
+    bot_id: Optional[int],
+    source: str,
+    content: str,
+    channel: str = "web",
+    resolved: bool = False,
+    turn_id: Optional[str] = None,
+) -> dict:
+    """Column values for one conversation message, timestamped at the time it was produced."""
+    now = datetime.datetime.utcnow()
+    return {
+        "user_id": user_id,
+        "bot_id": bot_id,
+        "interaction": {"source": source, "content": content, "channel": channel},
+        "channel": channel,
+        "source": source,
+        "turn_id": turn_id,
+        "resolved": resolved,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def build_turn_rows(
+    user_id: int,
+    bot_id: Optional[int],
+    question: str,
+    answer: str,
+    channel: str = "web",
+    resolved: bool = False,
+    turn_id: Optional[str] = None,
+) -> List[dict]:
+    """The question row and the answer row for one turn, linked by a shared turn_id (generated unless given)."""
+    turn_id = turn_id or uuid.uuid4().hex
+    return [
+        build_conversation_row(user_id, bot_id, "user", question, channel, resolved, turn_id),
+        build_conversation_row(user_id, bot_id, "bot", answer, channel, resolved, turn_id),
+    ]
+
+
+class ConversationWriter:
+    """
+    Write-behind persistence for conversation messages.
+
+    Messages are put on an in-memory queue and a background thread inserts them
+    in bulk, so the request path does not pay a commit per message. Callers that
+    need the saved row (and its id) use write_sync() instead.
+
+    A batch that fails because the database is unavailable is never dropped: it
+    is kept and retried with backoff ahead of newer rows. Kept rows count against
+    the queue bound, so during a long outage enqueue() returns False and callers
+    write synchronously (and see the error). Rows still unsaved at stop() are
+    spilled to disk and re-flushed by the next start().
+
+    A batch that violates a constraint (IntegrityError, DataError) would fail the
+    same way forever, so it is split until the offending rows are isolated; those
+    are written to the rejected file and the rest is saved.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = session_local,
+        flush_interval_ms: int = CONVERSATION_FLUSH_INTERVAL_MS,
+        batch_size: int = CONVERSATION_FLUSH_BATCH_SIZE,
+        max_queue: int = CONVERSATION_QUEUE_MAX,
+        spill_path: Optional[str] = CONVERSATION_SPILL_PATH,
+        rejected_path: Optional[str] = CONVERSATION_REJECTED_PATH,
+    ):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._enqueue_lock = threading.Lock()
+        self.spill_path = spill_path
+        self.rejected_path = rejected_path
+        # Rows from failed flushes, oldest first; only the flusher (or stop()) takes from it
+        self._retry: "collections.deque[dict]" = collections.deque()
+        self._retry_delay = 0.0
+        self._closed = False
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.spilled = 0
+        self.rejected = 0
+        self.sync_writes = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._load_spill()
+            self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, row: dict) -> bool:
+        """Queue a row for the next bulk insert. Returns False if the queue is full."""
+        return self.enqueue_many([row])
+
+    def enqueue_many(self, rows: List[dict]) -> bool:
+        """Queue rows that belong together (e.g. a turn); all or none are queued."""
+        if self._closed:
+            # Stopped for shutdown; do not bring the flusher back
+            return False
+        self.start()
+        with self._enqueue_lock:
+            queued = self._queue.qsize() + len(self._retry)
+            if self._queue.maxsize and queued + len(rows) > self._queue.maxsize:
+                return False
+            for row in rows:
+                self._queue.put_nowait(row)
+        self.enqueued += len(rows)
+        return True
+
+    def write_sync(self, db: Session, row: dict) -> Conversation:
+        """Insert a single row on the caller's session and return it with its id."""
+        convo = Conversation(**row)
+        db.add(convo)
+        apply_conversation_rows(db, [row])
+        db.commit()
+        db.refresh(convo)
+        analytics_recorder.record_messages([row])
+        self.sync_writes += 1
+        return convo
+
+    def write_many_sync(self, db: Session, rows: List[dict], related: List = ()) -> List[Conversation]:
+        """
+        Insert related rows in one transaction on the caller's session, together
+        with any `related` ORM objects (e.g. the reply's delivery row).
+        """
+        convos = [Conversation(**row) for row in rows]
+        db.add_all(convos)
+        db.add_all(related)
+        apply_conversation_rows(db, rows)
+        db.commit()
+        for instance in [*convos, *related]:
+            db.refresh(instance)
+        analytics_recorder.record_messages(rows)
+        self.sync_writes += len(convos)
+        return convos
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher and drain anything still queued; what cannot be saved is spilled to disk."""
+        self._closed = True
+        self._stop.set()
+        if self._thread:
+            try:
+                self._queue.put(_WAKE, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        if not self.flush():
+            self._spill()
+
+    def flush(self) -> bool:
+        """Synchronously insert everything queued or kept for retry; False if some rows are still unsaved."""
+        while True:
+            batch = self._take_retry() or self._drain(self.batch_size)
+            if not batch:
+                return True
+            if not self._flush_batch(batch):
+                return False
+
+    def _drain(self, limit: int) -> List[dict]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _WAKE:
+                batch.append(item)
+        return batch
+
+    def _take_retry(self) -> List[dict]:
+        batch = []
+        while self._retry and len(batch) < self.batch_size:
+            batch.append(self._retry.popleft())
+        return batch
+
+    def _collect_batch(self) -> List[dict]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _WAKE:
+                break
+            batch.append(item)
+        return batch
+
+    def _flush_batch(self, batch: List[dict]) -> bool:
+        """Insert a batch; rows that could not be saved are kept for retry. False if any were kept."""
+        unsaved = self._insert(batch)
+        if not unsaved:
+            self._retry_delay = 0.0
+            return True
+        # Keep the rows, ahead of anything newer, and back off before the next try
+        self._retry.extendleft(reversed(unsaved))
+        self.failed_flushes += 1
+        self._retry_delay = min(CONVERSATION_RETRY_MAX_SECONDS, max(0.5, self._retry_delay * 2))
+        print(f"ERROR: Could not save {len(unsaved)} conversation rows, retrying in {self._retry_delay:.1f}s")
+        return False
+
+    def _insert(self, batch: List[dict]) -> List[dict]:
+        """Insert a batch, setting rejected rows aside; returns the rows left unsaved by a transient failure."""
+        for attempt in range(1, CONVERSATION_FLUSH_MAX_ATTEMPTS + 1):
+            db = self._session_factory()
+            try:
+                db.execute(insert(Conversation), batch)
+                apply_conversation_rows(db, batch)
+                db.commit()
+            except (IntegrityError, DataError) as e:
+                db.rollback()
+                if len(batch) == 1:
+                    self._reject(batch[0], e)
+                    return []
+                # Retrying cannot help; bisect to save everything but the offending rows
+                middle = len(batch) // 2
+                unsaved = self._insert(batch[:middle])
+                if unsaved:
+                    return unsaved + batch[middle:]
+                return self._insert(batch[middle:])
+            except Exception as e:
+                db.rollback()
+                print(f"Conversation flush failed (attempt {attempt}, {len(batch)} rows): {e}")
+                time.sleep(0.1 * attempt)
+                continue
+            finally:
+                db.close()
+            self.flushed += len(batch)
+            self.flushes += 1
+            try:
+                analytics_recorder.record_messages(batch)
+            except Exception as e:
+                # The rows are committed; a counting error must not get them inserted again
+                print(f"Recording analytics for {len(batch)} conversation rows failed: {e}")
+            return []
+        return batch
+
+    def _reject(self, row: dict, error: Exception):
+        self.rejected += 1
+        print(f"ERROR: Conversation row rejected by the database: {error}")
+        if not self.rejected_path:
+            return
+        with open(self.rejected_path, "a") as f:
+            record = {"row": row, "error": str(error).splitlines()[0]}
+            f.write(json.dumps(record, default=lambda value: value.isoformat()) + "\n")
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._retry:
+                if self._stop.wait(self._retry_delay):
+                    return
+                self._flush_batch(self._take_retry())
+                continue
+            batch = self._collect_batch()
+            if batch:
+                self._flush_batch(batch)
+
+    def _spill(self):
+        rows = list(self._retry) + self._drain(self._queue.qsize() + 1)
+        self._retry.clear()
+        if not rows or not self.spill_path:
+            if rows:
+                print(f"ERROR: Lost {len(rows)} conversation rows (no CONVERSATION_SPILL_PATH)")
+            return
+        with open(self.spill_path, "a") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=lambda value: value.isoformat()) + "\n")
+        self.spilled += len(rows)
+        print(f"Spilled {len(rows)} unsaved conversation rows to {self.spill_path}")
+
+    def _load_spill(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        # Rename first, so only one process picks the file up
+        claimed = f"{self.spill_path}.{os.getpid()}"
+        try:
+            os.replace(self.spill_path, claimed)
+        except OSError:
+            return
+        with open(claimed) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    for column in ("created_at", "updated_at"):
+                        if row.get(column):
+                            row[column] = datetime.datetime.fromisoformat(row[column])
+                    self._retry.append(row)
+        os.remove(claimed)
+        print(f"Re-flushing {len(self._retry)} conversation rows spilled at the last shutdown")
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "awaiting_retry": len(self._retry),
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "spilled": self.spilled,
+            "rejected": self.rejected,
+            "sync_writes": self.sync_writes,
+        }
+
+
+conversation_writer = ConversationWriter()
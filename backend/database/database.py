@@ -1,5 +1,5 @@
 import sqlalchemy
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Float, Boolean, JSON, Text
+from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, ForeignKey, Float, Boolean, JSON, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import datetime
@@ -28,6 +28,13 @@ class Conversation(Base):
     # Store the user query and LLM response as JSON
     interaction = Column(JSON, nullable=False)  # e.g., {"question": "...", "answer": "..."}
 
+    # Promoted out of `interaction` so admin channel queries can use an index
+    channel = Column(String, nullable=True, index=True)  # e.g., "web", "whatsapp", "telegram"
+    source = Column(String, nullable=True, index=True)   # "user", "bot" or "system"
+
+    # Shared by the question row and its answer row so they can be paired with a join
+    turn_id = Column(String, nullable=True, index=True)
+
     # Track if issue is resolved
     resolved = Column(Boolean, default=False)
 
@@ -37,6 +44,16 @@ class Conversation(Base):
     bot_id = Column(Integer, ForeignKey('bots.id'), nullable=True)
     bot = relationship("Bot")
 
+    # On Postgres the table is range-partitioned by month on created_at (database/partitions.py),
+    # with primary key (id, created_at)
+    __table_args__ = (
+        Index("ix_conversations_bot_id_created_at", "bot_id", "created_at"),
+        Index("ix_conversations_user_id_created_at", "user_id", "created_at"),
+        Index("ix_conversations_bot_id_channel_user_id", "bot_id", "channel", "user_id"),
+        # Inbox day ranges across all bots; user_id included so the distinct-users scan stays in the index
+        Index("ix_conversations_created_at_user_id", "created_at", "user_id"),
+    )
+
 
 class Bot(Base):
     __tablename__ = 'bots'
@@ -45,6 +62,8 @@ class Bot(Base):
     bot_type = Column(String, index=True)
     admin_id = Column(Integer, ForeignKey('admins.id'))
     admin = relationship("Admin")
+    # Days conversations stay in the hot table before archival; NULL uses CONVERSATION_RETENTION_DAYS
+    retention_days = Column(Integer, nullable=True)
 
 
 class Ticket(Base):
@@ -61,6 +80,90 @@ class Ticket(Base):
     bot = relationship("Bot")
 
 
+class OutboundDelivery(Base):
+    """A reply owed to a user on an external channel, with its delivery attempts (channels/deliveries.py)."""
+    __tablename__ = 'outbound_deliveries'
+    id = Column(Integer, primary_key=True, index=True)
+    # The conversation turn whose answer this delivers (conversations.turn_id)
+    turn_id = Column(String, nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    channel = Column(String, nullable=False)
+    recipient = Column(String, nullable=False)
+    # {"text": ...} plus channel-specific send arguments, e.g. the email subject
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default='pending')  # "pending", "sent" or "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbound_deliveries_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class ChannelIdentity(Base):
+    """An external sender (phone number, chat id, PSID, email address) and the user it belongs to."""
+    __tablename__ = 'channel_identities'
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String, nullable=False)      # builder CHANNEL_NAME, e.g. "telegram"
+    external_id = Column(String, nullable=False)  # StandardizedMessage.sender_id
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    user = relationship("User")
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_channel_identities_channel_external_id", "channel", "external_id", unique=True),
+    )
+
+
+class ConversationRollup(Base):
+    """Per (bot, channel, day) counters, kept up to date as conversations and tickets are written."""
+    __tablename__ = 'conversation_rollups'
+    # bot_id 0 stands for conversations that were not attributed to a bot
+    bot_id = Column(Integer, primary_key=True, autoincrement=False)
+    channel = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    user_count = Column(Integer, nullable=False, default=0)
+    escalation_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+
+class ConversationRollupUser(Base):
+    """Users already counted in a rollup bucket, so user_count only grows on a user's first message."""
+    __tablename__ = 'conversation_rollup_users'
+    bot_id = Column(Integer, primary_key=True, autoincrement=False)
+    channel = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+
+
+class BotAnalyticsCounter(Base):
+    """
+    Hourly and daily per-bot counters for the analytics dashboard. One row per
+    (bucket, metric, dimension), e.g. ("channel", "sms") or ("latency", "500").
+    """
+    __tablename__ = 'bot_analytics_counters'
+    bot_id = Column(Integer, primary_key=True, autoincrement=False)
+    granularity = Column(String, primary_key=True)  # "hour" or "day"
+    bucket_start = Column(DateTime, primary_key=True)
+    metric = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True, default="")
+    value = Column(Integer, nullable=False, default=0)
+
+
+class BotAnalyticsUser(Base):
+    """Users already counted in an analytics bucket."""
+    __tablename__ = 'bot_analytics_users'
+    bot_id = Column(Integer, primary_key=True, autoincrement=False)
+    granularity = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+
+
 class Admin(Base):
     __tablename__ = "admins"
 
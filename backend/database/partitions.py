@@ -0,0 +1,138 @@
+# partitions.py
+"""
+Monthly range partitions of the Postgres `conversations` table.
+
+The table is partitioned on created_at (see migration d2e8b4a1f7c3), one
+partition per calendar month named conversations_yYYYYmMM, plus
+conversations_default for rows outside every monthly range. Date-bounded
+queries only touch the partitions they overlap, and old months are removed by
+detaching (and dropping) their partition instead of a large DELETE.
+
+partition_conversations.py runs ensure_partitions()/detach_partitions() from cron.
+Other dialects keep a plain table and these helpers do nothing.
+"""
+import datetime
+import os
+import re
+from typing import List
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from database.database import Conversation
+
+load_dotenv()
+
+PARTITIONED_TABLE = "conversations"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+# Future months kept ready so inserts never fall through to the default partition
+PARTITION_MONTHS_AHEAD = int(os.getenv("CONVERSATION_PARTITION_MONTHS_AHEAD", "3"))
+# Months of partitions kept attached; 0 never detaches
+PARTITION_RETAIN_MONTHS = int(os.getenv("CONVERSATION_PARTITION_RETAIN_MONTHS", "0"))
+
+_PARTITION_NAME = re.compile(rf"^{PARTITIONED_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(value) -> datetime.date:
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARTITIONED_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_bounds(month: datetime.date) -> str:
+    return f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+
+
+def is_partitioned(connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"
+    ), {"table": PARTITIONED_TABLE}).scalar())
+
+
+def monthly_partitions(connection) -> List[datetime.date]:
+    """Months that currently have an attached partition, oldest first."""
+    names = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": PARTITIONED_TABLE}).scalars()
+    months = []
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.append(datetime.date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def create_partition(connection, month: datetime.date):
+    """Attach a partition for `month`, moving any rows that already landed in the default partition."""
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    in_range = "created_at >= :start AND created_at < :end"
+    stray = connection.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds).scalar()
+    if not stray:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} FOR VALUES {partition_bounds(month)}"))
+        return
+    # Postgres refuses to attach a range the default partition still holds rows for
+    columns = ", ".join(column.name for column in Conversation.__table__.columns)
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING GENERATED)"))
+    connection.execute(text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    connection.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} FOR VALUES {partition_bounds(month)}"))
+    print(f"Moved {stray} conversations from {DEFAULT_PARTITION} into {name}")
+
+
+def ensure_partitions(connection, first_month: datetime.date = None, now: datetime.datetime = None,
+                      months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """
+    Create the missing monthly partitions from first_month (default: the current
+    month) through months_ahead months past now. Returns the names created.
+    """
+    if not is_partitioned(connection):
+        return []
+    now = now or datetime.datetime.utcnow()
+    month = month_start(first_month or now)
+    last = add_months(month_start(now), months_ahead)
+    existing = set(monthly_partitions(connection))
+    created = []
+    while month <= last:
+        if month not in existing:
+            create_partition(connection, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(connection, before: datetime.date, drop: bool = False) -> List[str]:
+    """
+    Detach every monthly partition that ends on or before `before`. Detached
+    partitions stay around as plain tables for inspection unless `drop` is set.
+    """
+    if not is_partitioned(connection):
+        return []
+    detached = []
+    for month in monthly_partitions(connection):
+        if add_months(month, 1) > before:
+            break
+        name = partition_name(month)
+        connection.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name}"))
+        if drop:
+            connection.execute(text(f"DROP TABLE {name}"))
+        detached.append(name)
+    return detached
+
+
+def retention_boundary(now: datetime.datetime = None, retain_months: int = PARTITION_RETAIN_MONTHS):
+    """First month kept attached, or None when partitions are never detached."""
+    if retain_months <= 0:
+        return None
+    return add_months(month_start(now or datetime.datetime.utcnow()), -retain_months)
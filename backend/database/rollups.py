@@ -0,0 +1,78 @@
+# rollups.py
+import datetime
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database.database import ConversationRollup, ConversationRollupUser
+
+# Rollup key used for conversations saved without a bot / channel
+UNASSIGNED_BOT_ID = 0
+DEFAULT_CHANNEL = "web"
+
+
+def rollup_key(bot_id: Optional[int], channel: Optional[str], created_at: datetime.datetime) -> tuple:
+    return (bot_id or UNASSIGNED_BOT_ID, channel or DEFAULT_CHANNEL, created_at.date())
+
+
+def dialect_insert(db: Session, model):
+    """Dialect specific INSERT so ON CONFLICT can be used on Postgres and SQLite."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def _bump(db: Session, key: tuple, messages: int = 0, users: int = 0, escalations: int = 0):
+    bot_id, channel, day = key
+    now = datetime.datetime.utcnow()
+    stmt = dialect_insert(db, ConversationRollup).values(
+        bot_id=bot_id,
+        channel=channel,
+        day=day,
+        message_count=messages,
+        user_count=users,
+        escalation_count=escalations,
+        updated_at=now,
+    )
+    table = ConversationRollup.__table__
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["bot_id", "channel", "day"],
+        set_={
+            "message_count": table.c.message_count + messages,
+            "user_count": table.c.user_count + users,
+            "escalation_count": table.c.escalation_count + escalations,
+            "updated_at": now,
+        },
+    ))
+
+
+def _add_user(db: Session, key: tuple, user_id: int) -> bool:
+    """Record a user in a bucket. Returns True the first time the user is seen there."""
+    bot_id, channel, day = key
+    stmt = dialect_insert(db, ConversationRollupUser).values(bot_id=bot_id, channel=channel, day=day, user_id=user_id)
+    result = db.execute(stmt.on_conflict_do_nothing())
+    return result.rowcount == 1
+
+
+def apply_conversation_rows(db: Session, rows: Iterable[dict]):
+    """
+    Fold freshly written conversation rows into the rollups. Runs on the caller's
+    session so the counters commit (or roll back) together with the rows.
+    """
+    messages = Counter()
+    users = {}
+    for row in rows:
+        key = rollup_key(row.get("bot_id"), row.get("channel"), row["created_at"])
+        messages[key] += 1
+        users.setdefault(key, set()).add(row["user_id"])
+
+    for key, count in messages.items():
+        new_users = sum(1 for user_id in users[key] if _add_user(db, key, user_id))
+        _bump(db, key, messages=count, users=new_users)
+
+
+def record_escalation(db: Session, bot_id: Optional[int], channel: Optional[str] = None, created_at=None):
+    """Count a human-assistance ticket against its bot, channel and day."""
+    _bump(db, rollup_key(bot_id, channel, created_at or datetime.datetime.utcnow()), escalations=1)
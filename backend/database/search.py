@@ -0,0 +1,101 @@
+# search.py
+"""
+Full-text search indexes over conversation content and ticket topic/description.
+
+Postgres gets a generated tsvector column with a GIN index on each table. SQLite
+(the local app.db setup) gets FTS5 tables kept in sync by triggers. The DDL is
+installed after Base.metadata.create_all() and by the matching migration.
+"""
+from sqlalchemy import event, inspect, text
+
+from database.database import Base
+
+SEARCH_CONFIG = "english"
+
+# Searchable text of a conversation row; legacy rows kept question and answer in one interaction
+_PG_CONVERSATION_TEXT = (
+    "coalesce(interaction->>'content', '') || ' ' || "
+    "coalesce(interaction->>'question', '') || ' ' || "
+    "coalesce(interaction->>'answer', '')"
+)
+_SQLITE_CONVERSATION_TEXT = (
+    "coalesce(json_extract({row}.interaction, '$.content'), '') || ' ' || "
+    "coalesce(json_extract({row}.interaction, '$.question'), '') || ' ' || "
+    "coalesce(json_extract({row}.interaction, '$.answer'), '')"
+)
+_TICKET_TEXT = "coalesce({row}topic, '') || ' ' || coalesce({row}description, '')"
+
+SEARCHABLE = {
+    "conversations": {
+        "postgresql": _PG_CONVERSATION_TEXT,
+        "sqlite": _SQLITE_CONVERSATION_TEXT,
+        "watch": "interaction",
+    },
+    "tickets": {
+        "postgresql": _TICKET_TEXT.format(row=""),
+        "sqlite": _TICKET_TEXT.format(row="{row}."),
+        "watch": "topic, description",
+    },
+}
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+def _sqlite_statements(table: str, spec: dict) -> list:
+    fts = fts_table(table)
+    new_text = spec["sqlite"].format(row="new")
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(content, tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, content) VALUES (new.id, {new_text}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {spec['watch']} ON {table} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; "
+        f"INSERT INTO {fts}(rowid, content) VALUES (new.id, {new_text}); END",
+        # Index rows that existed before the FTS table
+        f"INSERT INTO {fts}(rowid, content) SELECT id, {spec['sqlite'].format(row=table)} FROM {table} "
+        f"WHERE id NOT IN (SELECT rowid FROM {fts})",
+    ]
+
+
+def _postgres_statements(table: str, spec: dict) -> list:
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', {spec['postgresql']})) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)",
+    ]
+
+
+def install_search(connection):
+    """Create the search index structures for every searchable table that exists."""
+    dialect = connection.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        print(f"Full-text search is not supported on {dialect}; skipping index setup")
+        return
+    existing = set(inspect(connection).get_table_names())
+    for table, spec in SEARCHABLE.items():
+        if table not in existing:
+            continue
+        statements = _postgres_statements(table, spec) if dialect == "postgresql" else _sqlite_statements(table, spec)
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def uninstall_search(connection):
+    dialect = connection.dialect.name
+    for table in SEARCHABLE:
+        if dialect == "postgresql":
+            connection.execute(text(f"DROP INDEX IF EXISTS ix_{table}_search_vector"))
+            connection.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector"))
+        elif dialect == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}"))
+            connection.execute(text(f"DROP TABLE IF EXISTS {fts_table(table)}"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_search_after_create(target, connection, **kw):
+    install_search(connection)
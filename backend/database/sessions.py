@@ -1,6 +1,9 @@
+import threading
+import time
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 # from src.core.config import settings
 from dotenv import load_dotenv
 import os
@@ -9,7 +12,106 @@ load_dotenv()
 
 # Get the URL
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
+# Read replica for admin and analytics reads; those fall back to the primary when unset
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+# Derived from DATABASE_URL (asyncpg for Postgres, aiosqlite for SQLite) unless set
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Connection pool settings, applied to the sync and the async engine separately
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+# Postgres statement_timeout in milliseconds; 0 leaves the server default
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+class PoolWaitStats:
+    """How long requests waited to check a connection out of a pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "timeouts": self.timeouts,
+            }
+
+
+def _timed_pool(base):
+    """A pool class that records checkout wait time on its `wait_stats`."""
+
+    class TimedPool(base):
+        wait_stats = PoolWaitStats()
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+                raise
+            self.wait_stats.record(time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+TimedQueuePool = _timed_pool(QueuePool)
+TimedAsyncQueuePool = _timed_pool(AsyncAdaptedQueuePool)
+
+
+def async_database_url(url: str) -> str:
+    """The async driver variant of a sync database URL."""
+    scheme, _, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+def engine_options(url: str, poolclass) -> dict:
+    """create_engine() keyword arguments for `url` from the DB_* settings."""
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool; sizing and timeouts do not apply
+        return {}
+    options = {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS and url.startswith("postgres"):
+        if "asyncpg" in url:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, TimedQueuePool))
 session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -18,3 +120,79 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Own pool, so dashboard reads queue behind each other rather than behind chat writes
+replica_engine = (
+    create_engine(REPLICA_DATABASE_URL, **engine_options(REPLICA_DATABASE_URL, _timed_pool(QueuePool)))
+    if REPLICA_DATABASE_URL else engine
+)
+replica_session_local = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if REPLICA_DATABASE_URL else session_local
+)
+
+
+def get_read_db():
+    """Session for read-only admin and analytics endpoints; may lag the primary slightly."""
+    db = replica_session_local()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# The async engine is built on first use so the sync-only scripts do not need asyncpg/aiosqlite
+_async_engine = None
+_async_session_local = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    global _async_engine, _async_session_local
+    with _async_lock:
+        if _async_engine is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            url = ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+            _async_engine = create_async_engine(url, **engine_options(url, TimedAsyncQueuePool))
+            _async_session_local = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def async_session_local():
+    get_async_engine()
+    return _async_session_local()
+
+
+async def get_async_db():
+    async with async_session_local() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+def _pool_snapshot(pool) -> dict:
+    snapshot = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        snapshot.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+        })
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats:
+        snapshot["wait"] = wait_stats.snapshot()
+    return snapshot
+
+
+def pool_snapshot() -> dict:
+    """Pool occupancy and checkout wait for the primary, replica (if configured) and async (if started) engines."""
+    return {
+        "sync": _pool_snapshot(engine.pool),
+        "replica": _pool_snapshot(replica_engine.pool) if replica_engine is not engine else None,
+        "async": _pool_snapshot(_async_engine.sync_engine.pool) if _async_engine is not None else None,
+    }
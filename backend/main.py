@@ -1,11 +1,12 @@
 # main.py
 import sys
 import os
-from datetime import timedelta, date
-from typing import List
+from datetime import timedelta, date, datetime
+from typing import List, Optional
 
 # ... (rest of the code) ...
-from fastapi import FastAPI, Depends, HTTPException, Request, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, Request, File, UploadFile, Query
+from fastapi.concurrency import run_in_threadpool
 import shutil
 from fastapi.responses import HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -14,19 +15,31 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from jose import jwt, JWTError
 from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth.auth import (
-    verify_password,
-    get_password_hash,
     create_access_token,
     SECRET_KEY,
     ALGORITHM,
 )
-from database.sessions import session_local
-from database.database import User, Admin, Bot, get_user_by_email, Conversation, Ticket
+from database.sessions import (
+    session_local, replica_session_local, get_db, get_read_db, get_async_db, async_session_local, dispose_async_engine,
+    pool_snapshot,
+)
+from auth.dependencies import get_current_user, get_current_admin, principal_cache
+from auth.passwords import password_hasher, login_throttle
+from database.conversation_writer import conversation_writer
+from database.analytics import analytics_recorder
+from database.database import User, Admin, Bot, get_user_by_email, Conversation, Ticket, OutboundDelivery
 # from backend.ragpipeline import router as rag_router
-from adminbackend.inbox import get_inbox_dates, get_users_by_date, get_user_conversation_by_date
+from adminbackend.inbox import get_inbox_dates, get_channels, get_users_by_date, get_user_conversation_by_date, day_bounds
+from adminbackend.conversations import get_conversation_turns, turn_to_response
+from adminbackend.analytics import get_bot_analytics
+from adminbackend import export
+from adminbackend.search import search as search_records
+from adminbackend.pagination import paginate, set_next_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 from backend.knowledgebase import update_knowledge_base
 import schemas
 from adminbackend import tickets as tickets_crud
@@ -42,6 +55,14 @@ from bots.telecom_bot import router as telecom_router
 from bots.real_estate_bot import router as real_estate_router
 from bots.lead_capturing_bot import router as lead_capturing_router
 from bots.course_enrollment_bot import router as course_enrollment_router
+from bots.circuit_breaker import get_breaker_metrics
+from bots.routing import bot_routes
+from channels.workers import webhook_workers
+from channels.dedup import webhook_dedup
+from channels.outbound import outbound_client
+from channels.email_sender import SendGridSender, SMTPSender
+from channels.deliveries import outbound_deliveries
+from channels.identities import channel_identities
 
 app = FastAPI()
 
@@ -52,6 +73,7 @@ app.add_middleware(
     allow_credentials=False,  # Set to False when using allow_origins=["*"]
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -65,37 +87,11 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 ALLOW_ADMIN_SIGNUP = os.getenv("ALLOW_ADMIN_SIGNUP", "False").lower() == "true"
 
-def get_db():
-    db = session_local()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def get_current_user(request: Request, db: Session = Depends(get_db)):
-    token = request.headers.get("Authorization")
-    if not token or not token.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token format")
-
-    token = token.split(" ")[1]
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-    except JWTError as e:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    user = get_user_by_email(db, email)
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    return user
-
 @app.get("/users/me/bots", response_model=List[schemas.Bot])
 def get_user_bots(
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -105,101 +101,25 @@ def get_user_bots(
     # Assuming a user can be associated with multiple bots, or all bots are available to all users.
     # For now, let's assume all created bots are available to any logged-in user.
     # If bots are user-specific, this query needs to be adjusted.
-    return db.query(Bot).all() # Or filter by user_id if bots are assigned to users
+    page = paginate(db.query(Bot), [Bot.id], cursor, limit, descending=False) # Or filter by user_id if bots are assigned to users
+    set_next_cursor(response, page)
+    return page.items
 
 @app.get("/users/conversations", response_model=List[ConversationResponse])
 def get_user_conversations(
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Returns a list of conversations for the current user across all bots.
-    Groups user questions with bot answers.
+    Each item is a user question paired with the bot answer from the same turn.
     """
-    conversations = db.query(Conversation).filter(Conversation.user_id == current_user.id).order_by(Conversation.created_at.desc()).all()
-    
-    # Group conversations by pairing user questions with bot answers
-    conversation_responses = []
-    grouped_conversations = {}
-    
-    for conv in conversations:
-        interaction_data = conv.interaction if isinstance(conv.interaction, dict) else {}
-        source = interaction_data.get("source", "unknown")
-        content = interaction_data.get("content", "")
-        channel = interaction_data.get("channel", "web")
-        
-        # Use bot_id and rough timestamp grouping to match questions with answers
-        # Group by bot_id and time window (within 1 minute)
-        time_key = conv.created_at.replace(second=0, microsecond=0)  # Round to minute
-        group_key = f"{conv.bot_id}_{time_key}"
-        
-        if group_key not in grouped_conversations:
-            grouped_conversations[group_key] = {
-                "id": conv.id,
-                "user_id": conv.user_id,
-                "bot_id": conv.bot_id,
-                "question": "",
-                "answer": "",
-                "channel": channel,
-                "resolved": conv.resolved,
-                "created_at": conv.created_at,
-                "updated_at": conv.updated_at
-            }
-        
-        if source == "user":
-            grouped_conversations[group_key]["question"] = content
-        elif source == "bot":
-            grouped_conversations[group_key]["answer"] = content
-    
-    # Convert grouped conversations to response format
-    for group in grouped_conversations.values():
-        if group["question"] or group["answer"]:  # Only include if there's actual content
-            conversation_responses.append(ConversationResponse(
-                id=group["id"],
-                user_id=group["user_id"],
-                interaction={
-                    "question": group["question"],
-                    "answer": group["answer"],
-                    "channel": group["channel"]
-                },
-                resolved=group["resolved"],
-                created_at=group["created_at"],
-                updated_at=group["updated_at"]
-            ))
-    
-    return conversation_responses
-    
-    # Process to group questions with their answers
-    grouped_conversations = {}
-    for conv in conversations:
-        # Use a simple grouping strategy - group by timestamp proximity
-        time_key = conv.created_at.strftime("%Y-%m-%d %H:%M")
-        if time_key not in grouped_conversations:
-            grouped_conversations[time_key] = {"question": "", "answer": "", "conv_obj": conv}
-        
-        if conv.source == "user":
-            grouped_conversations[time_key]["question"] = conv.content
-        else:
-            grouped_conversations[time_key]["answer"] = conv.content
-    
-    # Convert grouped conversations back to response format
-    final_responses = []
-    for time_key, data in grouped_conversations.items():
-        if data["question"]:  # Only include if there's a question
-            final_responses.append(ConversationResponse(
-                id=data["conv_obj"].id,
-                user_id=data["conv_obj"].user_id,
-                interaction={
-                    "question": data["question"],
-                    "answer": data["answer"],
-                    "channel": data["conv_obj"].channel
-                },
-                resolved=data["conv_obj"].resolved,
-                created_at=data["conv_obj"].created_at,
-                updated_at=data["conv_obj"].updated_at
-            ))
-    
-    return final_responses
+    page = get_conversation_turns(db, user_id=current_user.id, cursor=cursor, limit=limit)
+    set_next_cursor(response, page)
+    return [ConversationResponse(**turn_to_response(q, a)) for q, a in page.items]
 
 
 # ---------- Serve UI ----------
@@ -223,20 +143,26 @@ class UserCreate(BaseModel):
     phone_number: str
 
 
+def _client_ip(request: Request):
+    return request.client.host if request.client else None
+
+
 @app.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    login_throttle.check(_client_ip(request), user.email)
+
     # check if user already exists by email
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # check if phone number already exists
-    existing_phone = db.query(User).filter(User.phone_number == user.phone_number).first()
+    existing_phone = (await db.execute(select(User).where(User.phone_number == user.phone_number))).scalars().first()
     if existing_phone:
         raise HTTPException(status_code=400, detail="Phone number already registered")
 
     # hash password
-    hashed_pw = get_password_hash(user.password)
+    hashed_pw = await password_hasher.hash(user.password)
 
     # create user object with phone number
     new_user = User(
@@ -245,8 +171,10 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         phone_number=user.phone_number
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    # Messages already sent from this phone number or address were answered as a guest
+    await db.run_sync(channel_identities.claim_identities, new_user)
 
     # generate token for new user
     access_token_expires = timedelta(minutes=30)
@@ -273,12 +201,14 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 #  User Login (Existing)
 # -------------------------
 @app.post("/token")
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login(
+    request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    login_throttle.check(_client_ip(request), form_data.username)
+    user = (await db.execute(select(User).where(User.email == form_data.username))).scalars().first()
+    if not user or not await password_hasher.verify(form_data.password, user.password):
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    await password_hasher.upgrade(db, user, form_data.password)
 
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -334,49 +264,27 @@ class AdminCreate(BaseModel):
     phone_number: str = None
 
 
-def get_admin_by_email(db: Session, email: str):
-    return db.query(Admin).filter(Admin.email == email).first()
-
-
-def get_current_admin(request: Request, db: Session = Depends(get_db)):
-    """Get current admin from JWT token"""
-    token = request.headers.get("Authorization")
-    if not token or not token.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token format")
-
-    token = token.split(" ")[1]
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        user_type: str = payload.get("type")  # "admin" or "user"
-        if email is None or user_type != "admin":
-            raise HTTPException(status_code=401, detail="Invalid admin token")
-    except JWTError as e:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    admin = get_admin_by_email(db, email)
-    if not admin:
-        raise HTTPException(status_code=401, detail="Admin not found")
-
-    return admin
+async def get_admin_by_email(db: AsyncSession, email: str):
+    return (await db.execute(select(Admin).where(Admin.email == email))).scalars().first()
 
 
 @app.post("/admin/register")
-def admin_register(admin: AdminCreate, db: Session = Depends(get_db)):
+async def admin_register(admin: AdminCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    login_throttle.check(_client_ip(request), admin.email)
+
     # Check if admin already exists by email
-    existing_admin = get_admin_by_email(db, admin.email)
+    existing_admin = await get_admin_by_email(db, admin.email)
     if existing_admin:
         raise HTTPException(status_code=400, detail="Admin email already registered")
     
     # Check if phone number already exists (if provided)
     if admin.phone_number:
-        existing_phone = db.query(Admin).filter(Admin.phone_number == admin.phone_number).first()
+        existing_phone = (await db.execute(select(Admin).where(Admin.phone_number == admin.phone_number))).scalars().first()
         if existing_phone:
             raise HTTPException(status_code=400, detail="Phone number already registered")
 
     # Hash password
-    hashed_pw = get_password_hash(admin.password)
+    hashed_pw = await password_hasher.hash(admin.password)
 
     # Create admin object
     new_admin = Admin(
@@ -386,8 +294,8 @@ def admin_register(admin: AdminCreate, db: Session = Depends(get_db)):
         phone_number=admin.phone_number
     )
     db.add(new_admin)
-    db.commit()
-    db.refresh(new_admin)
+    await db.commit()
+    await db.refresh(new_admin)
 
     # Generate token for new admin
     access_token_expires = timedelta(minutes=30)
@@ -403,15 +311,17 @@ def admin_register(admin: AdminCreate, db: Session = Depends(get_db)):
 
 
 @app.post("/admin/token")
-def admin_login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def admin_login(
+    request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
-    admin = get_admin_by_email(db, form_data.username)
-    if not admin or not verify_password(form_data.password, admin.password):
+    login_throttle.check(_client_ip(request), form_data.username)
+    admin = await get_admin_by_email(db, form_data.username)
+    if not admin or not await password_hasher.verify(form_data.password, admin.password):
         raise HTTPException(status_code=400, detail="Invalid admin credentials")
 
     if not admin.is_active:
         raise HTTPException(status_code=400, detail="Admin account is deactivated")
+    await password_hasher.upgrade(db, admin, form_data.password)
 
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -1040,227 +950,337 @@ def generate_embed_script(
 def chat_with_bot(
     bot_id: int,
     message: ChatMessage,
-    db: Session = Depends(get_db)
 ):
     """
     Handle chat messages for embedded chatbots
     This endpoint is public to allow embedded chatbots to work on external websites
     """
-    # Verify bot exists
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
-    if not bot:
+    # Verify bot exists; served from the routing table, so usually no database round trip
+    route = bot_routes.get(bot_id)
+    if not route:
         raise HTTPException(status_code=404, detail="Bot not found")
     
     try:
-        # Route to the appropriate bot based on bot type
-        if bot.bot_type == "Lead Capturing Bot":
-            from bots.lead_capturing_bot import lead_capturing_bot
-            from bots.base_bot import QueryRequest
-            request = QueryRequest(question=message.message)
-            # For embedded bots, we'll simulate a simple user session without authentication
-            response = lead_capturing_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Banking Bot":
-            from bots.banking_bot import banking_bot
-            response = banking_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Retail Bot":
-            from bots.retail_bot import retail_bot
-            response = retail_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Insurance Bot":
-            from bots.insurance_bot import insurance_bot
-            response = insurance_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Hotel Booking Bot":
-            from bots.hotel_booking_bot import hotel_booking_bot
-            response = hotel_booking_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Telecom bot":
-            from bots.telecom_bot import telecom_bot
-            response = telecom_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Course Enrollment bot":
-            from bots.course_enrollment_bot import course_enrollment_bot
-            response = course_enrollment_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Career Counselling Bot":
-            from bots.career_counselling_bot import career_counselling_bot
-            response = career_counselling_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        elif bot.bot_type == "Real estate bot":
-            from bots.real_estate_bot import real_estate_bot
-            response = real_estate_bot.retrieval_chain.invoke({"input": message.message})
-            return {
-                "response": response["answer"],
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
-            }
-        else:
+        if route.instance is None:
             # Fallback for unknown bot types
             return {
-                "response": f"Hello! I'm {bot.name}. Thanks for your message: '{message.message}'. How can I assist you further?",
-                "bot_name": bot.name,
-                "bot_type": bot.bot_type
+                "response": f"Hello! I'm {route.name}. Thanks for your message: '{message.message}'. How can I assist you further?",
+                "bot_name": route.name,
+                "bot_type": route.bot_type
             }
+        # For embedded bots, we'll simulate a simple user session without authentication
+        response = route.instance.get_answer_result(message.message, bot_id)
+        return {
+            "response": response["answer"],
+            "degraded": response["degraded"],
+            "bot_name": route.name,
+            "bot_type": route.bot_type
+        }
     except Exception as e:
         # Fallback if there's an error with the AI processing
         print(f"Error processing message with AI: {e}")
         return {
-            "response": f"Hello! I'm {bot.name}. I received your message about '{message.message}'. Let me help you with that!",
-            "bot_name": bot.name,
-            "bot_type": bot.bot_type,
+            "response": f"Hello! I'm {route.name}. I received your message about '{message.message}'. Let me help you with that!",
+            "bot_name": route.name,
+            "bot_type": route.bot_type,
             "error": "AI processing temporarily unavailable"
         }
 
 
+@app.get("/admin/metrics")
+def get_metrics(current_admin: Admin = Depends(get_current_admin)):
+    """
+    Operational metrics for the admin dashboard, including LLM circuit breaker state.
+    """
+    return {
+        "llm_breakers": get_breaker_metrics(),
+        "conversation_writer": conversation_writer.snapshot(),
+        "analytics_recorder": analytics_recorder.snapshot(),
+        "db_pool": pool_snapshot(),
+        "principal_cache": principal_cache.snapshot(),
+        "password_hasher": password_hasher.snapshot(),
+        "login_throttle": login_throttle.snapshot(),
+        "bot_routes": bot_routes.snapshot(),
+        "webhook_workers": webhook_workers.snapshot(),
+        "webhook_dedup": webhook_dedup.snapshot(),
+        "channel_identities": channel_identities.snapshot(),
+        "outbound_http": outbound_client.snapshot(),
+        "outbound_deliveries": outbound_deliveries.snapshot(),
+        "email": {
+            "sendgrid": sendgrid_client.snapshot() if sendgrid_client else None,
+            "smtp": smtp_sender.snapshot(),
+        },
+    }
+
+
+@app.get("/admin/webhooks/dead-letters")
+def get_webhook_dead_letters(limit: int = Query(100, ge=1, le=1000), current_admin: Admin = Depends(get_current_admin)):
+    """Inbound channel messages that failed every processing attempt, newest first."""
+    return webhook_workers.dead_letters(limit)
+
+
+@app.post("/admin/webhooks/dead-letters/{job_id}/requeue")
+def requeue_webhook_dead_letter(job_id: str, current_admin: Admin = Depends(get_current_admin)):
+    """Put a dead-lettered message back on the queue with a fresh set of attempts."""
+    if not webhook_workers.requeue_dead(job_id):
+        raise HTTPException(status_code=404, detail="Dead letter not found")
+    return {"status": "requeued", "job_id": job_id}
+
+
+@app.get("/admin/outbound-deliveries")
+def get_outbound_deliveries(
+    status: Optional[str] = Query(None, description="pending, sent or failed"),
+    turn_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    current_admin: Admin = Depends(get_current_admin),
+):
+    """Channel replies with their delivery status and attempt count, newest first."""
+    query = db.query(OutboundDelivery)
+    if status:
+        query = query.filter(OutboundDelivery.status == status)
+    if turn_id:
+        query = query.filter(OutboundDelivery.turn_id == turn_id)
+    return [
+        {
+            "id": d.id,
+            "turn_id": d.turn_id,
+            "user_id": d.user_id,
+            "channel": d.channel,
+            "recipient": d.recipient,
+            "status": d.status,
+            "attempts": d.attempts,
+            "next_attempt_at": d.next_attempt_at,
+            "last_error": d.last_error,
+            "created_at": d.created_at,
+            "delivered_at": d.delivered_at,
+        }
+        for d in query.order_by(OutboundDelivery.id.desc()).limit(limit)
+    ]
+
+
+@app.on_event("startup")
+async def start_webhook_workers():
+    await webhook_workers.start()
+    outbound_deliveries.start()
+
+
+@app.on_event("shutdown")
+async def stop_webhook_workers():
+    # Before the writer drains, so turns saved by jobs finishing now are flushed
+    await webhook_workers.stop()
+    await outbound_deliveries.stop()
+    # After the workers, whose last replies may still be in flight
+    await outbound_client.close()
+
+
+@app.on_event("shutdown")
+def drain_conversation_writer():
+    """Flush queued conversation messages before the process exits."""
+    conversation_writer.stop()
+    # After the writer, so the messages it just flushed are counted
+    analytics_recorder.stop()
+
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await dispose_async_engine()
+
+
+@app.get("/admin/bots/{bot_id}/analytics")
+def get_bot_analytics_route(
+    bot_id: int,
+    granularity: str = "day",
+    since: datetime = None,
+    until: datetime = None,
+    db: Session = Depends(get_read_db),
+    current_admin: Admin = Depends(get_current_admin),
+):
+    """
+    Hourly or daily message, user, channel, cache, escalation and latency aggregates
+    for one bot, read from the pre-aggregated analytics counters. Bot 0 holds the
+    traffic not tied to a bot, i.e. the channel hooks (WhatsApp, SMS, email, Telegram, ...).
+    """
+    return get_bot_analytics(db, bot_id, granularity=granularity, since=since, until=until)
+
+
+def _day_range(since: Optional[date], until: Optional[date], tz: Optional[str]):
+    """[since, until] as whole days in `tz`, converted to the stored UTC timestamps."""
+    start = day_bounds(since, tz)[0] if since else None
+    end = day_bounds(until, tz)[1] if until else None
+    return start, end
+
+
+@app.get("/admin/bots/{bot_id}/export/conversations")
+def export_bot_conversations(
+    bot_id: int,
+    request: Request,
+    format: str = "ndjson",
+    since: date = None,
+    until: date = None,
+    channel: str = None,
+    tz: str = None,
+    current_admin: Admin = Depends(get_current_admin),
+):
+    """
+    Stream a bot's conversation messages as NDJSON or CSV, oldest first, optionally
+    limited to a day range (inclusive) and a channel.
+    """
+    start, end = _day_range(since, until, tz)
+    records = export.conversation_records(
+        bot_id, since=start, until=end, channel=channel, session_factory=replica_session_local
+    )
+    filename = export.export_filename("conversations", bot_id, format)
+    return export.streaming_export(request, records, format, export.CONVERSATION_FIELDS, filename)
+
+
+@app.get("/admin/bots/{bot_id}/export/tickets")
+def export_bot_tickets(
+    bot_id: int,
+    request: Request,
+    format: str = "ndjson",
+    since: date = None,
+    until: date = None,
+    tz: str = None,
+    current_admin: Admin = Depends(get_current_admin),
+):
+    """Stream a bot's tickets as NDJSON or CSV, oldest first, optionally limited to a day range."""
+    start, end = _day_range(since, until, tz)
+    records = export.ticket_records(bot_id, since=start, until=end, session_factory=replica_session_local)
+    filename = export.export_filename("tickets", bot_id, format)
+    return export.streaming_export(request, records, format, export.TICKET_FIELDS, filename)
+
+
+@app.get("/admin/search")
+def search_route(
+    q: str,
+    response: Response,
+    type: str = "conversations",
+    bot_id: int = None,
+    since: date = None,
+    until: date = None,
+    tz: str = None,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+    current_admin: Admin = Depends(get_current_admin),
+):
+    """
+    Ranked full-text search over conversation content (type=conversations) or ticket
+    topic and description (type=tickets), optionally limited to a bot and a day range.
+    """
+    start, end = _day_range(since, until, tz)
+    page = search_records(db, q, type, bot_id=bot_id, since=start, until=end, cursor=cursor, limit=limit)
+    set_next_cursor(response, page)
+    return page.items
+
+
 @app.get("/admin/bots/{bot_id}/inbox/dates", response_model=List[date])
-def get_bot_inbox_dates_route(bot_id: int, db: Session = Depends(get_db)):
-    return get_inbox_dates(db, bot_id=bot_id)
+def get_bot_inbox_dates_route(bot_id: int, tz: str = None, db: Session = Depends(get_read_db)):
+    return get_inbox_dates(db, bot_id=bot_id, tz=tz)
 
 
 @app.get("/admin/bots/{bot_id}/inbox/users", response_model=List[UserResponse])
-def get_bot_users_by_date_route(bot_id: int, date: date, db: Session = Depends(get_db)):
-    return get_users_by_date(db, date, bot_id=bot_id)
+def get_bot_users_by_date_route(
+    bot_id: int,
+    date: date,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    tz: str = None,
+    db: Session = Depends(get_read_db),
+):
+    page = get_users_by_date(db, date, bot_id=bot_id, cursor=cursor, limit=limit, tz=tz)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @app.get("/admin/bots/{bot_id}/inbox/conversations", response_model=List[ConversationResponse])
-def get_bot_user_conversation_by_date_route(bot_id: int, user_id: int, date: date, db: Session = Depends(get_db)):
-    return get_user_conversation_by_date(db, user_id, date, bot_id=bot_id)
+def get_bot_user_conversation_by_date_route(
+    bot_id: int,
+    user_id: int,
+    date: date,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    tz: str = None,
+    db: Session = Depends(get_read_db),
+):
+    page = get_user_conversation_by_date(db, user_id, date, bot_id=bot_id, cursor=cursor, limit=limit, tz=tz)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @app.get("/admin/bots/{bot_id}/channels", response_model=List[str])
-def list_bot_channels(bot_id: int, db: Session = Depends(get_db)):
-    conversations = db.query(Conversation).filter(Conversation.bot_id == bot_id).all()
-    channel_set = {c.interaction.get("channel") for c in conversations if c.interaction.get("channel")}
-    return sorted(list(channel_set))
+def list_bot_channels(bot_id: int, db: Session = Depends(get_read_db)):
+    return get_channels(db, bot_id=bot_id)
 
 @app.get("/admin/bots/{bot_id}/channels/{channel_name}/users", response_model=List[UserResponse])
-def get_bot_users_by_channel(bot_id: int, channel_name: str, db: Session = Depends(get_db)):
-    conversations = db.query(Conversation).filter(Conversation.bot_id == bot_id, Conversation.interaction["channel"].astext == channel_name).all()
-    if not conversations:
-        return []
-    
-    user_ids = {c.user_id for c in conversations}
-    
-    users = db.query(User).filter(User.id.in_(user_ids)).all()
-    return users
+def get_bot_users_by_channel(
+    bot_id: int,
+    channel_name: str,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    user_ids = (
+        db.query(Conversation.user_id)
+        .filter(Conversation.bot_id == bot_id, Conversation.channel == channel_name)
+        .distinct()
+    )
+    page = paginate(db.query(User).filter(User.id.in_(user_ids)), [User.id], cursor, limit, descending=False)
+    set_next_cursor(response, page)
+    return page.items
 
 @app.get("/admin/bots/{bot_id}/channels/{channel_name}/users/{user_id}/conversations", response_model=List[ConversationResponse])
-def get_bot_user_conversations_by_channel(bot_id: int, channel_name: str, user_id: int, db: Session = Depends(get_db)):
-    conversations = (
-        db.query(Conversation)
-        .filter(
-            Conversation.bot_id == bot_id,
-            Conversation.user_id == user_id,
-            Conversation.interaction["channel"].astext == channel_name
-        )
-        .order_by(Conversation.created_at.asc())
-        .all()
+def get_bot_user_conversations_by_channel(
+    bot_id: int,
+    channel_name: str,
+    user_id: int,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    query = db.query(Conversation).filter(
+        Conversation.bot_id == bot_id,
+        Conversation.user_id == user_id,
+        Conversation.channel == channel_name
     )
-    return conversations
+    page = paginate(query, [Conversation.created_at, Conversation.id], cursor, limit, descending=False)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @app.get("/admin/bots/{bot_id}/conversations", response_model=List[ConversationResponse])
 def get_bot_all_conversations(
     bot_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin),
 ):
     """
     Get all conversations for a specific bot with grouped question/answer pairs.
     Returns conversations with user details for admin dashboard.
     """
-    conversations = db.query(Conversation).filter(Conversation.bot_id == bot_id).order_by(Conversation.created_at.desc()).all()
-    
-    # Group conversations by pairing user questions with bot answers
-    conversation_responses = []
-    grouped_conversations = {}
-    
-    for conv in conversations:
-        interaction_data = conv.interaction if isinstance(conv.interaction, dict) else {}
-        source = interaction_data.get("source", "unknown")
-        content = interaction_data.get("content", "")
-        channel = interaction_data.get("channel", "web")
-        
-        # Use user_id and rough timestamp grouping to match questions with answers
-        time_key = conv.created_at.replace(second=0, microsecond=0)  # Round to minute
-        group_key = f"{conv.user_id}_{time_key}"
-        
-        if group_key not in grouped_conversations:
-            grouped_conversations[group_key] = {
-                "id": conv.id,
-                "user_id": conv.user_id,
-                "bot_id": conv.bot_id,
-                "question": "",
-                "answer": "",
-                "channel": channel,
-                "resolved": conv.resolved,
-                "created_at": conv.created_at,
-                "updated_at": conv.updated_at
-            }
-        
-        if source == "user":
-            grouped_conversations[group_key]["question"] = content
-        elif source == "bot":
-            grouped_conversations[group_key]["answer"] = content
-    
-    # Convert grouped conversations to response format
-    for group in grouped_conversations.values():
-        if group["question"] or group["answer"]:  # Only include if there's actual content
-            conversation_responses.append(ConversationResponse(
-                id=group["id"],
-                user_id=group["user_id"],
-                interaction={
-                    "question": group["question"],
-                    "answer": group["answer"],
-                    "channel": group["channel"]
-                },
-                resolved=group["resolved"],
-                created_at=group["created_at"],
-                updated_at=group["updated_at"]
-            ))
-    
-    return conversation_responses
+    page = get_conversation_turns(db, bot_id=bot_id, cursor=cursor, limit=limit)
+    set_next_cursor(response, page)
+    return [ConversationResponse(**turn_to_response(q, a)) for q, a in page.items]
 
 
 @app.get("/admin/bots/{bot_id}/users/{user_id}", response_model=UserResponse)
 def get_bot_user_details(
     bot_id: int,
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin),
 ):
     """
@@ -1285,16 +1305,21 @@ def get_bot_user_details(
 @app.get("/admin/bots/{bot_id}/tickets", response_model=List[schemas.Ticket])
 def get_bot_tickets_route(
     bot_id: int, 
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin),
 ):
-    return tickets_crud.get_bot_tickets(db=db, bot_id=bot_id)
+    page = tickets_crud.get_bot_tickets_page(db=db, bot_id=bot_id, cursor=cursor, limit=limit)
+    set_next_cursor(response, page)
+    return page.items
 
 @app.get("/admin/bots/{bot_id}/tickets/{ticket_id}")
 def get_bot_ticket_details_route(
     bot_id: int, 
     ticket_id: int, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin),
 ):
     ticket = tickets_crud.get_bot_ticket_details(db=db, bot_id=bot_id, ticket_id=ticket_id)
@@ -1350,78 +1375,99 @@ class ConversationResponse(BaseModel):
 # -------------------------
 
 @app.get("/admin/channels", response_model=List[str])
-def list_channels(db: Session = Depends(get_db)):
+def list_channels(db: Session = Depends(get_read_db)):
     """Return a list of unique channel names from conversations."""
-    # This query is complex to do in pure SQLAlchemy, so we use a little trick.
-    # We get all conversations, extract the channel name from the interaction JSON,
-    # and then find the unique set.
-    conversations = db.query(Conversation).all()
-    channel_set = {c.interaction.get("channel") for c in conversations if c.interaction.get("channel")}
-    return sorted(list(channel_set))
+    return get_channels(db)
 
 @app.get("/admin/channels/{channel_name}/users", response_model=List[UserResponse])
-def get_users_by_channel(channel_name: str, db: Session = Depends(get_db)):
-    """Return a list of users who have interacted on a specific channel."""
-    # Find all conversations for the given channel
-    conversations = db.query(Conversation).filter(Conversation.interaction["channel"].astext == channel_name).all()
-    if not conversations:
-        return []
-    
-    # Get the unique user IDs from those conversations
-    user_ids = {c.user_id for c in conversations}
-    
-    # Get the user objects for those IDs
-    users = db.query(User).filter(User.id.in_(user_ids)).all()
-    return users
+def get_users_by_channel(
+    channel_name: str,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    """Return a page of users who have interacted on a specific channel."""
+    user_ids = (
+        db.query(Conversation.user_id)
+        .filter(Conversation.channel == channel_name)
+        .distinct()
+    )
+    page = paginate(db.query(User).filter(User.id.in_(user_ids)), [User.id], cursor, limit, descending=False)
+    set_next_cursor(response, page)
+    return page.items
 
 @app.get("/admin/channels/{channel_name}/users/{user_id}/conversations", response_model=List[ConversationResponse])
-def get_user_conversations_by_channel(channel_name: str, user_id: int, db: Session = Depends(get_db)):
-    """Return all conversations for a specific user on a specific channel."""
-    conversations = (
-        db.query(Conversation)
-        .filter(
-            Conversation.user_id == user_id,
-            Conversation.interaction["channel"].astext == channel_name
-        )
-        .order_by(Conversation.created_at.asc())
-        .all()
+def get_user_conversations_by_channel(
+    channel_name: str,
+    user_id: int,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    """Return a page of a specific user's conversations on a specific channel, oldest first."""
+    query = db.query(Conversation).filter(
+        Conversation.user_id == user_id,
+        Conversation.channel == channel_name
     )
-    return conversations
+    page = paginate(query, [Conversation.created_at, Conversation.id], cursor, limit, descending=False)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @app.get("/admin/inbox/dates", response_model=List[date])
-def get_inbox_dates_route(db: Session = Depends(get_db)):
+def get_inbox_dates_route(tz: str = None, db: Session = Depends(get_read_db)):
     """
-    Returns all distinct dates where interactions happened for any bot.
+    Returns all distinct dates (days in `tz`, default INBOX_TIMEZONE) where interactions happened for any bot.
     """
-    return get_inbox_dates(db)
+    return get_inbox_dates(db, tz=tz)
 
 
 @app.get("/admin/inbox/users", response_model=List[UserResponse])
-def get_users_by_date_route(date: date, db: Session = Depends(get_db)):
-    return get_users_by_date(db, date)
+def get_users_by_date_route(
+    date: date,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    tz: str = None,
+    db: Session = Depends(get_read_db),
+):
+    page = get_users_by_date(db, date, cursor=cursor, limit=limit, tz=tz)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @app.get("/admin/inbox/conversations", response_model=List[ConversationResponse])
-def get_user_conversation_by_date_route(user_id: int, date: date, db: Session = Depends(get_db)):
-    return get_user_conversation_by_date(db, user_id, date)
+def get_user_conversation_by_date_route(
+    user_id: int,
+    date: date,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    tz: str = None,
+    db: Session = Depends(get_read_db),
+):
+    page = get_user_conversation_by_date(db, user_id, date, cursor=cursor, limit=limit, tz=tz)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @app.post("/create-admin")
-def create_admin_user(admin: AdminCreate, db: Session = Depends(get_db)):
+async def create_admin_user(admin: AdminCreate, db: AsyncSession = Depends(get_async_db)):
     if not ALLOW_ADMIN_SIGNUP:
         raise HTTPException(status_code=404, detail="Not Found")
 
-    existing_admin = get_admin_by_email(db, admin.email)
+    existing_admin = await get_admin_by_email(db, admin.email)
     if existing_admin:
         raise HTTPException(status_code=400, detail="Admin email already registered")
 
     if admin.phone_number:
-        existing_phone = db.query(Admin).filter(Admin.phone_number == admin.phone_number).first()
+        existing_phone = (await db.execute(select(Admin).where(Admin.phone_number == admin.phone_number))).scalars().first()
         if existing_phone:
             raise HTTPException(status_code=400, detail="Phone number already registered")
 
-    hashed_pw = get_password_hash(admin.password)
+    hashed_pw = await password_hasher.hash(admin.password)
 
     new_admin = Admin(
         email=admin.email,
@@ -1430,17 +1476,16 @@ def create_admin_user(admin: AdminCreate, db: Session = Depends(get_db)):
         phone_number=admin.phone_number
     )
     db.add(new_admin)
-    db.commit()
-    db.refresh(new_admin)
+    await db.commit()
+    await db.refresh(new_admin)
 
     return {"msg": "Admin created successfully"}
 
 # -------------------------
 #  Omnichannel Webhooks
 # -------------------------
-from bot_loader import get_bot_by_type
 from twilio.rest import Client
-from backend.ragpipeline import retrieval_chain, save_conversation
+from backend.ragpipeline import answer_question
 from channels.builders.web import WebMessageBuilder
 from channels.builders.twilio import TwilioMessageBuilder
 from channels.builders.sms import SmsMessageBuilder # New import
@@ -1450,7 +1495,6 @@ from channels.builders.instagram import InstagramMessageBuilder # Instagram impo
 from channels.builders.messenger import MessengerMessageBuilder # Messenger import
 from channels.schemas import StandardizedMessage
 from typing import Dict, Any
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import imaplib
@@ -1458,9 +1502,7 @@ import email
 from email.header import decode_header
 import threading
 import time
-from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, From, To, Subject, PlainTextContent, HtmlContent
-import requests
 import json
 
 # --- Twilio Configuration ---
@@ -1527,14 +1569,23 @@ print(f"EMAIL_IMAP_SERVER: {EMAIL_IMAP_SERVER}")
 print(f"EMAIL_IMAP_PORT: {EMAIL_IMAP_PORT}")
 print("=== END EMAIL CONFIGURATION ===")
 
-# Initialize SendGrid client
+# Initialize SendGrid client (one keep-alive session shared by all sends)
 sendgrid_client = None
 if SENDGRID_API_KEY:
-    sendgrid_client = SendGridAPIClient(api_key=SENDGRID_API_KEY)
+    sendgrid_client = SendGridSender(SENDGRID_API_KEY)
     print("SendGrid client initialized successfully")
 else:
     print("WARNING: SendGrid API key not found. Email sending will use SMTP fallback.")
 
+# SMTP fallback keeps authenticated connections open between replies
+smtp_sender = SMTPSender(EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT, EMAIL_USERNAME, EMAIL_PASSWORD)
+
+
+@app.on_event("shutdown")
+def stop_smtp_sender():
+    # Registered after the webhook workers' hook, so their last replies are queued by now
+    smtp_sender.stop()
+
 # Initialize the Twilio client if credentials are provided
 twilio_client = None
 if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
@@ -1570,8 +1621,8 @@ def send_email_reply(to_email: str, subject: str, body: str, reply_to_subject: s
                 html_content=html_content
             )
             
-            response = sendgrid_client.send(mail)
-            print(f"SendGrid email sent successfully to: {to_email} (Status: {response.status_code})")
+            status_code = sendgrid_client.send(mail)
+            print(f"SendGrid email sent successfully to: {to_email} (Status: {status_code})")
             return True
             
         except Exception as e:
@@ -1579,7 +1630,7 @@ def send_email_reply(to_email: str, subject: str, body: str, reply_to_subject: s
             print("Falling back to SMTP...")
     
     # Fallback to SMTP
-    if not EMAIL_USERNAME or not EMAIL_PASSWORD:
+    if not smtp_sender.configured:
         print("ERROR: No email credentials configured (neither SendGrid nor SMTP)")
         return False
     
@@ -1593,13 +1644,8 @@ def send_email_reply(to_email: str, subject: str, body: str, reply_to_subject: s
         # Add body
         msg.attach(MIMEText(body, 'plain'))
         
-        # Send email
-        server = smtplib.SMTP(EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(EMAIL_USERNAME, to_email, text)
-        server.quit()
+        # Send over a pooled connection; waits for the server to accept it
+        smtp_sender.send(EMAIL_USERNAME, to_email, msg.as_string())
         
         print(f"SMTP email sent successfully to: {to_email}")
         return True
@@ -1610,7 +1656,7 @@ def send_email_reply(to_email: str, subject: str, body: str, reply_to_subject: s
 
 
 # Telegram sending functions
-def send_telegram_message(chat_id: str, text: str):
+async def send_telegram_message(chat_id: str, text: str):
     """Send message via Telegram Bot API"""
     if not TELEGRAM_BOT_TOKEN:
         print("ERROR: Telegram bot token not configured")
@@ -1624,7 +1670,7 @@ def send_telegram_message(chat_id: str, text: str):
             "parse_mode": "HTML"  # Enable HTML formatting
         }
         
-        response = requests.post(url, json=payload)
+        response = await outbound_client.post("telegram", url, json=payload)
         
         if response.status_code == 200:
             print(f"Telegram message sent successfully to chat_id: {chat_id}")
@@ -1638,7 +1684,7 @@ def send_telegram_message(chat_id: str, text: str):
         return False
 
 
-def set_telegram_webhook():
+async def set_telegram_webhook():
     """Set up Telegram webhook"""
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_WEBHOOK_URL:
         print("WARNING: Telegram credentials not configured, skipping webhook setup")
@@ -1650,7 +1696,7 @@ def set_telegram_webhook():
             "url": TELEGRAM_WEBHOOK_URL
         }
         
-        response = requests.post(url, json=payload)
+        response = await outbound_client.post("telegram", url, json=payload)
         
         if response.status_code == 200:
             result = response.json()
@@ -1670,7 +1716,7 @@ def set_telegram_webhook():
 
 
 # Instagram sending functions
-def send_instagram_message(recipient_id: str, text: str):
+async def send_instagram_message(recipient_id: str, text: str):
     """Send message via Instagram Graph API"""
     if not INSTAGRAM_ACCESS_TOKEN:
         print("ERROR: Instagram access token not configured")
@@ -1684,7 +1730,7 @@ def send_instagram_message(recipient_id: str, text: str):
             "access_token": INSTAGRAM_ACCESS_TOKEN
         }
         
-        response = requests.post(url, json=payload)
+        response = await outbound_client.post("instagram", url, json=payload)
         
         if response.status_code == 200:
             print(f"Instagram message sent successfully to recipient_id: {recipient_id}")
@@ -1699,7 +1745,7 @@ def send_instagram_message(recipient_id: str, text: str):
 
 
 # Messenger sending functions
-def send_messenger_message(recipient_id: str, text: str):
+async def send_messenger_message(recipient_id: str, text: str):
     """Send message via Messenger Graph API"""
     if not MESSENGER_ACCESS_TOKEN:
         print("ERROR: Messenger access token not configured")
@@ -1713,7 +1759,7 @@ def send_messenger_message(recipient_id: str, text: str):
             "access_token": MESSENGER_ACCESS_TOKEN
         }
         
-        response = requests.post(url, json=payload)
+        response = await outbound_client.post("messenger", url, json=payload)
         
         if response.status_code == 200:
             print(f"Messenger message sent successfully to recipient_id: {recipient_id}")
@@ -1837,22 +1883,18 @@ def process_incoming_email(email_payload):
             return
 
         # Generate AI response
-        result = retrieval_chain.invoke({"input": question})
+        result = answer_question(question)
         ai_response_text = result.get("answer", "I could not find an answer.")
 
-        # Save conversation in the same format as web chat (question + answer together)
-        conversation = Conversation(
+        # Save the question and answer as one linked turn
+        save_conversation_turn(
+            db=db,
             user_id=user.id,
-            interaction={
-                "question": question, 
-                "answer": ai_response_text,
-                "channel": "email"
-            },
-            resolved=False,
+            bot_id=None,
+            question=question,
+            answer=ai_response_text,
+            channel="email",
         )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
 
         # Send email reply
         original_subject = standardized_message.metadata.get("subject", "")
@@ -1891,7 +1933,7 @@ def start_email_polling():
     else:
         print("Email IMAP polling disabled - using SendGrid webhooks for incoming emails")
 
-from bots.base_bot import QueryRequest, save_conversation
+from bots.base_bot import QueryRequest, save_conversation_turn, save_conversation_turn_async
 
 @app.post("/bots/{bot_id}/query")
 def ask_question(
@@ -1901,44 +1943,25 @@ def ask_question(
     current_user: User = Depends(get_current_user),
 ):
     """Handle user questions and return AI-generated answers"""
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
-    if not bot:
+    route = bot_routes.get(bot_id)
+    if not route:
         raise HTTPException(status_code=404, detail="Bot not found")
 
-    bot_instance = get_bot_by_type(bot.bot_type)
+    bot_instance = route.instance
     if not bot_instance:
         raise HTTPException(status_code=500, detail="Bot implementation not found")
 
     question = request.question
-    cached = bot_instance.get_cached_answer(question)
-
-    if cached:
-        answer = cached["answer"]
-    else:
-        result = bot_instance.retrieval_chain.invoke({"input": question})
-        answer = result["answer"]
-        bot_instance.set_cached_answer(question, result)
-
-    # Save the user's question
-    save_conversation(
-        db=db,
-        user_id=current_user.id,
-        bot_id=bot_id,
-        source="user",
-        content=question,
-        channel="web",
-        resolved=False,
-    )
+    answer = bot_instance.get_answer(question, bot_id)
 
-    # Save the bot's answer
-    save_conversation(
+    # Save the question and answer as one linked turn
+    save_conversation_turn(
         db=db,
         user_id=current_user.id,
         bot_id=bot_id,
-        source="bot",
-        content=answer,
+        question=question,
+        answer=answer,
         channel="web",
-        resolved=False, # Or determine based on answer
     )
 
     # Check if human assistance is needed using the bot's detection logic
@@ -1954,7 +1977,7 @@ def ask_question(
 
 
 @app.post("/hooks/web")
-async def handle_web_message(payload: Dict[Any, Any], db: Session = Depends(get_db)):
+async def handle_web_message(payload: Dict[Any, Any], db: AsyncSession = Depends(get_async_db)):
     """
     Handles incoming messages from the web chat, gets an AI response, and returns it.
     """
@@ -1963,29 +1986,21 @@ async def handle_web_message(payload: Dict[Any, Any], db: Session = Depends(get_
         standardized_message = builder.build()
         question = standardized_message.content
 
-        # --- Find user and save their message ---
-        user = db.query(User).filter(User.email == standardized_message.sender_id).first()
-        if not user:
+        # --- Find user ---
+        user_id = await channel_identities.resolve_message(db, standardized_message, create_guest=False)
+        if user_id is None:
             raise HTTPException(status_code=404, detail=f"User with email '{standardized_message.sender_id}' not found.")
 
-        save_conversation(
-            db=db, 
-            user_id=user.id, 
-            source="user", 
-            content=question, 
-            channel=standardized_message.channel_name
-        )
-
-        # --- Generate and Save AI Response ---
-        result = retrieval_chain.invoke({"input": question})
+        # --- Generate AI Response and save the turn ---
+        result = await run_in_threadpool(answer_question, question)
         ai_response_text = result.get("answer", "I could not find an answer.")
 
-        save_conversation(
-            db=db, 
-            user_id=user.id, 
-            source="bot", 
-            content=ai_response_text, 
-            channel=standardized_message.channel_name
+        await save_conversation_turn_async(
+            db=db,
+            user_id=user_id,
+            question=question,
+            answer=ai_response_text,
+            channel=standardized_message.channel_name,
         )
 
         # Return the AI response to the frontend
@@ -1995,10 +2010,74 @@ async def handle_web_message(payload: Dict[Any, Any], db: Session = Depends(get_
         raise HTTPException(status_code=400, detail=str(e))
 
 
+async def enqueue_webhook_message(message: StandardizedMessage) -> Optional[str]:
+    """
+    Durably queue an inbound message for the webhook workers, returning the job id,
+    or None for a provider redelivery of a message already queued. Providers get a
+    503 (and retry) if it cannot be stored, rather than an acknowledgement for a lost message.
+    """
+    return (await enqueue_webhook_messages([message]))[0]
+
+
+async def enqueue_webhook_messages(messages: List[StandardizedMessage]) -> List[Optional[str]]:
+    """
+    Queue every message of a batched delivery in one write, as separate jobs so
+    they are answered in parallel. Returns a job id per message, None for duplicates.
+    """
+    duplicate = []
+    for message in messages:
+        seen = await run_in_threadpool(webhook_dedup.seen, message.channel_name, message.message_id)
+        if seen:
+            print(f"Dropping duplicate {message.channel_name} delivery {message.message_id}")
+        duplicate.append(seen)
+    fresh = [message for message, seen in zip(messages, duplicate) if not seen]
+    try:
+        queued = iter(await webhook_workers.submit_many(fresh))
+    except Exception as e:
+        print(f"ERROR: Failed to queue {len(fresh)} webhook message(s): {e}")
+        # Let the provider's retry through
+        for message in fresh:
+            await run_in_threadpool(webhook_dedup.forget, message.channel_name, message.message_id)
+        raise HTTPException(status_code=503, detail="Message could not be queued, please retry")
+    return [None if seen else next(queued) for seen in duplicate]
+
+
+async def generate_answer(question: str) -> str:
+    """The AI answer for a queued channel message."""
+    result = await run_in_threadpool(answer_question, question)
+    return result.get("answer", "I could not find an answer.")
+
+
+async def send_twilio_reply(recipient: str, text: str, from_number: str):
+    if not twilio_client:
+        raise RuntimeError("Twilio client not initialized")
+    await run_in_threadpool(twilio_client.messages.create, from_=from_number, body=text, to=recipient)
+    print(f"Twilio reply sent FROM: {from_number} TO: {recipient}")
+
+
+async def send_email_delivery(recipient: str, text: str, reply_to_subject: str = ""):
+    return await run_in_threadpool(
+        send_email_reply,
+        to_email=recipient,
+        subject="AI Assistant Response",
+        body=text,
+        reply_to_subject=reply_to_subject,
+    )
+
+
+# Reply senders by conversation channel; failed replies are stored and retried from outbound_deliveries
+outbound_deliveries.register("whatsapp", send_twilio_reply)
+outbound_deliveries.register("sms", send_twilio_reply)
+outbound_deliveries.register("email", send_email_delivery)
+outbound_deliveries.register("telegram", send_telegram_message)
+outbound_deliveries.register("instagram", send_instagram_message)
+outbound_deliveries.register("messenger", send_messenger_message)
+
+
 @app.post("/hooks/twilio")
-async def handle_twilio_message(request: Request, db: Session = Depends(get_db)):
+async def handle_twilio_message(request: Request):
     """
-    Handles incoming WhatsApp and SMS messages from Twilio, gets an AI response, and sends a reply.
+    Queues incoming WhatsApp and SMS messages from Twilio; a webhook worker answers them.
     """
     try:
         payload = await request.form()
@@ -2007,154 +2086,75 @@ async def handle_twilio_message(request: Request, db: Session = Depends(get_db))
         print("=== TWILIO WEBHOOK DEBUG ===")
         for key, value in payload.items():
             print(f"{key}: {value}")
-        
-        # Check if this is a WhatsApp message by examining the 'From' field
-        from_number = payload.get("From", "")
-        to_number = payload.get("To", "")
-        is_whatsapp = from_number.startswith("whatsapp:")
-        
-        print(f"From: {from_number}")
-        print(f"To: {to_number}")
-        print(f"Is WhatsApp: {is_whatsapp}")
         print("=== END DEBUG ===")
         
-        builder = TwilioMessageBuilder(payload)
+        builder = TwilioMessageBuilder(dict(payload))
         standardized_message = builder.build()
-        question = standardized_message.content
+    except Exception as e:
+        print(f"An unexpected error occurred in handle_twilio_message: {e}")
+        return Response(content="", media_type="application/xml")
 
-        # --- Find user and save their message ---
-        user = db.query(User).filter(User.phone_number == standardized_message.sender_id).first()
-        if not user:
-            print(f"User with phone number '{standardized_message.sender_id}' not found.")
-            return Response(content="", media_type="application/xml")
+    await enqueue_webhook_message(standardized_message)
+    return Response(content="", media_type="application/xml")
 
-        # --- Generate and Send AI Response ---
-        result = retrieval_chain.invoke({"input": question})
-        ai_response_text = result.get("answer", "I could not find an answer.")
 
-        # Save conversation in the same format as web chat (question + answer together)
-        conversation = Conversation(
-            user_id=user.id,
-            interaction={
-                "question": question, 
-                "answer": ai_response_text,
-                "channel": "whatsapp" if is_whatsapp else "sms"
-            },
-            resolved=False,
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+async def process_twilio_message(message: StandardizedMessage):
+    """Answer a queued WhatsApp or SMS message received through /hooks/twilio."""
+    is_whatsapp = message.metadata.get("From", "").startswith("whatsapp:")
 
-        # --- Send Reply via Twilio (Channel-specific) ---
-        if twilio_client:
-            try:
-                if is_whatsapp:
-                    # WhatsApp message - reply via WhatsApp
-                    if not TWILIO_WHATSAPP_NUMBER:
-                        print("ERROR: TWILIO_WHATSAPP_NUMBER not configured")
-                        return Response(content="", media_type="application/xml")
-                    
-                    reply_to = f"whatsapp:{standardized_message.sender_id}"
-                    print(f"Sending WhatsApp reply FROM: {TWILIO_WHATSAPP_NUMBER} TO: {reply_to}")
-                    
-                    twilio_client.messages.create(
-                        from_=TWILIO_WHATSAPP_NUMBER,
-                        body=ai_response_text,
-                        to=reply_to
-                    )
-                    print(f"WhatsApp reply sent successfully")
-                else:
-                    # SMS message - reply via SMS
-                    if not TWILIO_SMS_NUMBER:
-                        print("ERROR: TWILIO_SMS_NUMBER not configured")
-                        return Response(content="", media_type="application/xml")
-                    
-                    reply_to = standardized_message.sender_id
-                    print(f"Sending SMS reply FROM: {TWILIO_SMS_NUMBER} TO: {reply_to}")
-                    
-                    twilio_client.messages.create(
-                        from_=TWILIO_SMS_NUMBER,
-                        body=ai_response_text,
-                        to=reply_to
-                    )
-                    print(f"SMS reply sent successfully")
-                    
-            except Exception as e:
-                print(f"ERROR: Failed to send Twilio message: {e}")
-        else:
-            print("ERROR: Twilio client not initialized")
-        
-        return Response(content="", media_type="application/xml")
-
-    except Exception as e:
-        print(f"An unexpected error occurred in handle_twilio_message: {e}")
-        return Response(content="", media_type="application/xml")
+    channel = "whatsapp" if is_whatsapp else "sms"
+    if is_whatsapp:
+        from_number, reply_to = TWILIO_WHATSAPP_NUMBER, f"whatsapp:{message.sender_id}"
+    else:
+        from_number, reply_to = TWILIO_SMS_NUMBER, message.sender_id
+    if not from_number:
+        print(f"ERROR: {'TWILIO_WHATSAPP_NUMBER' if is_whatsapp else 'TWILIO_SMS_NUMBER'} not configured")
+
+    async with async_session_local() as db:
+        user_id = await channel_identities.resolve_message(db, message)
+        # The turn and its reply are recorded once, so a retried job does not answer again
+        await outbound_deliveries.answer_once(
+            db, message, user_id, channel, generate_answer,
+            recipient=reply_to if from_number else None, from_number=from_number,
+        )
 
 
 @app.post("/hooks/sms")
-async def handle_sms_message(request: Request, db: Session = Depends(get_db)):
+async def handle_sms_message(request: Request):
     """
-    Handles incoming SMS from Twilio, gets an AI response, and sends a reply.
+    Queues incoming SMS from Twilio; a webhook worker answers them.
     """
     try:
         payload = await request.form()
         
-        builder = SmsMessageBuilder(payload)
+        builder = SmsMessageBuilder(dict(payload))
         standardized_message = builder.build()
-        question = standardized_message.content
+    except Exception as e:
+        print(f"An unexpected error occurred in handle_sms_message: {e}")
+        return Response(content="", media_type="application/xml")
 
-        # --- Find user and save their message ---
-        user = db.query(User).filter(User.phone_number == standardized_message.sender_id).first()
-        if not user:
-            print(f"User with phone number '{standardized_message.sender_id}' not found.")
-            return Response(content="", media_type="application/xml")
+    await enqueue_webhook_message(standardized_message)
+    return Response(content="", media_type="application/xml")
 
-        # --- Generate and Send AI Response ---
-        result = retrieval_chain.invoke({"input": question})
-        ai_response_text = result.get("answer", "I could not find an answer.")
 
-        # Save conversation in the same format as web chat (question + answer together)
-        conversation = Conversation(
-            user_id=user.id,
-            interaction={
-                "question": question, 
-                "answer": ai_response_text,
-                "channel": "sms"
-            },
-            resolved=False,
+async def process_sms_message(message: StandardizedMessage):
+    """Answer a queued SMS received through /hooks/sms."""
+    if not TWILIO_SMS_NUMBER:
+        print("WARNING: SMS number not configured")
+    async with async_session_local() as db:
+        user_id = await channel_identities.resolve_message(db, message)
+        # For SMS, no special prefix is needed for the 'to' number
+        await outbound_deliveries.answer_once(
+            db, message, user_id, "sms", generate_answer,
+            recipient=message.sender_id if TWILIO_SMS_NUMBER else None, from_number=TWILIO_SMS_NUMBER,
         )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-
-        # --- Send Reply via Twilio SMS ---
-        if twilio_client and TWILIO_SMS_NUMBER:
-            try:
-                # For SMS, no special prefix is needed for the 'to' number
-                twilio_client.messages.create(
-                    from_=TWILIO_SMS_NUMBER,
-                    body=ai_response_text,
-                    to=standardized_message.sender_id
-                )
-                print(f"SMS reply sent to: {standardized_message.sender_id}")
-            except Exception as e:
-                print(f"ERROR: Failed to send SMS message: {e}")
-        else:
-            print("WARNING: SMS number not configured or Twilio client not available")
-        
-        return Response(content="", media_type="application/xml")
-
-    except Exception as e:
-        print(f"An unexpected error occurred in handle_sms_message: {e}")
-        return Response(content="", media_type="application/xml")
 
 
 @app.post("/hooks/email")
-async def handle_email_message(payload: Dict[Any, Any], db: Session = Depends(get_db)):
+async def handle_email_message(payload: Dict[Any, Any]):
     """
-    Handles incoming emails (from email webhooks like SendGrid, Mailgun, etc.), 
-    gets an AI response, and sends a reply.
+    Queues incoming emails (from email webhooks like SendGrid, Mailgun, etc.);
+    a webhook worker answers them.
     """
     try:
         print("=== EMAIL WEBHOOK DEBUG ===")
@@ -2163,54 +2163,26 @@ async def handle_email_message(payload: Dict[Any, Any], db: Session = Depends(ge
         
         builder = EmailMessageBuilder(payload)
         standardized_message = builder.build()
-        question = standardized_message.content
-
-        # --- Find user and save their message ---
-        user = db.query(User).filter(User.email == standardized_message.sender_id).first()
-        if not user:
-            print(f"User with email '{standardized_message.sender_id}' not found.")
-            # For email, we might want to send a response anyway or create a guest conversation
-            return {"status": "user_not_found", "message": "User not registered"}
+    except Exception as e:
+        print(f"An unexpected error occurred in handle_email_message: {e}")
+        return {"status": "error", "message": str(e)}
 
-        # --- Generate and Send AI Response ---
-        result = retrieval_chain.invoke({"input": question})
-        ai_response_text = result.get("answer", "I could not find an answer.")
+    job_id = await enqueue_webhook_message(standardized_message)
+    return {"status": "queued" if job_id else "duplicate", "job_id": job_id}
 
-        # Save conversation in the same format as web chat (question + answer together)
-        conversation = Conversation(
-            user_id=user.id,
-            interaction={
-                "question": question, 
-                "answer": ai_response_text,
-                "channel": "email"
-            },
-            resolved=False,
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
 
-        # --- Send Reply via Email ---
-        original_subject = standardized_message.metadata.get("subject", "")
-        success = send_email_reply(
-            to_email=standardized_message.sender_id,
-            subject="AI Assistant Response",
-            body=ai_response_text,
-            reply_to_subject=original_subject
+async def process_email_message(message: StandardizedMessage):
+    """Answer a queued email received through /hooks/email, /hooks/sendgrid or /hooks/email-manual."""
+    async with async_session_local() as db:
+        user_id = await channel_identities.resolve_message(db, message)
+        await outbound_deliveries.answer_once(
+            db, message, user_id, "email", generate_answer,
+            recipient=message.sender_id, reply_to_subject=message.metadata.get("subject", ""),
         )
-        
-        if success:
-            return {"status": "success", "message": "Email reply sent"}
-        else:
-            return {"status": "error", "message": "Failed to send email reply"}
-
-    except Exception as e:
-        print(f"An unexpected error occurred in handle_email_message: {e}")
-        return {"status": "error", "message": str(e)}
 
 
 @app.post("/hooks/sendgrid")
-async def handle_sendgrid_webhook(request: Request, db: Session = Depends(get_db)):
+async def handle_sendgrid_webhook(request: Request):
     """
     Handle SendGrid Inbound Parse webhook
     SendGrid sends form data, not JSON
@@ -2224,25 +2196,25 @@ async def handle_sendgrid_webhook(request: Request, db: Session = Depends(get_db
             "to": form_data.get("to"),
             "subject": form_data.get("subject"),
             "text": form_data.get("text"),
-            "html": form_data.get("html")
+            "html": form_data.get("html"),
+            "headers": form_data.get("headers"),  # carries the Message-ID used to drop redeliveries
         }
         
         print("=== SENDGRID WEBHOOK DEBUG ===")
         print(f"Received SendGrid payload: {payload}")
         print("=== END SENDGRID DEBUG ===")
-        
-        # Process through the standard email handler
-        return await handle_email_message(payload, db)
-        
     except Exception as e:
         print(f"Error in SendGrid webhook handler: {e}")
         return {"status": "error", "message": str(e)}
 
+    # Process through the standard email handler
+    return await handle_email_message(payload)
+
 
 @app.post("/hooks/telegram")
-async def handle_telegram_message(request: Request, db: Session = Depends(get_db)):
+async def handle_telegram_message(request: Request):
     """
-    Handles incoming Telegram messages, gets an AI response, and sends a reply.
+    Queues incoming Telegram messages; a webhook worker answers them.
     """
     try:
         payload = await request.json()
@@ -2253,60 +2225,22 @@ async def handle_telegram_message(request: Request, db: Session = Depends(get_db
         
         builder = TelegramMessageBuilder(payload)
         standardized_message = builder.build()
-        question = standardized_message.content
-
-        # Extract Telegram chat ID for replies
-        telegram_chat_id = standardized_message.sender_id
-        
-        # --- Find user by Telegram ID or create a mapping ---
-        # Note: You might want to store telegram_user_id in User table
-        # For now, we'll try to find by phone number if available
-        user = None
-        
-        # Try to find user by stored telegram_user_id (if you add this field)
-        # user = db.query(User).filter(User.telegram_user_id == telegram_chat_id).first()
-        
-        # For demo purposes, let's use a default user or create a guest system
-        # In production, you'd want users to register their Telegram ID
-        user = db.query(User).first()  # Use first user for demo
-        
-        if not user:
-            # Send registration message
-            send_telegram_message(
-                telegram_chat_id, 
-                "👋 Welcome! Please register on our platform first to use this service.\n\nVisit: https://yourdomain.com/register"
-            )
-            return {"status": "user_not_found", "message": "User not registered"}
+    except Exception as e:
+        print(f"An unexpected error occurred in handle_telegram_message: {e}")
+        return {"status": "error", "message": str(e)}
 
-        # --- Generate and Send AI Response ---
-        result = retrieval_chain.invoke({"input": question})
-        ai_response_text = result.get("answer", "I could not find an answer.")
+    job_id = await enqueue_webhook_message(standardized_message)
+    return {"status": "queued" if job_id else "duplicate", "job_id": job_id}
 
-        # Save conversation in the same format as other channels
-        conversation = Conversation(
-            user_id=user.id,
-            interaction={
-                "question": question, 
-                "answer": ai_response_text,
-                "channel": "telegram"
-            },
-            resolved=False,
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
 
-        # --- Send Reply via Telegram ---
-        success = send_telegram_message(telegram_chat_id, ai_response_text)
-        
-        if success:
-            return {"status": "success", "message": "Telegram reply sent"}
-        else:
-            return {"status": "error", "message": "Failed to send Telegram reply"}
+async def process_telegram_message(message: StandardizedMessage):
+    """Answer a queued Telegram message; the sender id is the chat id to reply to."""
+    telegram_chat_id = message.sender_id
 
-    except Exception as e:
-        print(f"An unexpected error occurred in handle_telegram_message: {e}")
-        return {"status": "error", "message": str(e)}
+    async with async_session_local() as db:
+        # --- Find the user behind this chat (a guest user for a new chat) ---
+        user_id = await channel_identities.resolve_message(db, message)
+        await outbound_deliveries.answer_once(db, message, user_id, "telegram", generate_answer, recipient=telegram_chat_id)
 
 
 @app.get("/hooks/instagram")
@@ -2324,9 +2258,9 @@ async def verify_instagram_webhook(request: Request):
 
 
 @app.post("/hooks/instagram")
-async def handle_instagram_message(request: Request, db: Session = Depends(get_db)):
+async def handle_instagram_message(request: Request):
     """
-    Handles incoming Instagram messages, gets an AI response, and sends a reply.
+    Queues incoming Instagram messages; a webhook worker answers them.
     """
     try:
         payload = await request.json()
@@ -2339,53 +2273,24 @@ async def handle_instagram_message(request: Request, db: Session = Depends(get_d
         if payload.get("object") == "instagram" and not payload.get("entry"):
             return {"status": "test_webhook", "message": "Test webhook received"}
         
-        builder = InstagramMessageBuilder(payload)
-        standardized_message = builder.build()
-        question = standardized_message.content
-
-        # Extract Instagram sender ID for replies
-        instagram_sender_id = standardized_message.sender_id
-        
-        # Find user - Instagram integration typically requires user registration
-        user = db.query(User).first()  # Use first user for demo
-        
-        if not user:
-            # Send registration message
-            send_instagram_message(
-                instagram_sender_id, 
-                "👋 Welcome! Please register on our platform first to use this service."
-            )
-            return {"status": "user_not_found", "message": "User not registered"}
+        # One delivery can batch events from several users; each becomes its own job
+        standardized_messages = InstagramMessageBuilder(payload).build_all()
+    except Exception as e:
+        print(f"An unexpected error occurred in handle_instagram_message: {e}")
+        return {"status": "error", "message": str(e)}
 
-        # Generate AI Response
-        result = retrieval_chain.invoke({"input": question})
-        ai_response_text = result.get("answer", "I could not find an answer.")
+    job_ids = await enqueue_webhook_messages(standardized_messages)
+    return {"status": "queued", "job_ids": job_ids}
 
-        # Save conversation
-        conversation = Conversation(
-            user_id=user.id,
-            interaction={
-                "question": question, 
-                "answer": ai_response_text,
-                "channel": "instagram"
-            },
-            resolved=False,
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
 
-        # Send Reply via Instagram
-        success = send_instagram_message(instagram_sender_id, ai_response_text)
-        
-        if success:
-            return {"status": "success", "message": "Instagram reply sent"}
-        else:
-            return {"status": "error", "message": "Failed to send Instagram reply"}
+async def process_instagram_message(message: StandardizedMessage):
+    """Answer a queued Instagram message; the sender id is the recipient of the reply."""
+    instagram_sender_id = message.sender_id
 
-    except Exception as e:
-        print(f"An unexpected error occurred in handle_instagram_message: {e}")
-        return {"status": "error", "message": str(e)}
+    async with async_session_local() as db:
+        # Find the user behind this sender (a guest user for a new sender)
+        user_id = await channel_identities.resolve_message(db, message)
+        await outbound_deliveries.answer_once(db, message, user_id, "instagram", generate_answer, recipient=instagram_sender_id)
 
 
 @app.get("/hooks/messenger")
@@ -2403,9 +2308,9 @@ async def verify_messenger_webhook(request: Request):
 
 
 @app.post("/hooks/messenger")
-async def handle_messenger_message(request: Request, db: Session = Depends(get_db)):
+async def handle_messenger_message(request: Request):
     """
-    Handles incoming Messenger messages, gets an AI response, and sends a reply.
+    Queues incoming Messenger messages; a webhook worker answers them.
     """
     try:
         payload = await request.json()
@@ -2418,63 +2323,28 @@ async def handle_messenger_message(request: Request, db: Session = Depends(get_d
         if payload.get("object") == "page" and not payload.get("entry"):
             return {"status": "test_webhook", "message": "Test webhook received"}
         
-        builder = MessengerMessageBuilder(payload)
-        
-        # Handle postback events differently
-        if builder.is_postback():
-            postback_payload = builder.get_postback_payload()
-            question = f"User clicked: {postback_payload}"
-        else:
-            standardized_message = builder.build()
-            question = standardized_message.content
-
-        # Extract Messenger sender ID for replies  
-        messenger_sender_id = builder.get_sender_psid()
-        
-        # Find user - Messenger integration typically requires user registration
-        user = db.query(User).first()  # Use first user for demo
-        
-        if not user:
-            # Send registration message
-            send_messenger_message(
-                messenger_sender_id, 
-                "👋 Welcome! Please register on our platform first to use this service."
-            )
-            return {"status": "user_not_found", "message": "User not registered"}
+        # Messages and postbacks from every entry in the batch; receipts and echoes are skipped
+        standardized_messages = MessengerMessageBuilder(payload).build_all()
+    except Exception as e:
+        print(f"An unexpected error occurred in handle_messenger_message: {e}")
+        return {"status": "error", "message": str(e)}
 
-        # Generate AI Response
-        result = retrieval_chain.invoke({"input": question})
-        ai_response_text = result.get("answer", "I could not find an answer.")
+    job_ids = await enqueue_webhook_messages(standardized_messages)
+    return {"status": "queued", "job_ids": job_ids}
 
-        # Save conversation
-        conversation = Conversation(
-            user_id=user.id,
-            interaction={
-                "question": question, 
-                "answer": ai_response_text,
-                "channel": "messenger"
-            },
-            resolved=False,
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
 
-        # Send Reply via Messenger
-        success = send_messenger_message(messenger_sender_id, ai_response_text)
-        
-        if success:
-            return {"status": "success", "message": "Messenger reply sent"}
-        else:
-            return {"status": "error", "message": "Failed to send Messenger reply"}
+async def process_messenger_message(message: StandardizedMessage):
+    """Answer a queued Messenger message or postback; the sender id is the PSID to reply to."""
+    messenger_sender_id = message.sender_id
 
-    except Exception as e:
-        print(f"An unexpected error occurred in handle_messenger_message: {e}")
-        return {"status": "error", "message": str(e)}
+    async with async_session_local() as db:
+        # Find the user behind this sender (a guest user for a new sender)
+        user_id = await channel_identities.resolve_message(db, message)
+        await outbound_deliveries.answer_once(db, message, user_id, "messenger", generate_answer, recipient=messenger_sender_id)
 
 
 @app.post("/hooks/email-manual")
-async def handle_manual_email(request: Request, db: Session = Depends(get_db)):
+async def handle_manual_email(request: Request):
     """
     Manual email endpoint for testing or direct email processing.
     Expects JSON with 'from', 'subject', and 'body' fields.
@@ -2488,13 +2358,22 @@ async def handle_manual_email(request: Request, db: Session = Depends(get_db)):
             if field not in payload:
                 raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
         
-        return await handle_email_message(payload, db)
+        return await handle_email_message(payload)
         
     except Exception as e:
         print(f"Error in manual email handler: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Channel name (StandardizedMessage.channel_name) -> worker that answers it
+webhook_workers.register(TwilioMessageBuilder.CHANNEL_NAME, process_twilio_message)
+webhook_workers.register(SmsMessageBuilder.CHANNEL_NAME, process_sms_message)
+webhook_workers.register(EmailMessageBuilder.CHANNEL_NAME, process_email_message)
+webhook_workers.register(TelegramMessageBuilder.CHANNEL_NAME, process_telegram_message)
+webhook_workers.register(InstagramMessageBuilder.CHANNEL_NAME, process_instagram_message)
+webhook_workers.register(MessengerMessageBuilder.CHANNEL_NAME, process_messenger_message)
+
+
 @app.post("/admin/test-email")
 async def test_email_functionality(request: Request, db: Session = Depends(get_db)):
     """Test email functionality - admin only"""
@@ -2623,16 +2502,21 @@ def read_tickets_for_user(
 
 @app.get("/admin/tickets", response_model=List[schemas.Ticket])
 def read_all_tickets(
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin),
 ):
-    return tickets_crud.get_all_tickets(db=db)
+    page = tickets_crud.get_all_tickets_page(db=db, cursor=cursor, limit=limit)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @app.get("/admin/tickets/{ticket_id}")
 def read_ticket_details(
     ticket_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin),
 ):
     ticket = tickets_crud.get_ticket_details(db=db, ticket_id=ticket_id)
@@ -2777,7 +2661,8 @@ def debug_banking_endpoint(
                 db=db,
                 ticket=ticket_data,
                 user_id=current_user.id,
-                bot_id=5  # Banking bot ID
+                bot_id=5,  # Banking bot ID
+                channel="web",
             )
             
             return {
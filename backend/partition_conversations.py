@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Maintain the monthly partitions of the Postgres conversations table.
+
+Meant to run from cron, e.g. daily:
+
+    python partition_conversations.py
+    python partition_conversations.py --retain-months 24 --drop
+
+Creates partitions CONVERSATION_PARTITION_MONTHS_AHEAD months ahead, and detaches
+partitions older than CONVERSATION_PARTITION_RETAIN_MONTHS when that is set.
+Run archive_conversations.py first if detached months should end up in the archive.
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+from database.sessions import engine
+from database.partitions import (
+    PARTITION_MONTHS_AHEAD, PARTITION_RETAIN_MONTHS, detach_partitions, ensure_partitions, is_partitioned,
+    retention_boundary,
+)
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD,
+                        help="Future months to create (default: CONVERSATION_PARTITION_MONTHS_AHEAD)")
+    parser.add_argument("--retain-months", type=int, default=PARTITION_RETAIN_MONTHS,
+                        help="Months to keep attached, 0 keeps all (default: CONVERSATION_PARTITION_RETAIN_MONTHS)")
+    parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of keeping them as tables")
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            print("conversations is not a partitioned table; nothing to do")
+            return
+        created = ensure_partitions(connection, months_ahead=args.months_ahead)
+        boundary = retention_boundary(retain_months=args.retain_months)
+        detached = detach_partitions(connection, boundary, drop=args.drop) if boundary else []
+
+    for name in created:
+        print(f"Created partition {name}")
+    for name in detached:
+        print(f"{'Dropped' if args.drop else 'Detached'} partition {name}")
+    print(f"✅ {len(created)} partitions created, {len(detached)} {'dropped' if args.drop else 'detached'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-bot analytics counters
+"""
+
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.database import Base
+from database.analytics import AnalyticsRecorder, latency_bucket
+from database.conversation_writer import build_turn_rows
+from adminbackend.analytics import get_bot_analytics
+
+
+def make_recorder():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    # Long interval: the tests flush explicitly
+    return AnalyticsRecorder(session_factory=factory, flush_interval=3600), factory()
+
+
+def test_latency_buckets():
+    assert latency_bucket(10) == "50"
+    assert latency_bucket(250) == "250"
+    assert latency_bucket(251) == "500"
+    assert latency_bucket(120000) == "inf"
+
+
+def test_counters_accumulate_across_flushes():
+    recorder, db = make_recorder()
+    recorder.record_messages(build_turn_rows(1, 7, "q", "a", channel="sms"))
+    recorder.record_messages(build_turn_rows(2, 7, "q", "a", channel="web"))
+    recorder.flush()
+    # Second flush: user 1 again (not a new user), one more web turn
+    recorder.record_messages(build_turn_rows(1, 7, "q", "a", channel="web"))
+    for latency in [40, 40, 90, 400, 1500]:
+        recorder.record_answer(7, latency, cache_hit=latency < 50)
+    recorder.record_escalation(7)
+    recorder.flush()
+    recorder.stop()
+
+    stats = get_bot_analytics(db, 7, granularity="hour")
+    totals = stats["totals"]
+    assert totals["messages"] == 6
+    assert totals["channels"] == {"sms": 2, "web": 4}
+    assert totals["answers"] == 5
+    assert totals["cache_hit_rate"] == 0.4
+    assert totals["escalation_rate"] == 0.2
+    assert totals["latency_p50_ms"] == 100
+    assert totals["latency_p95_ms"] == 2000
+    assert [b["users"] for b in stats["series"]] == [2]
+    assert get_bot_analytics(db, 7, granularity="day")["totals"]["messages"] == 6
+
+
+def test_other_bots_and_unassigned_rows_are_separate():
+    recorder, db = make_recorder()
+    recorder.record_messages(build_turn_rows(1, 7, "q", "a"))
+    recorder.record_messages(build_turn_rows(1, 8, "q", "a"))
+    recorder.record_messages(build_turn_rows(1, None, "q", "a", channel="telegram"))
+    recorder.record_answer(None, 120, cache_hit=False)
+    recorder.flush()
+
+    assert get_bot_analytics(db, 7)["totals"]["messages"] == 2
+    assert get_bot_analytics(db, 8)["totals"]["messages"] == 2
+    # Channel-hook turns have no bot; they are counted under bot 0 rather than dropped
+    unassigned = get_bot_analytics(db, 0)["totals"]
+    assert unassigned["messages"] == 2
+    assert unassigned["channels"] == {"telegram": 2}
+    assert unassigned["answers"] == 1
+
+
+def test_window_excludes_older_buckets():
+    recorder, db = make_recorder()
+    old = datetime.datetime.utcnow() - datetime.timedelta(days=40)
+    recorder.record(7, "messages", at=old)
+    recorder.record(7, "messages")
+    recorder.flush()
+
+    assert get_bot_analytics(db, 7)["totals"]["messages"] == 1
+    since = old - datetime.timedelta(days=1)
+    assert get_bot_analytics(db, 7, since=since)["totals"]["messages"] == 2
+
+
+def test_unknown_granularity_is_rejected():
+    recorder, db = make_recorder()
+    with pytest.raises(HTTPException):
+        get_bot_analytics(db, 7, granularity="week")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Tests for conversation retention and the cold archive
+"""
+
+import datetime
+import gzip
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import archive
+from database.database import Base, Bot, Conversation, ConversationRollup, User
+from adminbackend import export
+from adminbackend.conversations import get_conversation_turns
+from adminbackend.inbox import get_inbox_dates, get_users_by_date, get_user_conversation_by_date
+
+NOW = datetime.datetime(2025, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def archive_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def make_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([
+        User(id=1, email="one@example.com", phone_number="+10000000001"),
+        User(id=2, email="two@example.com", phone_number="+10000000002"),
+        Bot(id=3, name="short", bot_type="Retail Bot", retention_days=30),
+        Bot(id=4, name="forever", bot_type="Retail Bot", retention_days=0),
+    ])
+    db.commit()
+    return factory, db
+
+
+def add(db, user_id, bot_id, days_ago, content, channel="web"):
+    created = NOW - datetime.timedelta(days=days_ago)
+    db.add(Conversation(
+        user_id=user_id, bot_id=bot_id, source="user", channel=channel, created_at=created, updated_at=created,
+        interaction={"source": "user", "content": content, "channel": channel},
+    ))
+    db.commit()
+
+
+def test_retention_cutoff():
+    assert archive.retention_cutoff(30, NOW) == datetime.datetime(2025, 5, 2)
+    assert archive.retention_cutoff(0, NOW) is None
+
+
+def test_old_rows_move_to_day_partitions(archive_root):
+    factory, db = make_factory()
+    add(db, 1, 3, 40, "old a")
+    add(db, 2, 3, 40, "old b", channel="sms")
+    add(db, 1, 3, 45, "older")
+    add(db, 1, 3, 5, "recent")
+    add(db, 1, 4, 400, "kept forever")
+
+    stats = archive.archive_conversations(db, now=NOW)
+
+    assert stats == {3: 3}
+    remaining = sorted(c.interaction["content"] for c in db.query(Conversation).all())
+    assert remaining == ["kept forever", "recent"]
+    day_dir = archive_root / "conversations" / "date=2025-04-22" / "bot_id=3"
+    (part,) = list(day_dir.glob("part-*.jsonl.gz"))
+    with gzip.open(part, "rt") as f:
+        assert sorted(json.loads(line)["interaction"]["content"] for line in f) == ["old a", "old b"]
+
+    # Running again is a no-op
+    assert archive.archive_conversations(db, now=NOW) == {}
+
+
+def test_interrupted_run_does_not_duplicate(archive_root):
+    factory, db = make_factory()
+    add(db, 1, 3, 40, "old")
+    convo = db.query(Conversation).one()
+    # Simulate a crash after the part file was written but before the delete committed
+    archive._write_part(archive._bot_dir(archive._root(None), convo.created_at.date(), 3), [convo])
+
+    assert archive.archive_conversations(db, now=NOW) == {}
+    assert db.query(Conversation).count() == 0
+    assert len(list(archive.read_archive(bot_id=3))) == 1
+
+
+def test_inbox_reads_through_to_archive(archive_root):
+    factory, db = make_factory()
+    add(db, 1, 3, 40, "archived question")
+    add(db, 2, 3, 40, "archived other user")
+    # Keeps SQLite from reusing the archived ids once they are deleted
+    add(db, 2, 3, 1, "recent")
+    archive.archive_conversations(db, now=NOW)
+    # A straggler written after archival for the same day stays hot
+    add(db, 1, 3, 40, "late hot row")
+
+    day = (NOW - datetime.timedelta(days=40)).date()
+    assert [u.id for u in get_users_by_date(db, day, bot_id=3).items] == [1, 2]
+
+    first = get_user_conversation_by_date(db, 1, day, bot_id=3, limit=1)
+    second = get_user_conversation_by_date(db, 1, day, bot_id=3, cursor=first.next_cursor, limit=1)
+    contents = [c.interaction["content"] for c in first.items + second.items]
+    assert sorted(contents) == ["archived question", "late hot row"]
+    assert second.next_cursor is None
+
+
+def test_inbox_dates_in_a_local_timezone_include_archived_days(archive_root):
+    factory, db = make_factory()
+    add(db, 1, 3, 40.375, "archived early morning")  # 03:00 UTC, still the day before in New York
+    add(db, 1, 3, 1, "recent")
+    for convo in db.query(Conversation).all():
+        db.add(ConversationRollup(bot_id=3, channel="web", day=convo.created_at.date(), message_count=1))
+    db.commit()
+    archive.archive_conversations(db, now=NOW)
+
+    assert get_inbox_dates(db, bot_id=3, tz="Asia/Kolkata") == [datetime.date(2025, 5, 31), datetime.date(2025, 4, 22)]
+    assert get_inbox_dates(db, bot_id=3, tz="America/New_York") == [datetime.date(2025, 5, 31), datetime.date(2025, 4, 21)]
+
+
+def test_export_includes_archived_rows_first(archive_root):
+    factory, db = make_factory()
+    add(db, 1, 3, 40, "archived", channel="sms")
+    add(db, 1, 3, 41, "archived web")
+    add(db, 1, 3, 2, "hot", channel="sms")
+    archive.archive_conversations(db, now=NOW)
+
+    records = list(export.conversation_records(3, channel="sms", session_factory=factory))
+    assert [r["content"] for r in records] == ["archived", "hot"]
+
+    since = NOW - datetime.timedelta(days=10)
+    assert [r["content"] for r in export.conversation_records(3, since=since, session_factory=factory)] == ["hot"]
+
+
+def add_turn(db, user_id, bot_id, asked, question, answered=None, turn_id=None):
+    turn_id = turn_id or question
+    for source, content, created in (("user", question, asked), ("bot", f"re: {question}", answered or asked)):
+        db.add(Conversation(
+            user_id=user_id, bot_id=bot_id, source=source, channel="web", turn_id=turn_id,
+            created_at=created, updated_at=created, interaction={"source": source, "content": content, "channel": "web"},
+        ))
+    db.commit()
+
+
+def test_turns_are_archived_whole(archive_root):
+    factory, db = make_factory()
+    cutoff = archive.retention_cutoff(30, NOW)
+    # Asked just before the cutoff, answered just after it
+    add_turn(db, 1, 3, cutoff - datetime.timedelta(seconds=5), "straddling", cutoff + datetime.timedelta(seconds=5))
+    add_turn(db, 1, 3, cutoff + datetime.timedelta(hours=1), "hot")
+    archive.archive_conversations(db, now=NOW)
+
+    assert [c.turn_id for c in db.query(Conversation).all()] == ["hot", "hot"]
+    archived = list(archive.read_archive(bot_id=3))
+    assert [(r["source"], r["created_at"].date()) for r in archived] == [
+        ("user", (cutoff - datetime.timedelta(days=1)).date()),
+        ("bot", cutoff.date()),
+    ]
+
+
+def test_conversation_turns_read_through_to_archive(archive_root):
+    factory, db = make_factory()
+    add_turn(db, 1, 3, NOW - datetime.timedelta(days=41), "oldest")
+    add_turn(db, 1, 3, NOW - datetime.timedelta(days=40), "archived")
+    # Bot 4 keeps everything, so this hot turn is older than bot 3's archived ones
+    add_turn(db, 1, 4, NOW - datetime.timedelta(days=50), "forever")
+    add_turn(db, 1, 3, NOW - datetime.timedelta(days=1), "recent")
+    add_turn(db, 2, 3, NOW - datetime.timedelta(days=40), "other user")
+    archive.archive_conversations(db, now=NOW)
+
+    seen = []
+    cursor = None
+    while True:
+        page = get_conversation_turns(db, user_id=1, cursor=cursor, limit=2)
+        seen += [(q.interaction["content"], a.interaction["content"]) for q, a in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [(name, f"re: {name}") for name in ("recent", "archived", "oldest", "forever")]
+
+    bot_page = get_conversation_turns(db, bot_id=3, limit=10)
+    assert [q.interaction["content"] for q, _ in bot_page.items] == ["recent", "other user", "archived", "oldest"]
+
+
+def test_listings_only_open_indexed_partitions(archive_root, monkeypatch):
+    factory, db = make_factory()
+    add_turn(db, 1, 3, NOW - datetime.timedelta(days=40), "archived")
+    add_turn(db, 2, 3, NOW - datetime.timedelta(days=45), "other user archived")
+    for day in range(1, 4):
+        add_turn(db, 2, 3, NOW - datetime.timedelta(days=day), f"recent {day}")
+    archive.archive_conversations(db, now=NOW)
+    assert json.loads((archive_root / "conversations" / "index" / "user_id=1.json").read_text()) == [
+        [(NOW - datetime.timedelta(days=40)).date().isoformat(), 3],
+    ]
+
+    opened = []
+    read_parts = archive._read_parts
+    monkeypatch.setattr(archive, "_read_parts", lambda bot_dir: opened.append(bot_dir) or read_parts(bot_dir))
+    # A full page of hot turns newer than the user's archive does not touch it
+    page = get_conversation_turns(db, user_id=2, limit=2)
+    assert page.next_cursor and opened == []
+    # Reaching back past the hot rows reads only that user's partition
+    rest = get_conversation_turns(db, user_id=2, cursor=page.next_cursor, limit=2)
+    assert [q.interaction["content"] for q, _ in rest.items] == ["recent 3", "other user archived"]
+    assert [p.parent.name for p in opened] == [f"date={(NOW - datetime.timedelta(days=45)).date().isoformat()}"]
+
+
+def test_index_is_rebuilt_for_an_archive_written_without_one(archive_root):
+    factory, db = make_factory()
+    add_turn(db, 1, 3, NOW - datetime.timedelta(days=40), "archived")
+    archive.archive_conversations(db, now=NOW)
+    index_dir = archive_root / "conversations" / "index"
+    for path in index_dir.iterdir():
+        path.unlink()
+    index_dir.rmdir()
+
+    archive.archive_conversations(db, now=NOW)
+    assert [q.interaction["content"] for q, _ in get_conversation_turns(db, user_id=1).items] == ["archived"]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached bot routing table
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bots.routing import BotRoutingTable
+from bots import routing
+from database.database import Base, Bot
+
+RETAIL = object()
+
+
+def make_table(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    table = BotRoutingTable(session_factory=factory, resolve={"Retail Bot": RETAIL}.get)
+    # Route the Bot change listeners to this table
+    monkeypatch.setattr(routing, "bot_routes", table)
+    return factory, table, statements
+
+
+def test_routes_are_cached(monkeypatch):
+    factory, table, statements = make_table(monkeypatch)
+    db = factory()
+    db.add(Bot(id=1, name="Shop", bot_type="Retail Bot"))
+    db.commit()
+    db.close()
+
+    route = table.get(1)
+    assert (route.name, route.bot_type, route.instance) == ("Shop", "Retail Bot", RETAIL)
+    queries = len(statements)
+    assert table.get(1) is route
+    assert len(statements) == queries
+    assert table.snapshot()["hits"] == 1
+
+
+def test_missing_bot_is_cached_until_created(monkeypatch):
+    factory, table, statements = make_table(monkeypatch)
+    assert table.get(2) is None
+    queries = len(statements)
+    assert table.get(2) is None
+    assert len(statements) == queries
+
+    db = factory()
+    db.add(Bot(id=2, name="Unknown", bot_type="Mystery Bot"))
+    db.commit()
+    db.close()
+    route = table.get(2)
+    assert route.name == "Unknown" and route.instance is None
+
+
+def test_update_invalidates_route(monkeypatch):
+    factory, table, _ = make_table(monkeypatch)
+    db = factory()
+    db.add(Bot(id=3, name="Old", bot_type="Retail Bot"))
+    db.commit()
+    assert table.get(3).name == "Old"
+
+    db.query(Bot).filter(Bot.id == 3).one().name = "New"
+    db.commit()
+    assert table.get(3).name == "New"
+
+    db.delete(db.query(Bot).filter(Bot.id == 3).one())
+    db.commit()
+    db.close()
+    assert table.get(3) is None
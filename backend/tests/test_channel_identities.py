@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for resolving channel senders to users through channel_identities
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from channels.identities import ChannelIdentityResolver
+from channels.schemas import StandardizedMessage
+from database.database import Base, ChannelIdentity, User
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "identities.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(engine)() as db:
+        db.add(User(email="ada@example.com", phone_number="+15550001", name="Ada"))
+        db.commit()
+    engine.dispose()
+    return path
+
+
+def _run(db_path, scenario):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            return await scenario(factory, statements)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def _message(channel, sender, **metadata):
+    return StandardizedMessage(
+        channel_name=channel, sender_id=sender, content="hi", conversation_id=f"{channel}-{sender}", metadata=metadata,
+    )
+
+
+def test_registered_senders_are_linked_and_then_served_from_cache(db_path):
+    resolver = ChannelIdentityResolver()
+
+    async def scenario(factory, statements):
+        async with factory() as db:
+            first = await resolver.resolve_message(db, _message("twilio", "+15550001"))
+            statements.clear()
+            again = await resolver.resolve_message(db, _message("twilio", "+15550001"))
+            cached_statements = list(statements)
+            by_email = await resolver.resolve_message(db, _message("email", "ada@example.com"))
+            ada = (await db.execute(select(User.id).where(User.email == "ada@example.com"))).scalar_one()
+        return first, again, cached_statements, by_email, ada
+
+    first, again, cached_statements, by_email, ada = _run(db_path, scenario)
+    assert first == again == by_email == ada
+    assert cached_statements == []
+    assert resolver.snapshot() == {"cached": 2, "hits": 1, "misses": 2, "linked": 2, "guests": 0}
+
+
+def test_unknown_senders_get_one_guest_each(db_path):
+    resolver = ChannelIdentityResolver()
+
+    async def scenario(factory, statements):
+        async with factory() as db:
+            alice = await resolver.resolve_message(db, _message("telegram", "111", user_info={"first_name": "Alice"}))
+            bob = await resolver.resolve_message(db, _message("messenger", "psid-2", sender_name="Messenger User psid-2"))
+            # A fresh process finds the stored identity instead of creating another guest
+            alice_again = await ChannelIdentityResolver().resolve_message(db, _message("telegram", "111"))
+            assert await resolver.resolve_message(db, _message("web", "nobody@example.com"), create_guest=False) is None
+            names = dict((await db.execute(select(User.id, User.name))).all())
+            identities = (await db.execute(select(ChannelIdentity))).scalars().all()
+        return alice, bob, alice_again, names, identities
+
+    alice, bob, alice_again, names, identities = _run(db_path, scenario)
+    assert alice == alice_again != bob
+    assert names[alice] == "Alice" and names[bob] == "Messenger User psid-2"
+    assert len(identities) == 2
+    assert resolver.snapshot()["guests"] == 2
+
+
+def test_registering_claims_guest_identities(db_path):
+    resolver = ChannelIdentityResolver()
+
+    async def scenario(factory, statements):
+        async with factory() as db:
+            return await resolver.resolve_message(db, _message("sms", "+15559999"))
+
+    guest = _run(db_path, scenario)
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    with sessionmaker(engine)() as db:
+        user = User(email="bo@example.com", phone_number="+15559999", name="Bo")
+        db.add(user)
+        db.commit()
+        assert resolver.claim_identities(db, user) == 1
+        assert resolver.claim_identities(db, user) == 0
+        owner = db.execute(select(ChannelIdentity.user_id).where(ChannelIdentity.external_id == "+15559999")).scalar_one()
+        user_id = user.id
+    engine.dispose()
+
+    assert owner == user_id != guest
+    assert resolver.snapshot()["cached"] == 0
+
+
+def test_cached_identities_expire(db_path):
+    resolver = ChannelIdentityResolver(ttl_seconds=0)
+
+    async def scenario(factory, statements):
+        async with factory() as db:
+            first = await resolver.resolve_message(db, _message("twilio", "+15550001"))
+            statements.clear()
+            again = await resolver.resolve_message(db, _message("twilio", "+15550001"))
+        return first, again, list(statements)
+
+    first, again, statements = _run(db_path, scenario)
+    # The expired entry is looked up again, through the stored identity
+    assert first == again and statements
+    assert resolver.snapshot()["hits"] == 0 and resolver.snapshot()["misses"] == 2
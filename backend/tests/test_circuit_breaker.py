@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM circuit breaker and degraded (retrieval-only) answers
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from bots.circuit_breaker import CircuitBreaker, invoke_with_breaker, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDoc:
+    def __init__(self, text):
+        self.page_content = text
+
+
+class FakeChain:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def invoke(self, payload):
+        self.calls += 1
+        if self.fail:
+            raise TimeoutError("Gemini timed out")
+        return "LLM answer"
+
+
+class FakeRetriever:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def invoke(self, question):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("vector store unreachable")
+        return [FakeDoc("Refunds are processed within 5 days. Contact support for help. Extra sentence.")]
+
+
+def test_breaker_opens_after_threshold():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure(Exception("boom"))
+    assert breaker.state == CLOSED
+    breaker.record_failure(Exception("boom"))
+    assert breaker.state == OPEN
+    assert breaker.allow_request() is False
+    assert breaker.snapshot()["total_rejected"] == 1
+
+
+def test_half_open_probe_restores_normal_mode():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, half_open_probes=1, clock=clock)
+
+    breaker.record_failure(Exception("boom"))
+    assert breaker.state == OPEN
+
+    clock.now = 11
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is True
+    # Only one probe is allowed in flight
+    assert breaker.allow_request() is False
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=clock)
+
+    breaker.record_failure(Exception("boom"))
+    clock.now = 11
+    assert breaker.allow_request() is True
+    breaker.record_failure(Exception("still down"))
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["times_opened"] == 2
+
+
+def test_open_breaker_skips_llm_and_returns_degraded_answer():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=clock)
+    chain = FakeChain(fail=True)
+
+    first = invoke_with_breaker(breaker, chain, FakeRetriever(), "How long do refunds take?")
+    assert first["degraded"] is True
+    assert chain.calls == 1
+
+    second = invoke_with_breaker(breaker, chain, FakeRetriever(), "How long do refunds take?")
+    assert second["degraded"] is True
+    assert chain.calls == 1  # LLM was not called while open
+    assert "Refunds are processed within 5 days" in second["answer"]
+    assert "Extra sentence" not in second["answer"]
+    assert breaker.snapshot()["degraded_responses"] == 2
+
+
+def test_healthy_llm_is_not_degraded():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=FakeClock())
+    result = invoke_with_breaker(breaker, FakeChain(), FakeRetriever(), "hi")
+    assert result["degraded"] is False
+    assert result["answer"] == "LLM answer"
+    assert len(result["context"]) == 1
+
+
+def test_degraded_answer_reuses_the_retrieved_chunks():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=FakeClock())
+    retriever = FakeRetriever()
+    result = invoke_with_breaker(breaker, FakeChain(fail=True), retriever, "How long do refunds take?")
+    assert result["degraded"] is True
+    assert "Refunds are processed within 5 days" in result["answer"]
+    assert retriever.calls == 1
+
+
+def test_retriever_failure_does_not_trip_the_llm_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=FakeClock())
+    chain = FakeChain()
+    with pytest.raises(ConnectionError):
+        invoke_with_breaker(breaker, chain, FakeRetriever(fail=True), "hi")
+    assert chain.calls == 0
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["total_failures"] == 0
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for per-conversation ordered dispatch of channel messages
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+
+from channels.actors import ConversationDispatcher, MailboxFull
+from channels.inbound_queue import SQLiteQueue
+from channels.schemas import StandardizedMessage
+from channels.workers import WebhookWorkerPool
+
+
+def _message(sender, content):
+    return StandardizedMessage(
+        channel_name="telegram", sender_id=sender, content=content, conversation_id=f"telegram-{sender}",
+    )
+
+
+def test_dispatcher_serializes_a_conversation_and_parallelizes_others():
+    events = []
+
+    async def work(key, n):
+        events.append(("start", key, n))
+        await asyncio.sleep(0.01)
+        events.append(("end", key, n))
+        return n
+
+    async def scenario():
+        dispatcher = ConversationDispatcher(mailbox_size=8, idle_seconds=5)
+        futures = [dispatcher.submit(key, work, key, n) for n in range(3) for key in ("a", "b")]
+        results = await asyncio.gather(*futures)
+        await dispatcher.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [0, 0, 1, 1, 2, 2]
+    for key in ("a", "b"):
+        own = [(kind, n) for kind, k, n in events if k == key]
+        assert own == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    # "b" started before "a" finished its first message
+    assert events.index(("start", "b", 0)) < events.index(("end", "a", 0))
+
+
+def test_dispatcher_bounds_mailboxes_and_evicts_idle_actors():
+    async def work():
+        await asyncio.sleep(0.01)
+
+    async def failing():
+        raise ValueError("boom")
+
+    async def scenario():
+        dispatcher = ConversationDispatcher(mailbox_size=2, idle_seconds=0.05)
+        futures = [dispatcher.submit("a", work), dispatcher.submit("a", work)]
+        with pytest.raises(MailboxFull):
+            dispatcher.submit("a", work)
+        await asyncio.gather(*futures)
+        with pytest.raises(ValueError):
+            await dispatcher.submit("a", failing)
+        assert dispatcher.snapshot()["actors"] == 1
+        await asyncio.sleep(0.15)
+        return dispatcher.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["actors"] == 0
+    assert snapshot["evicted"] == 1
+    assert snapshot["rejected"] == 1
+    assert snapshot["processed"] == 3
+
+
+def _run_pool(pool, handler, messages, expected, timeout=5):
+    answered = []
+
+    async def record(message):
+        await handler(message)
+        answered.append((message.sender_id, message.content, time.monotonic()))
+
+    async def scenario():
+        pool.register("telegram", record)
+        await pool.start()
+        started = time.monotonic()
+        await pool.submit_many(messages)
+        deadline = started + timeout
+        while len(answered) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return [(sender, content, at - started) for sender, content, at in answered]
+
+    return asyncio.run(scenario())
+
+
+def test_pool_answers_a_conversation_in_order_and_defers_overflow(tmp_path, monkeypatch):
+    monkeypatch.setattr("channels.workers.WEBHOOK_MAILBOX_RETRY_SECONDS", 0.05)
+    queue = SQLiteQueue(str(tmp_path / "webhooks.db"))
+    pool = WebhookWorkerPool(
+        queue, workers=8, channel_concurrency=8, channel_limits={}, poll_interval_ms=10,
+        conversations=ConversationDispatcher(mailbox_size=1),
+    )
+
+    async def handler(message):
+        await asyncio.sleep(0.03)
+
+    messages = [_message("a", str(i)) for i in range(6)] + [_message("b", "0")]
+    answered = _run_pool(pool, handler, messages, expected=7)
+    assert [content for sender, content, _ in answered if sender == "a"] == ["0", "1", "2", "3", "4", "5"]
+    snapshot = pool.snapshot()
+    assert snapshot["processed"] == 7 and snapshot["retried"] == 0
+    assert snapshot["deferred"] > 0 and snapshot["held"] == 0
+    queue.close()
+
+
+def test_pool_holds_later_messages_behind_a_retry(tmp_path, monkeypatch):
+    monkeypatch.setattr("channels.workers.WEBHOOK_MAILBOX_RETRY_SECONDS", 0.05)
+    monkeypatch.setattr("channels.workers.retry_delay", lambda attempts: 0.2)
+    queue = SQLiteQueue(str(tmp_path / "webhooks.db"))
+    pool = WebhookWorkerPool(queue, workers=8, channel_concurrency=8, channel_limits={}, poll_interval_ms=10)
+    failed = []
+
+    async def handler(message):
+        await asyncio.sleep(0.01)
+        if message.content == "0" and not failed:
+            failed.append(message.content)
+            raise RuntimeError("provider down")
+
+    answered = _run_pool(pool, handler, [_message("a", str(i)) for i in range(3)], expected=3)
+    assert [content for _, content, _ in answered] == ["0", "1", "2"]
+    assert pool.snapshot()["retried"] == 1
+    queue.close()
+
+
+def test_chatty_conversation_does_not_hold_back_others(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "webhooks.db"))
+    pool = WebhookWorkerPool(queue, workers=8, channel_concurrency=4, channel_limits={}, poll_interval_ms=10)
+
+    async def handler(message):
+        await asyncio.sleep(0.2)
+
+    messages = [_message("a", str(i)) for i in range(6)] + [_message("b", "0")]
+    answered = _run_pool(pool, handler, messages, expected=7)
+    finished = {(sender, content): at for sender, content, at in answered}
+    # "b" runs alongside "a" instead of after a batch of its queued messages
+    assert finished[("b", "0")] < 0.45
+    assert [content for sender, content, _ in answered if sender == "a"] == [str(i) for i in range(6)]
+    assert pool.snapshot()["in_flight"] == {}
+    queue.close()
+
+
+def test_leases_are_extended_while_jobs_wait_behind_slow_answers(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "webhooks.db"))
+    pool = WebhookWorkerPool(
+        queue, workers=8, channel_concurrency=4, channel_limits={}, poll_interval_ms=10, lease_seconds=0.3,
+    )
+
+    async def handler(message):
+        await asyncio.sleep(0.25)
+
+    answered = _run_pool(pool, handler, [_message("a", str(i)) for i in range(4)], expected=5, timeout=1.6)
+    # Every message waits longer than the lease, but none is claimed and answered twice
+    assert [content for _, content, _ in answered] == ["0", "1", "2", "3"]
+    assert pool.snapshot()["leased"] == 0
+    queue.close()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Checks that the hot admin conversation queries are served by an index
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from database.database import Base
+
+
+def query_plan(sql: str) -> str:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    return " ".join(str(r[-1]) for r in rows)
+
+
+def test_bot_channel_users_uses_composite_index():
+    plan = query_plan("SELECT DISTINCT user_id FROM conversations WHERE bot_id = 1 AND channel = 'web'")
+    assert "ix_conversations_bot_id_channel_user_id" in plan
+
+
+def test_bot_history_uses_bot_created_at_index():
+    plan = query_plan("SELECT * FROM conversations WHERE bot_id = 1 ORDER BY created_at DESC")
+    assert "ix_conversations_bot_id_created_at" in plan
+
+
+def test_user_history_uses_user_created_at_index():
+    plan = query_plan("SELECT * FROM conversations WHERE user_id = 1 ORDER BY created_at DESC")
+    assert "ix_conversations_user_id_created_at" in plan
+
+
+def test_channel_list_uses_channel_index():
+    plan = query_plan("SELECT DISTINCT channel FROM conversations WHERE channel IS NOT NULL")
+    assert "ix_conversations_channel" in plan
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for question/answer turns linked at write time
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.database import Base, User
+from database.conversation_writer import ConversationWriter, build_conversation_row, build_turn_rows
+from adminbackend.conversations import get_conversation_turns, turn_to_response
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        User(id=1, email="one@example.com", phone_number="+10000000001"),
+        User(id=2, email="two@example.com", phone_number="+10000000002"),
+    ])
+    db.commit()
+    return db
+
+
+def test_turn_rows_share_turn_id():
+    question, answer = build_turn_rows(1, 3, "What are your hours?", "9 to 5", channel="sms")
+    assert question["turn_id"] == answer["turn_id"]
+    assert question["source"] == "user" and answer["source"] == "bot"
+    assert question["channel"] == answer["channel"] == "sms"
+
+
+def test_turns_are_paired_with_a_join():
+    db = make_session()
+    writer = ConversationWriter(session_factory=lambda: db)
+    writer.write_many_sync(db, build_turn_rows(1, 3, "first question", "first answer"))
+    writer.write_many_sync(db, build_turn_rows(1, 3, "second question", "second answer", channel="telegram"))
+    writer.write_many_sync(db, build_turn_rows(2, 3, "other user", "other answer"))
+    writer.write_sync(db, build_conversation_row(1, 3, "system", "Human assistance ticket created"))
+
+    turns = get_conversation_turns(db, user_id=1).items
+    responses = [turn_to_response(q, a) for q, a in turns]
+
+    assert [r["interaction"]["question"] for r in responses] == ["second question", "first question"]
+    assert responses[0]["interaction"] == {
+        "question": "second question",
+        "answer": "second answer",
+        "channel": "telegram",
+    }
+    assert len(get_conversation_turns(db, bot_id=3).items) == 3
+
+
+def test_unanswered_question_is_returned_with_empty_answer():
+    db = make_session()
+    writer = ConversationWriter(session_factory=lambda: db)
+    writer.write_sync(db, build_conversation_row(1, None, "user", "anyone there?", turn_id="abc"))
+
+    (question, answer), = get_conversation_turns(db, user_id=1).items
+    assert answer is None
+    assert turn_to_response(question, answer)["interaction"]["answer"] == ""
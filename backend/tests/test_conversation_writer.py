@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched write-behind conversation writer
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.database import Base, Conversation, User
+from database.conversation_writer import ConversationWriter, build_conversation_row
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    db.add(User(id=1, email="writer@example.com", phone_number="+10000000000"))
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_rows_are_flushed_in_bulk_and_drained_on_stop():
+    factory = make_session_factory()
+    writer = ConversationWriter(session_factory=factory, flush_interval_ms=10000, batch_size=1000)
+
+    for i in range(25):
+        assert writer.enqueue(build_conversation_row(1, None, "user", f"message {i}"))
+
+    writer.stop(timeout=1)
+
+    db = factory()
+    rows = db.query(Conversation).order_by(Conversation.id).all()
+    assert len(rows) == 25
+    assert rows[0].interaction == {"source": "user", "content": "message 0", "channel": "web"}
+    assert rows[0].channel == "web"
+    assert rows[0].source == "user"
+    assert writer.snapshot()["flushed"] == 25
+    db.close()
+
+
+def test_batch_size_triggers_flush():
+    factory = make_session_factory()
+    writer = ConversationWriter(session_factory=factory, flush_interval_ms=10000, batch_size=5)
+
+    for i in range(5):
+        writer.enqueue(build_conversation_row(1, None, "bot", f"answer {i}"))
+
+    import time
+    deadline = time.time() + 5
+    while writer.snapshot()["flushed"] < 5 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert writer.snapshot()["flushed"] == 5
+    writer.stop(timeout=1)
+
+
+def test_sync_write_returns_row_id():
+    factory = make_session_factory()
+    writer = ConversationWriter(session_factory=factory)
+    db = factory()
+    convo = writer.write_sync(db, build_conversation_row(1, None, "system", "ticket created"))
+    assert convo.id is not None
+    db.close()
+
+
+def test_full_queue_rejects_enqueue():
+    factory = make_session_factory()
+    writer = ConversationWriter(session_factory=factory, max_queue=1)
+    writer._stop.set()  # keep the flusher from consuming the queue
+    writer._thread = None
+    writer.start = lambda: None
+    assert writer.enqueue(build_conversation_row(1, None, "user", "one")) is True
+    assert writer.enqueue(build_conversation_row(1, None, "user", "two")) is False
+
+
+class FlakySessions:
+    """Session factory whose sessions fail to commit while `down` is set."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.down = True
+
+    def __call__(self):
+        db = self.factory()
+        if self.down:
+            def fail():
+                raise RuntimeError("database unavailable")
+            db.commit = fail
+        return db
+
+
+def test_failed_batches_are_kept_and_retried_after_an_outage(monkeypatch):
+    import time
+    monkeypatch.setattr("database.conversation_writer.time.sleep", lambda seconds: None)
+    factory = make_session_factory()
+    sessions = FlakySessions(factory)
+    writer = ConversationWriter(session_factory=sessions, flush_interval_ms=10, batch_size=10, spill_path=None)
+
+    for i in range(3):
+        assert writer.enqueue(build_conversation_row(1, None, "user", f"message {i}"))
+    deadline = time.time() + 5
+    while writer.snapshot()["failed_flushes"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert writer.snapshot()["awaiting_retry"] == 3
+
+    sessions.down = False
+    deadline = time.time() + 5
+    while writer.snapshot()["flushed"] < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    writer.stop(timeout=1)
+
+    db = factory()
+    assert [row.interaction["content"] for row in db.query(Conversation).order_by(Conversation.id)] == [
+        "message 0", "message 1", "message 2",
+    ]
+    db.close()
+
+
+def test_unsaved_rows_are_spilled_on_stop_and_reflushed_on_start(tmp_path, monkeypatch):
+    monkeypatch.setattr("database.conversation_writer.time.sleep", lambda seconds: None)
+    factory = make_session_factory()
+    sessions = FlakySessions(factory)
+    spill_path = str(tmp_path / "spill.jsonl")
+    writer = ConversationWriter(session_factory=sessions, flush_interval_ms=10000, spill_path=spill_path)
+
+    assert writer.enqueue_many([build_conversation_row(1, None, "user", "question"), build_conversation_row(1, None, "bot", "answer")])
+    writer.stop(timeout=1)
+    assert writer.snapshot()["spilled"] == 2
+    # Stopped writers do not start the flusher again; callers fall back to write_sync
+    assert writer.enqueue(build_conversation_row(1, None, "user", "late")) is False
+    assert writer._thread is None or not writer._thread.is_alive()
+
+    sessions.down = False
+    restarted = ConversationWriter(session_factory=sessions, flush_interval_ms=10, spill_path=spill_path)
+    restarted.start()
+    restarted.stop(timeout=1)
+    assert not os.path.exists(spill_path)
+
+    db = factory()
+    rows = db.query(Conversation).order_by(Conversation.id).all()
+    assert [row.interaction["content"] for row in rows] == ["question", "answer"]
+    assert rows[0].created_at is not None
+    db.close()
+
+
+def test_rows_the_database_refuses_are_set_aside(tmp_path, monkeypatch):
+    import json
+    monkeypatch.setattr("database.conversation_writer.time.sleep", lambda seconds: None)
+    factory = make_session_factory()
+    rejected_path = str(tmp_path / "rejected.jsonl")
+    writer = ConversationWriter(
+        session_factory=factory, flush_interval_ms=10000, batch_size=10, spill_path=None, rejected_path=rejected_path,
+    )
+    writer.start = lambda: None  # flush by hand
+    rows = [build_conversation_row(1, None, "user", f"message {i}") for i in range(5)]
+    # e.g. a spilled row whose user has since been deleted
+    rows[2]["user_id"] = None
+    assert writer.enqueue_many(rows)
+    assert writer.flush() is True
+
+    snapshot = writer.snapshot()
+    assert snapshot["flushed"] == 4 and snapshot["rejected"] == 1 and snapshot["awaiting_retry"] == 0
+    with open(rejected_path) as f:
+        records = [json.loads(line) for line in f]
+    assert [record["row"]["interaction"]["content"] for record in records] == ["message 2"]
+    db = factory()
+    assert [row.interaction["content"] for row in db.query(Conversation).order_by(Conversation.id)] == [
+        "message 0", "message 1", "message 3", "message 4",
+    ]
+    db.close()
+    writer.stop(timeout=1)
+
+
+def test_analytics_errors_do_not_reinsert_a_committed_batch(monkeypatch):
+    factory = make_session_factory()
+    writer = ConversationWriter(session_factory=factory, flush_interval_ms=10000, spill_path=None)
+    writer.start = lambda: None  # flush by hand
+
+    def broken(rows):
+        raise RuntimeError("counter store down")
+
+    monkeypatch.setattr("database.conversation_writer.analytics_recorder.record_messages", broken)
+    assert writer.enqueue(build_conversation_row(1, None, "user", "once"))
+    assert writer.flush() is True
+    db = factory()
+    assert db.query(Conversation).count() == 1
+    db.close()
+    writer.stop(timeout=1)
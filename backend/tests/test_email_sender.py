@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled SMTP sender and the shared SendGrid client
+"""
+
+import os
+import smtplib
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+
+from channels import email_sender
+from channels.email_sender import SendGridSender, SMTPSender
+
+
+class FakeSMTP:
+    instances = []
+    fail_next_send = 0
+
+    def __init__(self, host, port, timeout=None):
+        self.logins = 0
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def sendmail(self, from_addr, to_addr, message):
+        if FakeSMTP.fail_next_send:
+            FakeSMTP.fail_next_send -= 1
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if to_addr == "refused@example.com":
+            raise smtplib.SMTPRecipientsRefused({to_addr: (550, b"no such user")})
+        self.sent.append((from_addr, to_addr, message))
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_fake():
+    FakeSMTP.instances = []
+    FakeSMTP.fail_next_send = 0
+
+
+def _sender(**kwargs):
+    return SMTPSender("smtp.example.com", 587, "bot@example.com", "secret", connect=FakeSMTP, **kwargs)
+
+
+def test_replies_reuse_one_authenticated_connection():
+    sender = _sender(pool_size=1)
+    for i in range(5):
+        assert sender.send("bot@example.com", f"user{i}@example.com", "body")
+    sender.stop()
+
+    assert len(FakeSMTP.instances) == 1
+    assert FakeSMTP.instances[0].logins == 1
+    assert len(FakeSMTP.instances[0].sent) == 5
+    assert FakeSMTP.instances[0].closed
+    assert sender.snapshot()["sent"] == 5 and sender.snapshot()["connects"] == 1
+
+
+def test_queued_replies_are_sent_in_batches():
+    sender = _sender(pool_size=1, batch_size=10)
+    # Hold the worker on the first message so the rest queue up behind it
+    gate = threading.Event()
+    original = FakeSMTP.sendmail
+
+    def slow_sendmail(self, *args):
+        gate.wait(5)
+        original(self, *args)
+
+    FakeSMTP.sendmail = slow_sendmail
+    try:
+        futures = [sender.submit("bot@example.com", f"user{i}@example.com", "body") for i in range(6)]
+        gate.set()
+        assert all(future.result(5) for future in futures)
+    finally:
+        FakeSMTP.sendmail = original
+        sender.stop()
+    assert sender.snapshot()["batches"] < 6
+
+
+def test_reconnects_after_a_dropped_connection():
+    sender = _sender(pool_size=1)
+    assert sender.send("bot@example.com", "a@example.com", "body")
+    FakeSMTP.fail_next_send = 1
+    assert sender.send("bot@example.com", "b@example.com", "body")
+    sender.stop()
+
+    assert len(FakeSMTP.instances) == 2
+    assert FakeSMTP.instances[1].sent[0][1] == "b@example.com"
+    assert sender.snapshot()["reconnects"] == 1
+
+
+def test_rejected_recipient_fails_only_that_message():
+    sender = _sender(pool_size=1)
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        sender.send("bot@example.com", "refused@example.com", "body")
+    assert sender.send("bot@example.com", "ok@example.com", "body")
+    sender.stop()
+
+    assert len(FakeSMTP.instances) == 1
+    assert sender.snapshot()["failed"] == 1
+
+
+def test_connection_is_recycled_after_max_messages(monkeypatch):
+    monkeypatch.setattr(email_sender, "SMTP_MAX_MESSAGES_PER_CONNECTION", 2)
+    sender = _sender(pool_size=1)
+    for i in range(5):
+        sender.send("bot@example.com", f"user{i}@example.com", "body")
+    sender.stop()
+    assert [len(smtp.sent) for smtp in FakeSMTP.instances] == [2, 2, 1]
+
+
+class FakeMail:
+    def get(self):
+        return {"personalizations": [{"to": [{"email": "a@example.com"}]}]}
+
+
+class FakeResponse:
+    status_code = 202
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.headers = {}
+        self.posts = []
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        return FakeResponse()
+
+
+def test_sendgrid_sender_reuses_session_and_bounds_concurrency():
+    session = FakeSession()
+    sender = SendGridSender("SG.key", max_concurrency=1, timeout_seconds=0.05, session=session)
+    assert sender.send(FakeMail()) == 202
+    assert sender.send(FakeMail()) == 202
+    assert len(session.posts) == 2 and session.headers["Authorization"] == "Bearer SG.key"
+
+    sender._slots.acquire()  # another send in flight
+    with pytest.raises(RuntimeError):
+        sender.send(FakeMail())
+    assert sender.snapshot() == {"sent": 2, "failed": 0, "saturated": 1}
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the timestamp-range inbox day filters
+"""
+
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.database import Base, Conversation, User
+from database.conversation_writer import ConversationWriter, build_conversation_row
+from adminbackend.inbox import day_bounds, get_inbox_dates, get_users_by_date, get_user_conversation_by_date
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        User(id=1, email="one@example.com", phone_number="+10000000001"),
+        User(id=2, email="two@example.com", phone_number="+10000000002"),
+    ])
+    db.commit()
+    return db
+
+
+def add_message(db, user_id, created_at, bot_id=1):
+    db.add(Conversation(
+        user_id=user_id, bot_id=bot_id, interaction={"source": "user", "content": str(created_at)},
+        source="user", channel="web", created_at=created_at,
+    ))
+    db.commit()
+
+
+def test_day_bounds_are_half_open_utc():
+    start, end = day_bounds(datetime.date(2024, 3, 1), "UTC")
+    assert (start, end) == (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 3, 2))
+
+
+def test_day_bounds_follow_dst_changes():
+    start, end = day_bounds(datetime.date(2024, 3, 10), "America/New_York")
+    assert start == datetime.datetime(2024, 3, 10, 5)
+    assert end - start == datetime.timedelta(hours=23)
+
+
+def test_unknown_timezone_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        day_bounds(datetime.date(2024, 3, 1), "Mars/Olympus_Mons")
+    assert exc.value.status_code == 400
+
+
+def test_unknown_default_timezone_is_named_in_the_error(monkeypatch):
+    monkeypatch.setattr("adminbackend.inbox.INBOX_TIMEZONE", "Mars/Olympus_Mons")
+    with pytest.raises(HTTPException) as exc:
+        day_bounds(datetime.date(2024, 3, 1))
+    assert exc.value.detail == "Unknown timezone: Mars/Olympus_Mons"
+
+
+def test_inbox_day_uses_the_requested_timezone():
+    db = make_session()
+    # 23:30 UTC on the 1st is already the 2nd in Kolkata (UTC+5:30)
+    add_message(db, 1, datetime.datetime(2024, 3, 1, 23, 30))
+    add_message(db, 2, datetime.datetime(2024, 3, 1, 12, 0))
+    # Exactly midnight UTC belongs to the next day only
+    add_message(db, 2, datetime.datetime(2024, 3, 2, 0, 0))
+
+    utc_users = get_users_by_date(db, datetime.date(2024, 3, 1)).items
+    assert [u.id for u in utc_users] == [1, 2]
+    kolkata_users = get_users_by_date(db, datetime.date(2024, 3, 2), tz="Asia/Kolkata").items
+    assert [u.id for u in kolkata_users] == [1, 2]
+
+    convos = get_user_conversation_by_date(db, 2, datetime.date(2024, 3, 1), bot_id=1).items
+    assert [c.created_at for c in convos] == [datetime.datetime(2024, 3, 1, 12, 0)]
+
+
+def test_inbox_dates_are_days_in_the_requested_timezone():
+    db = make_session()
+    writer = ConversationWriter(session_factory=lambda: db)
+    for created_at in (datetime.datetime(2024, 3, 1, 23, 30), datetime.datetime(2024, 3, 5, 12, 0)):
+        row = build_conversation_row(1, 1, "user", "hi")
+        row["created_at"] = created_at
+        writer.write_sync(db, row)
+
+    assert get_inbox_dates(db, bot_id=1) == [datetime.date(2024, 3, 5), datetime.date(2024, 3, 1)]
+    # Every listed day has activity under the same bounds the drill-down uses
+    kolkata = get_inbox_dates(db, bot_id=1, tz="Asia/Kolkata")
+    assert kolkata == [datetime.date(2024, 3, 5), datetime.date(2024, 3, 2)]
+    for day in kolkata:
+        assert get_users_by_date(db, day, bot_id=1, tz="Asia/Kolkata").items
+    assert get_inbox_dates(db, bot_id=1, tz="America/New_York") == [datetime.date(2024, 3, 5), datetime.date(2024, 3, 1)]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for batched Messenger/Instagram webhook parsing and batch enqueueing
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+
+from channels.builders.instagram import InstagramMessageBuilder
+from channels.builders.messenger import MessengerMessageBuilder
+from channels.inbound_queue import SQLiteQueue
+from channels.workers import WebhookWorkerPool
+
+
+def _batch():
+    return {
+        "object": "page",
+        "entry": [
+            {
+                "id": "page-1",
+                "time": 1700000000000,
+                "messaging": [
+                    {"sender": {"id": "user-a"}, "timestamp": 1, "message": {"mid": "m.1", "text": "hello"}},
+                    {"sender": {"id": "user-b"}, "timestamp": 2, "message": {"mid": "m.2", "text": "hi there"}},
+                    {"sender": {"id": "user-a"}, "timestamp": 3, "delivery": {"mids": ["m.0"]}},
+                ],
+            },
+            {
+                "id": "page-1",
+                "time": 1700000000001,
+                "messaging": [
+                    {"sender": {"id": "user-c"}, "timestamp": 4, "postback": {"mid": "m.3", "payload": "GET_STARTED"}},
+                    {"sender": {"id": "page-1"}, "timestamp": 5, "message": {"mid": "m.4", "text": "echo", "is_echo": True}},
+                    {"sender": {"id": "user-d"}, "timestamp": 6, "read": {"watermark": 6}},
+                ],
+            },
+        ],
+    }
+
+
+def test_messenger_build_all_returns_every_message_and_postback():
+    messages = MessengerMessageBuilder(_batch()).build_all()
+
+    assert [m.sender_id for m in messages] == ["user-a", "user-b", "user-c"]
+    assert [m.message_id for m in messages] == ["m.1", "m.2", "m.3"]
+    assert messages[2].content == "User clicked: GET_STARTED"
+    assert all(m.channel_name == "messenger" for m in messages)
+    assert messages[0].metadata["entry_id"] == "page-1"
+    assert messages[0].metadata["sender_name"] == "Messenger User user-a"
+    # build() keeps returning the first message
+    assert MessengerMessageBuilder(_batch()).build().message_id == "m.1"
+
+
+def test_messenger_non_text_content():
+    payload = {"entry": [{"id": "p", "messaging": [
+        {"sender": {"id": "u"}, "message": {"mid": "m", "attachments": [{"type": "image", "payload": {}}]}},
+    ]}]}
+    message = MessengerMessageBuilder(payload).build()
+    assert message.content == "[Image attachment received]"
+    assert message.attachments == [{"type": "image", "payload": {}}]
+
+
+def test_instagram_build_all_and_errors():
+    payload = _batch()
+    payload["object"] = "instagram"
+    messages = InstagramMessageBuilder(payload).build_all()
+    assert [m.channel_name for m in messages] == ["instagram"] * 3
+
+    with pytest.raises(ValueError):
+        InstagramMessageBuilder({"object": "instagram", "entry": []}).build_all()
+    only_receipts = {"entry": [{"id": "p", "messaging": [{"sender": {"id": "u"}, "read": {"watermark": 1}}]}]}
+    assert InstagramMessageBuilder(only_receipts).build_all() == []
+    with pytest.raises(ValueError):
+        InstagramMessageBuilder(only_receipts).build()
+
+
+def test_submit_many_queues_each_message_as_a_job(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "webhooks.db"))
+    pool = WebhookWorkerPool(queue=queue, workers=4, channel_concurrency=4)
+    handled = []
+
+    async def handler(message):
+        handled.append(message.sender_id)
+
+    async def scenario():
+        pool.register("messenger", handler)
+        await pool.start()
+        job_ids = await pool.submit_many(MessengerMessageBuilder(_batch()).build_all())
+        assert len(set(job_ids)) == 3
+        assert await pool.submit_many([]) == []
+        for _ in range(100):
+            if len(handled) == 3:
+                break
+            await asyncio.sleep(0.02)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert sorted(handled) == ["user-a", "user-b", "user-c"]
+    assert pool.snapshot()["enqueued"] == 3
+    queue.close()
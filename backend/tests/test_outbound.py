@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled outbound HTTP client used for channel replies
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+import pytest
+
+from channels.outbound import OutboundClient, RateLimiter, parse_overrides
+
+
+def _client(handler, **kwargs):
+    options = {"rate_per_second": 0, "rate_limits": {}, "timeouts": {}, "retry_base_seconds": 0, **kwargs}
+    return OutboundClient(transport=httpx.MockTransport(handler), **options)
+
+
+def _post(client, platform="telegram"):
+    async def scenario():
+        try:
+            return await client.post(platform, "https://api.example.com/send", json={"text": "hi"})
+        finally:
+            await client.close()
+
+    return asyncio.run(scenario())
+
+
+def test_parse_overrides():
+    assert parse_overrides("telegram=30, messenger=2.5,bad,x=y") == {"telegram": 30.0, "messenger": 2.5}
+
+
+def test_retries_server_errors_then_succeeds():
+    statuses = iter([503, 502, 200])
+    client = _client(lambda request: httpx.Response(next(statuses), json={"ok": True}))
+    response = _post(client)
+    assert response.status_code == 200
+    assert client.snapshot()["platforms"]["telegram"]["retries"] == 2
+
+
+def test_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": "bad recipient"})
+
+    client = _client(handler)
+    assert _post(client, "messenger").status_code == 400
+    assert len(calls) == 1
+    assert client.snapshot()["platforms"]["messenger"]["failures"] == 1
+
+
+def test_transport_errors_raise_after_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = _client(handler, max_retries=2)
+    with pytest.raises(httpx.ConnectError):
+        _post(client, "instagram")
+    assert len(calls) == 3
+
+
+def test_retry_after_is_respected_and_capped():
+    client = OutboundClient(retry_max_seconds=5)
+    assert client._backoff(0, httpx.Response(429, headers={"Retry-After": "2"})) == 2
+    assert client._backoff(0, httpx.Response(429, headers={"Retry-After": "60"})) == 5
+    assert 0 <= client._backoff(3, None) <= 4
+
+
+def test_rate_limiter_spaces_out_bursts():
+    async def scenario():
+        limiter = RateLimiter(rate_per_second=50, burst=1)
+        started = asyncio.get_running_loop().time()
+        await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+        return asyncio.get_running_loop().time() - started, limiter.waits
+
+    elapsed, waits = asyncio.run(scenario())
+    assert waits == 4
+    assert elapsed >= 4 / 50 * 0.9
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for persisting channel replies and retrying failed sends
+"""
+
+import asyncio
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from channels.deliveries import OutboundDeliveryQueue
+from database.database import Base, OutboundDelivery
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    path = tmp_path / "deliveries.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def _run(db_url, scenario):
+    async def main():
+        engine = create_async_engine(db_url)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            return await scenario(factory)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+async def _rows(factory):
+    async with factory() as db:
+        return (await db.execute(select(OutboundDelivery).order_by(OutboundDelivery.id))).scalars().all()
+
+
+async def _make_due(factory):
+    async with factory() as db:
+        for delivery in (await db.execute(select(OutboundDelivery))).scalars():
+            if delivery.status == "pending":
+                delivery.next_attempt_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+        await db.commit()
+
+
+def test_successful_delivery_is_recorded_against_the_turn(db_url):
+    sent = []
+
+    async def sender(recipient, text, **extras):
+        sent.append((recipient, text, extras))
+        return True
+
+    async def scenario(factory):
+        queue = OutboundDeliveryQueue(session_factory=factory)
+        queue.register("email", sender)
+        assert await queue.deliver("email", "a@example.com", "Hello", turn_id="t1", reply_to_subject="Help")
+        return await _rows(factory), queue.snapshot()
+
+    rows, snapshot = _run(db_url, scenario)
+    assert sent == [("a@example.com", "Hello", {"reply_to_subject": "Help"})]
+    assert [(r.turn_id, r.status, r.attempts, r.last_error) for r in rows] == [("t1", "sent", 1, None)]
+    assert rows[0].delivered_at is not None and rows[0].next_attempt_at is None
+    assert snapshot["sent"] == 1
+
+
+def test_failed_send_is_retried_with_stored_text(db_url):
+    attempts = []
+
+    async def flaky(recipient, text):
+        attempts.append(text)
+        if len(attempts) == 1:
+            raise ConnectionError("graph api unavailable")
+        return True
+
+    async def scenario(factory):
+        queue = OutboundDeliveryQueue(session_factory=factory, retry_base_seconds=60)
+        queue.register("messenger", flaky)
+        assert not await queue.deliver("messenger", "psid-1", "Answer", turn_id="t2")
+        pending = (await _rows(factory))[0]
+        # Not due yet
+        assert await queue.retry_due() == 0
+        await _make_due(factory)
+        assert await queue.retry_due() == 1
+        return pending, (await _rows(factory))[0]
+
+    pending, final = _run(db_url, scenario)
+    assert pending.status == "pending" and pending.attempts == 1
+    assert pending.last_error == "ConnectionError: graph api unavailable"
+    assert pending.next_attempt_at > datetime.datetime.utcnow() + datetime.timedelta(seconds=50)
+    assert attempts == ["Answer", "Answer"]
+    assert (final.status, final.attempts, final.last_error) == ("sent", 2, None)
+
+
+def test_delivery_fails_after_max_attempts(db_url):
+    async def broken(recipient, text):
+        return False
+
+    async def scenario(factory):
+        queue = OutboundDeliveryQueue(session_factory=factory, max_attempts=3)
+        queue.register("telegram", broken)
+        await queue.deliver("telegram", "42", "Answer")
+        for _ in range(3):
+            await _make_due(factory)
+            await queue.retry_due()
+        return (await _rows(factory))[0], queue.snapshot()
+
+    row, snapshot = _run(db_url, scenario)
+    assert (row.status, row.attempts, row.next_attempt_at) == ("failed", 3, None)
+    assert row.last_error == "send reported failure"
+    assert snapshot["failed"] == 1 and snapshot["retried"] == 2
+
+
+def test_retry_delay_backs_off_exponentially():
+    queue = OutboundDeliveryQueue(retry_base_seconds=30, retry_max_seconds=100)
+    assert [queue.retry_delay(n) for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+
+def test_a_retried_job_does_not_answer_or_save_the_turn_again(db_url):
+    from channels.deliveries import message_turn_id
+    from channels.schemas import StandardizedMessage
+    from database.database import Conversation
+
+    asked = []
+    sent = []
+
+    async def answer(question):
+        asked.append(question)
+        return f"re: {question}"
+
+    async def sender(recipient, text, **extras):
+        sent.append(text)
+        raise ConnectionError("provider down")
+
+    message = StandardizedMessage(
+        channel_name="telegram", sender_id="42", content="hello", conversation_id="telegram-42", message_id="update-7",
+    )
+
+    async def scenario(factory):
+        queue = OutboundDeliveryQueue(session_factory=factory)
+        queue.register("telegram", sender)
+        async with factory() as db:
+            first = await queue.answer_once(db, message, 1, "telegram", answer, recipient="42")
+        # The job is retried (say the worker died before acknowledging it)
+        async with factory() as db:
+            second = await queue.answer_once(db, message, 1, "telegram", answer, recipient="42")
+            turns = (await db.execute(select(Conversation.source, Conversation.turn_id))).all()
+        return first, second, turns, await _rows(factory)
+
+    first, second, turns, deliveries = _run(db_url, scenario)
+    assert first == "re: hello" and second is None
+    assert asked == ["hello"] and sent == ["re: hello"]
+    assert sorted(source for source, _ in turns) == ["bot", "user"]
+    assert {turn_id for _, turn_id in turns} == {message_turn_id(message)}
+    assert len(deliveries) == 1 and deliveries[0].status == "pending" and deliveries[0].turn_id == message_turn_id(message)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination of the listing endpoints
+"""
+
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.database import Base, Conversation, Ticket, User
+from adminbackend.pagination import encode_cursor, decode_cursor
+from adminbackend import tickets as tickets_crud
+from adminbackend.inbox import get_users_by_date, get_user_conversation_by_date
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([User(id=i, email=f"user{i}@example.com", phone_number=f"+1000000000{i}") for i in range(1, 6)])
+    db.commit()
+    return db
+
+
+def collect(fetch, limit):
+    """Walk every page and return all items plus the number of pages."""
+    items, cursor, pages = [], None, 0
+    while True:
+        page = fetch(cursor=cursor, limit=limit)
+        items.extend(page.items)
+        pages += 1
+        if not page.next_cursor:
+            return items, pages
+        cursor = page.next_cursor
+
+
+def test_tickets_walk_every_row_once_newest_first():
+    db = make_session()
+    # Several tickets share a created_at so the id tie-breaker matters
+    stamp = datetime.datetime(2024, 5, 1, 12, 0, 0)
+    for i in range(7):
+        db.add(Ticket(user_id=1, bot_id=1, topic=f"t{i}", created_at=stamp + datetime.timedelta(minutes=i // 3)))
+    db.commit()
+
+    tickets, pages = collect(lambda **kw: tickets_crud.get_all_tickets_page(db, **kw), limit=3)
+
+    assert pages == 3
+    assert len({t.id for t in tickets}) == 7
+    keys = [(t.created_at, t.id) for t in tickets]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_inbox_users_and_conversations_are_paged():
+    db = make_session()
+    day = datetime.datetime(2024, 5, 2, 9, 0, 0)
+    for user_id in range(1, 6):
+        for n in range(2):
+            db.add(Conversation(
+                user_id=user_id, bot_id=1, interaction={"source": "user", "content": f"m{n}"},
+                source="user", created_at=day + datetime.timedelta(seconds=n),
+            ))
+    db.commit()
+
+    users, _ = collect(lambda **kw: get_users_by_date(db, day.date(), bot_id=1, **kw), limit=2)
+    assert [u.id for u in users] == [1, 2, 3, 4, 5]
+
+    convos, pages = collect(lambda **kw: get_user_conversation_by_date(db, 3, day.date(), **kw), limit=1)
+    assert pages == 2
+    assert [c.interaction["content"] for c in convos] == ["m0", "m1"]
+
+
+def test_cursor_round_trips_datetimes():
+    stamp = datetime.datetime(2024, 5, 1, 12, 30, 15, 123)
+    values = decode_cursor(encode_cursor([stamp, 42]), [Ticket.created_at, Ticket.id])
+    assert values == [stamp, 42]
+
+
+def test_invalid_cursor_is_a_client_error():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor", [Ticket.created_at, Ticket.id])
+    assert exc.value.status_code == 400
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests for the monthly conversations partition helpers
+"""
+
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+
+from database import partitions
+
+
+def test_month_arithmetic():
+    assert partitions.add_months(datetime.date(2024, 11, 1), 3) == datetime.date(2025, 2, 1)
+    assert partitions.add_months(datetime.date(2024, 1, 1), -1) == datetime.date(2023, 12, 1)
+    assert partitions.month_start(datetime.datetime(2024, 2, 29, 23, 59)) == datetime.date(2024, 2, 1)
+
+
+def test_partition_name_and_bounds():
+    month = datetime.date(2024, 12, 1)
+    assert partitions.partition_name(month) == "conversations_y2024m12"
+    assert partitions.partition_bounds(month) == "FROM ('2024-12-01') TO ('2025-01-01')"
+
+
+def test_retention_boundary():
+    now = datetime.datetime(2025, 3, 15)
+    assert partitions.retention_boundary(now, retain_months=12) == datetime.date(2024, 3, 1)
+    assert partitions.retention_boundary(now, retain_months=0) is None
+
+
+def test_helpers_are_noops_without_postgres():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        assert not partitions.is_partitioned(connection)
+        assert partitions.ensure_partitions(connection) == []
+        assert partitions.detach_partitions(connection, datetime.date(2030, 1, 1), drop=True) == []
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for password hashing, the bounded hashing executor and login throttling
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from auth import auth
+from auth.passwords import LoginThrottle, PasswordHasher
+from database.database import Base, User
+
+
+def legacy_hash(password):
+    salt = os.urandom(16)
+    return salt.hex() + ":" + hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 100000).hex()
+
+
+def test_hash_format_and_legacy_verification(monkeypatch):
+    monkeypatch.setattr(auth, "PASSWORD_HASH_ITERATIONS", 1000)
+    hashed = auth.get_password_hash("secret")
+    assert hashed.startswith("pbkdf2_sha256$1000$")
+    assert auth.verify_password("secret", hashed) and not auth.verify_password("wrong", hashed)
+    assert not auth.needs_rehash(hashed)
+
+    old = legacy_hash("secret")
+    assert auth.verify_password("secret", old)
+    assert auth.needs_rehash(old)
+    assert not auth.verify_password("secret", "garbage")
+
+
+def test_process_pool_hashing():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    try:
+        hashed = asyncio.run(hasher.hash("secret"))
+        assert asyncio.run(hasher.verify("secret", hashed))
+        assert not asyncio.run(hasher.verify("secret", None))
+    finally:
+        hasher.shutdown()
+    snapshot = hasher.snapshot()
+    assert snapshot["completed"] == 2 and snapshot["pending"] == 0
+
+
+def test_full_queue_is_rejected():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return True
+
+    async def scenario():
+        worker = asyncio.create_task(hasher._run(slow))
+        await asyncio.to_thread(started.wait, 5)
+        try:
+            with pytest.raises(HTTPException) as error:
+                await hasher.verify("secret", legacy_hash("secret"))
+        finally:
+            release.set()
+            await worker
+        return error
+
+    error = asyncio.run(scenario())
+    assert error.value.status_code == 503
+    assert hasher.snapshot()["rejected"] == 1
+
+
+def test_timeout_is_a_503_and_keeps_the_slot_until_done():
+    hasher = PasswordHasher(workers=1, max_pending=1, timeout_seconds=0.2)
+    try:
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(hasher._run(time.sleep, 1))
+        assert error.value.status_code == 503 and error.value.headers["Retry-After"] == "1"
+        # The worker is still hashing, so the slot is still taken
+        assert hasher.snapshot()["pending"] == 1
+        with pytest.raises(HTTPException):
+            asyncio.run(hasher._run(time.sleep, 0))
+        assert hasher.snapshot()["rejected"] == 1
+    finally:
+        hasher.shutdown()
+    assert hasher.snapshot()["pending"] == 0
+
+
+def test_crashed_worker_is_a_503_and_the_pool_recovers():
+    hasher = PasswordHasher(workers=1, max_pending=2)
+    try:
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(hasher._run(os._exit, 1))
+        assert error.value.status_code == 503
+        assert hasher.snapshot()["pending"] == 0
+        assert asyncio.run(hasher.verify("secret", asyncio.run(hasher.hash("secret"))))
+    finally:
+        hasher.shutdown()
+
+
+def test_login_upgrades_legacy_hash(monkeypatch, tmp_path):
+    monkeypatch.setattr(auth, "PASSWORD_HASH_ITERATIONS", 1000)
+    db_path = tmp_path / "passwords.db"
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{db_path}"))
+    hasher = PasswordHasher(workers=0)
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            user = User(id=1, email="a@example.com", password=legacy_hash("secret"))
+            db.add(user)
+            await db.commit()
+
+            assert await hasher.verify("secret", user.password)
+            assert await hasher.upgrade(db, user, "secret")
+            stored = (await db.execute(select(User.password))).scalars().one()
+            assert not await hasher.upgrade(db, user, "secret")
+        await engine.dispose()
+        return stored
+
+    stored = asyncio.run(scenario())
+    assert stored.startswith("pbkdf2_sha256$1000$") and auth.verify_password("secret", stored)
+
+
+def test_throttle_per_ip_and_account():
+    throttle = LoginThrottle(per_ip=3, per_account=2, window_seconds=60)
+    throttle.check("1.2.3.4", "a@example.com")
+    throttle.check("1.2.3.4", "A@example.com")
+    with pytest.raises(HTTPException) as error:
+        throttle.check("5.6.7.8", "a@example.com")
+    assert error.value.status_code == 429
+
+    throttle.check("1.2.3.4", "b@example.com")
+    with pytest.raises(HTTPException):
+        throttle.check("1.2.3.4", "c@example.com")
+    assert throttle.snapshot()["throttled"] == 2
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached token authentication dependencies
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+from auth.auth import create_access_token
+from auth.dependencies import get_current_admin, get_current_user, principal_cache
+from database.database import Admin, Base, User
+
+
+@pytest.fixture
+def factory():
+    principal_cache.clear()
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([User(id=1, email="user@example.com"), Admin(id=1, email="admin@example.com", password="x")])
+    db.commit()
+    db.close()
+
+    factory.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: factory.statements.append(args[2]))
+    return factory
+
+
+def bearer(token):
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+def test_second_request_does_not_query_users(factory):
+    token = create_access_token({"sub": "user@example.com"})
+    db = factory()
+    assert get_current_user(bearer(token), db).id == 1
+    db.close()
+    queries = len(factory.statements)
+
+    db = factory()
+    user = get_current_user(bearer(token), db)
+    assert len(factory.statements) == queries
+    # The cached row is attached to the new session like a freshly loaded one
+    assert user in db and user.email == "user@example.com"
+    db.close()
+
+
+def test_update_invalidates_cached_user(factory):
+    token = create_access_token({"sub": "user@example.com"})
+    db = factory()
+    get_current_user(bearer(token), db)
+    db.query(User).filter(User.id == 1).one().name = "Renamed"
+    db.commit()
+    db.close()
+
+    db = factory()
+    queries = len(factory.statements)
+    assert get_current_user(bearer(token), db).name == "Renamed"
+    assert len(factory.statements) > queries
+    db.close()
+
+
+def test_admin_requires_admin_token(factory):
+    db = factory()
+    with pytest.raises(HTTPException) as error:
+        get_current_admin(bearer(create_access_token({"sub": "admin@example.com"})), db)
+    assert error.value.status_code == 401
+    admin = get_current_admin(bearer(create_access_token({"sub": "admin@example.com", "type": "admin"})), db)
+    assert admin.id == 1
+    db.close()
+
+
+def test_rejects_bad_tokens(factory):
+    db = factory()
+    for request in (bearer("not-a-jwt"), Request({"type": "http", "headers": []})):
+        with pytest.raises(HTTPException) as error:
+            get_current_user(request, db)
+        assert error.value.status_code == 401
+    with pytest.raises(HTTPException):
+        get_current_user(bearer(create_access_token({"sub": "nobody@example.com"})), db)
+    db.close()
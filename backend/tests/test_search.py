@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for full-text search over conversations and tickets (SQLite FTS5)
+"""
+
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database.database import Base, Conversation, Ticket, User
+from database.conversation_writer import ConversationWriter, build_conversation_row
+from database.search import install_search
+from adminbackend.search import search
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="one@example.com", phone_number="+10000000001"))
+    db.commit()
+    return db
+
+
+def add(db, content, bot_id=3, created_at=None):
+    row = build_conversation_row(1, bot_id, "user", content)
+    if created_at:
+        row["created_at"] = created_at
+    ConversationWriter(session_factory=lambda: db).write_sync(db, row)
+
+
+def test_search_ranks_and_stems():
+    db = make_session()
+    add(db, "I want a refund for my order")
+    add(db, "Refund refund refunds, where is my refund?")
+    add(db, "What are your opening hours?")
+
+    hits = search(db, "refunded").items
+    assert [h["content"] for h in hits] == ["Refund refund refunds, where is my refund?", "I want a refund for my order"]
+    assert hits[0]["score"] >= hits[1]["score"]
+    assert "[" in hits[0]["snippet"]
+
+
+def test_filters_and_keyset_pages():
+    db = make_session()
+    start = datetime.datetime(2024, 1, 1)
+    for i in range(5):
+        add(db, f"billing question {i}", created_at=start + datetime.timedelta(days=i))
+    add(db, "billing question elsewhere", bot_id=4)
+
+    assert len(search(db, "billing", bot_id=4).items) == 1
+    ranged = search(db, "billing", bot_id=3, since=datetime.datetime(2024, 1, 2), until=datetime.datetime(2024, 1, 4))
+    assert sorted(h["content"] for h in ranged.items) == ["billing question 1", "billing question 2"]
+
+    seen, cursor = [], None
+    while True:
+        page = search(db, "billing", bot_id=3, cursor=cursor, limit=2)
+        seen.extend(h["id"] for h in page.items)
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+    assert len(seen) == len(set(seen)) == 5
+
+
+def test_index_follows_updates_and_deletes():
+    db = make_session()
+    add(db, "cancel my subscription")
+    convo = db.query(Conversation).one()
+    convo.interaction = {"source": "user", "content": "upgrade my plan"}
+    db.commit()
+    assert search(db, "cancel").items == []
+    assert len(search(db, "upgrade").items) == 1
+
+    db.delete(convo)
+    db.commit()
+    assert search(db, "upgrade").items == []
+
+
+def test_tickets_and_legacy_rows_are_searchable():
+    db = make_session()
+    db.add(Ticket(user_id=1, bot_id=3, topic="Card blocked", description="My debit card was blocked abroad"))
+    db.add(Conversation(user_id=1, bot_id=3, interaction={"question": "lost passport", "answer": "visit the embassy"}))
+    db.commit()
+
+    assert [h["topic"] for h in search(db, "debit card", search_type="tickets").items] == ["Card blocked"]
+    assert len(search(db, "embassy").items) == 1
+
+
+def test_install_backfills_existing_rows():
+    db = make_session()
+    db.execute(text("DROP TABLE conversations_fts"))
+    db.execute(text("DROP TRIGGER conversations_fts_ai"))
+    db.commit()
+    add(db, "written before the index existed")
+    install_search(db.connection())
+    assert len(search(db, "index").items) == 1
+
+
+def test_query_syntax_is_not_interpreted():
+    db = make_session()
+    add(db, "out-of-stock NEAR me")
+    assert len(search(db, 'out-of-stock "NEAR').items) == 1
+    with pytest.raises(HTTPException):
+        search(db, "   ")
+    with pytest.raises(HTTPException):
+        search(db, "!!!")
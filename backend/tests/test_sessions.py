@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for engine configuration, pool wait metrics and the async session path
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from database import sessions
+from database.database import Base, User
+
+
+def test_async_database_url():
+    assert sessions.async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert sessions.async_database_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert sessions.async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+
+def test_engine_options(monkeypatch):
+    assert sessions.engine_options("sqlite:///./app.db", sessions.TimedQueuePool) == {}
+
+    monkeypatch.setattr(sessions, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(sessions, "DB_STATEMENT_TIMEOUT_MS", 5000)
+    sync = sessions.engine_options("postgresql://u:p@db/app", sessions.TimedQueuePool)
+    assert sync["pool_size"] == 7 and sync["poolclass"] is sessions.TimedQueuePool
+    assert sync["connect_args"] == {"options": "-c statement_timeout=5000"}
+    async_ = sessions.engine_options("postgresql+asyncpg://u:p@db/app", sessions.TimedAsyncQueuePool)
+    assert async_["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+
+
+def test_timed_pool_records_checkout_wait(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=sessions.TimedQueuePool, pool_size=1, max_overflow=0)
+    before = sessions.TimedQueuePool.wait_stats.snapshot()["checkouts"]
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    snapshot = sessions._pool_snapshot(engine.pool)
+    assert snapshot["wait"]["checkouts"] == before + 1
+    assert snapshot["checked_out"] == 0
+
+
+def test_async_session(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert().values(id=1, email="a@example.com"))
+
+    monkeypatch.setattr(sessions, "ASYNC_DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    monkeypatch.setattr(sessions, "_async_engine", None)
+
+    async def lookup():
+        try:
+            async for db in sessions.get_async_db():
+                return (await db.execute(select(User).where(User.id == 1))).scalars().first()
+        finally:
+            await sessions.dispose_async_engine()
+
+    user = asyncio.run(lookup())
+    assert user.email == "a@example.com"
+    assert sessions.pool_snapshot()["async"] is not None
+
+
+def test_reads_fall_back_to_primary_without_replica():
+    if sessions.REPLICA_DATABASE_URL:
+        pytest.skip("REPLICA_DATABASE_URL is set")
+    assert sessions.replica_engine is sessions.engine
+    assert sessions.replica_session_local is sessions.session_local
+    db = next(sessions.get_read_db())
+    try:
+        assert db.get_bind() is sessions.engine
+    finally:
+        db.close()
+    assert sessions.pool_snapshot()["replica"] is None
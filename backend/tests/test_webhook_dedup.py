@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for dropping provider redeliveries of webhooks by message id
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from channels.builders.email import EmailMessageBuilder
+from channels.builders.telegram import TelegramMessageBuilder
+from channels.builders.twilio import TwilioMessageBuilder
+from channels.dedup import DeliveryDedup
+
+
+class FakeRedis:
+    def __init__(self):
+        self.keys = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    def delete(self, key):
+        self.keys.pop(key, None)
+
+
+def test_in_process_store_drops_repeats_per_channel():
+    dedup = DeliveryDedup(redis_url=None)
+    assert not dedup.seen("telegram", "1001")
+    assert dedup.seen("telegram", "1001")
+    assert not dedup.seen("twilio", "1001")
+    # Messages without a provider id are always processed
+    assert not dedup.seen("telegram", None)
+    assert not dedup.seen("telegram", None)
+    assert dedup.snapshot() == {"backend": "memory", "tracked": 2, "duplicates": 1, "redis_errors": 0}
+
+
+def test_in_process_store_expires_and_is_bounded():
+    expired = DeliveryDedup(redis_url=None, ttl_seconds=0)
+    assert not expired.seen("sms", "SM1")
+    assert not expired.seen("sms", "SM1")
+
+    bounded = DeliveryDedup(redis_url=None, max_entries=2)
+    for sid in ("SM1", "SM2", "SM3"):
+        bounded.seen("sms", sid)
+    assert bounded.snapshot()["tracked"] == 2
+    # The oldest id was evicted first
+    assert not bounded.seen("sms", "SM1")
+    assert bounded.seen("sms", "SM3")
+
+
+def test_forget_lets_a_retry_through():
+    dedup = DeliveryDedup(redis_url=None)
+    dedup.seen("email", "<abc@mail>")
+    dedup.forget("email", "<abc@mail>")
+    assert not dedup.seen("email", "<abc@mail>")
+
+
+def test_redis_store_uses_set_nx():
+    dedup = DeliveryDedup(redis_url="redis://unused")
+    dedup._client, dedup._connected = FakeRedis(), True
+    assert not dedup.seen("messenger", "m_1")
+    assert dedup.seen("messenger", "m_1")
+    assert "webhooks:seen:messenger:m_1" in dedup._client.keys
+    dedup.forget("messenger", "m_1")
+    assert not dedup.seen("messenger", "m_1")
+    assert dedup.snapshot()["backend"] == "redis"
+
+
+def test_builders_extract_provider_message_ids():
+    twilio = TwilioMessageBuilder({"From": "whatsapp:+15551234567", "Body": "Hi", "MessageSid": "SM123"}).build()
+    assert twilio.message_id == "SM123"
+
+    telegram = TelegramMessageBuilder(
+        {"update_id": 987, "message": {"chat": {"id": 5, "type": "private"}, "from": {"id": 5}, "text": "Hi"}}
+    ).build()
+    assert telegram.message_id == "987"
+
+    email = EmailMessageBuilder({
+        "from": "Jane <jane@example.com>",
+        "text": "Hi",
+        "headers": "Received: by mx\nMessage-ID: <CAF123@mail.example.com>\nSubject: Hi",
+    }).build()
+    assert email.message_id == "<CAF123@mail.example.com>"
+    assert EmailMessageBuilder({"from": "jane@example.com", "text": "Hi"}).build().message_id is None
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable inbound webhook queue and its worker pool
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+
+from channels.inbound_queue import SQLiteQueue, create_queue
+from channels.schemas import StandardizedMessage
+from channels.workers import WebhookWorkerPool, parse_channel_limits, retry_delay
+
+
+def _message(channel="telegram", sender="42", content="hello"):
+    return StandardizedMessage(
+        channel_name=channel,
+        sender_id=sender,
+        content=content,
+        conversation_id=f"{channel}-{sender}",
+        metadata={"subject": "Hi"},
+    )
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = SQLiteQueue(str(tmp_path / "webhooks.db"))
+    yield q
+    q.close()
+
+
+def test_sqlite_queue_claims_leases_and_acks(queue):
+    first = queue.enqueue(_message(content="one"))
+    queue.enqueue(_message(content="two"))
+    queue.enqueue(_message(channel="email", sender="a@b.com"))
+
+    jobs = queue.claim("telegram", 10, lease_seconds=60)
+    assert [job.message.content for job in jobs] == ["one", "two"]
+    assert jobs[0].job_id == first and jobs[0].attempts == 1
+    assert jobs[0].message.metadata == {"subject": "Hi"}
+    # Leased jobs are not handed out again until the lease runs out
+    assert queue.claim("telegram", 10) == []
+
+    queue.ack(jobs[0])
+    assert queue.snapshot()["depth"] == {"telegram": 1, "email": 1}
+
+
+def test_sqlite_queue_redelivers_expired_lease(queue):
+    queue.enqueue(_message())
+    assert len(queue.claim("telegram", 1, lease_seconds=0)) == 1
+    again = queue.claim("telegram", 1, lease_seconds=60)
+    assert len(again) == 1 and again[0].attempts == 2
+
+
+def test_sqlite_queue_survives_reopen(tmp_path):
+    path = str(tmp_path / "webhooks.db")
+    q = SQLiteQueue(path)
+    q.enqueue(_message(content="persisted"))
+    q.close()
+
+    reopened = SQLiteQueue(path)
+    assert [job.message.content for job in reopened.claim("telegram", 5)] == ["persisted"]
+    reopened.close()
+
+
+def test_sqlite_queue_dead_letters_and_requeue(queue):
+    queue.enqueue(_message())
+    job = queue.claim("telegram", 1)[0]
+    queue.dead_letter(job, "RuntimeError: boom")
+
+    assert queue.claim("telegram", 1) == []
+    letters = queue.dead_letters()
+    assert letters[0]["job_id"] == job.job_id and letters[0]["error"] == "RuntimeError: boom"
+    assert letters[0]["message"]["content"] == "hello"
+    assert queue.snapshot()["dead_letters"] == 1
+
+    assert queue.requeue_dead(job.job_id)
+    assert not queue.requeue_dead(job.job_id)
+    assert queue.claim("telegram", 1)[0].attempts == 1
+
+
+def test_create_queue_falls_back_to_sqlite(tmp_path):
+    q = create_queue("auto", redis_url=None, path=str(tmp_path / "fallback.db"))
+    assert q.name == "sqlite"
+    q.close()
+
+
+def test_channel_limits_and_retry_delay():
+    assert parse_channel_limits("email=2, telegram=8,bogus,x=") == {"email": 2, "telegram": 8}
+    assert [retry_delay(n, base=2, cap=10) for n in (1, 2, 3, 4)] == [2, 4, 8, 10]
+
+
+def _run_pool(pool, messages, until):
+    async def scenario():
+        await pool.start()
+        for message in messages:
+            await pool.submit(message)
+        for _ in range(200):
+            if until():
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+
+def test_pool_processes_jobs_within_channel_limit(queue):
+    active = {"now": 0, "max": 0}
+    answered = []
+
+    async def handler(message):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        answered.append(message.content)
+
+    pool = WebhookWorkerPool(queue, workers=8, channel_concurrency=2, channel_limits={}, poll_interval_ms=10)
+    pool.register("telegram", handler)
+    _run_pool(pool, [_message(sender=str(i), content=str(i)) for i in range(6)], lambda: len(answered) == 6)
+
+    assert sorted(answered) == [str(i) for i in range(6)]
+    assert active["max"] == 2
+    assert pool.snapshot()["processed"] == 6
+    assert queue.snapshot()["depth"] == {}
+
+
+def test_pool_retries_then_dead_letters(queue, monkeypatch):
+    monkeypatch.setattr("channels.workers.retry_delay", lambda attempts: 0)
+    calls = []
+
+    async def handler(message):
+        calls.append(message.content)
+        if message.content == "bad" or len(calls) == 1:
+            raise RuntimeError("downstream unavailable")
+
+    pool = WebhookWorkerPool(queue, max_attempts=3, channel_limits={}, poll_interval_ms=10)
+    pool.register("telegram", handler)
+    _run_pool(pool, [_message(content="flaky"), _message(content="bad")], lambda: pool.dead_lettered == 1 and pool.processed == 1)
+
+    assert calls.count("flaky") == 2
+    assert calls.count("bad") == 3
+    snapshot = pool.snapshot()
+    assert snapshot["retried"] == 3 and snapshot["dead_lettered"] == 1
+    assert [letter["message"]["content"] for letter in queue.dead_letters()] == ["bad"]
@@ -1,12 +1,91 @@
+import { useEffect, useState } from "react";
 import { TrendingUp } from "lucide-react";
+import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
+import { analyticsAPI, type BotAnalytics } from "@/lib/api";
+
+interface AnalyticsProps {
+  botId?: string;
+}
+
+const formatRate = (rate: number | null) => (rate === null ? "—" : `${(rate * 100).toFixed(1)}%`);
+const formatMs = (ms: number | null) => (ms === null ? "—" : `≤ ${ms} ms`);
+
+export const Analytics = ({ botId }: AnalyticsProps) => {
+  const [analytics, setAnalytics] = useState<BotAnalytics | null>(null);
+
+  useEffect(() => {
+    if (!botId) return;
+    analyticsAPI
+      .getBotAnalytics(parseInt(botId), "day")
+      .then(setAnalytics)
+      .catch((error) => console.error("Failed to load analytics:", error));
+  }, [botId]);
+
+  if (!analytics || analytics.series.length === 0) {
+    return (
+      <div className="text-gray-400 text-center py-12">
+        <div className="mb-4">
+          <TrendingUp className="h-12 w-12 mx-auto text-gray-500" />
+        </div>
+        <p>{analytics ? "No activity in the last 30 days" : "Loading analytics..."}</p>
+      </div>
+    );
+  }
+
+  const { totals } = analytics;
+  const stats = [
+    { label: "Messages", value: totals.messages.toString() },
+    { label: "Answers", value: totals.answers.toString() },
+    { label: "Cache hit rate", value: formatRate(totals.cache_hit_rate) },
+    { label: "Escalation rate", value: formatRate(totals.escalation_rate) },
+    { label: "Latency p50", value: formatMs(totals.latency_p50_ms) },
+    { label: "Latency p95", value: formatMs(totals.latency_p95_ms) },
+  ];
 
-export const Analytics = () => {
   return (
-    <div className="text-gray-400 text-center py-12">
-      <div className="mb-4">
-        <TrendingUp className="h-12 w-12 mx-auto text-gray-500" />
+    <div className="space-y-6">
+      <div className="grid grid-cols-2 md:grid-cols-3 gap-4">
+        {stats.map((stat) => (
+          <Card key={stat.label} style={{ backgroundColor: 'hsl(230, 5%, 15%)' }} className="border-none">
+            <CardHeader className="pb-2">
+              <CardTitle className="text-gray-400 text-sm font-normal">{stat.label}</CardTitle>
+            </CardHeader>
+            <CardContent>
+              <p className="text-white text-2xl font-semibold">{stat.value}</p>
+            </CardContent>
+          </Card>
+        ))}
       </div>
-      <p>Analytics content will be displayed here</p>
+
+      <Card style={{ backgroundColor: 'hsl(230, 5%, 15%)' }} className="border-none">
+        <CardHeader>
+          <CardTitle className="text-white">Channel mix</CardTitle>
+        </CardHeader>
+        <CardContent className="space-y-2">
+          {Object.entries(totals.channels).map(([channel, count]) => (
+            <div key={channel} className="flex justify-between text-sm">
+              <span className="text-gray-400 capitalize">{channel}</span>
+              <span className="text-white">{count}</span>
+            </div>
+          ))}
+        </CardContent>
+      </Card>
+
+      <Card style={{ backgroundColor: 'hsl(230, 5%, 15%)' }} className="border-none">
+        <CardHeader>
+          <CardTitle className="text-white">Daily activity</CardTitle>
+        </CardHeader>
+        <CardContent className="space-y-2">
+          {analytics.series.map((bucket) => (
+            <div key={bucket.bucket_start} className="flex justify-between text-sm">
+              <span className="text-gray-400">{new Date(bucket.bucket_start).toLocaleDateString()}</span>
+              <span className="text-white">
+                {bucket.messages} messages · {bucket.users} users
+              </span>
+            </div>
+          ))}
+        </CardContent>
+      </Card>
     </div>
   );
 };
@@ -8,7 +8,7 @@ import { Badge } from "@/components/ui/badge"
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs"
 import { Plus, MessageSquare, Clock, Ticket, CheckCircle, AlertCircle, Phone, Mail, MessageCircle, Globe, Send, Camera, MessagesSquare } from "lucide-react"
 import { useAuth } from "@/hooks/use-auth.ts"
-import { apiFetch } from "@/lib/api"
+import { apiFetch, apiFetchAll } from "@/lib/api"
 
 // Channel utility functions
 const getChannelIcon = (channel?: string) => {
@@ -119,7 +119,7 @@ export function ConversationSidebar({
       try {
         setLoading(true)
         console.log("Fetching conversations...")
-        const data = await apiFetch<Conversation[]>("/users/conversations", {}, token)
+        const data = await apiFetchAll<Conversation>("/users/conversations", token)
         console.log("Conversations data received:", data)
         console.log("Number of conversations:", data?.length || 0)
         setConversations(data)
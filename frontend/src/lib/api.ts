@@ -63,6 +63,55 @@ interface UserResponse {
   name?: string;
 }
 
+interface AnalyticsSummary {
+  messages: number;
+  answers: number;
+  channels: Record<string, number>;
+  cache_hit_rate: number | null;
+  escalations: number;
+  escalation_rate: number | null;
+  latency_p50_ms: number | null;
+  latency_p95_ms: number | null;
+}
+
+interface AnalyticsBucket extends AnalyticsSummary {
+  bucket_start: string;
+  users: number;
+}
+
+interface BotAnalytics {
+  bot_id: number;
+  granularity: 'hour' | 'day';
+  since: string;
+  until: string;
+  totals: AnalyticsSummary;
+  series: AnalyticsBucket[];
+}
+
+// Keyset pagination: the cursor for the next page comes back in this header
+const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+// Largest page the backend serves (adminbackend/pagination.py MAX_PAGE_SIZE)
+const MAX_PAGE_SIZE = 200;
+
+interface PageParams {
+  cursor?: string | null;
+  limit?: number;
+}
+
+interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+const withPageParams = (endpoint: string, page: PageParams = {}): string => {
+  const params = new URLSearchParams();
+  if (page.cursor) params.set('cursor', page.cursor);
+  if (page.limit) params.set('limit', String(page.limit));
+  const query = params.toString();
+  if (!query) return endpoint;
+  return `${endpoint}${endpoint.includes('?') ? '&' : '?'}${query}`;
+};
+
 // Token management
 export const tokenManager = {
   getToken: (): string | null => {
@@ -118,6 +167,44 @@ const apiRequest = async <T>(
   return response.json();
 };
 
+// Paged API request helper
+const apiRequestPage = async <T>(
+  endpoint: string,
+  page: PageParams = {},
+  authToken?: string
+): Promise<Page<T>> => {
+  const token = authToken || tokenManager.getToken();
+
+  const response = await fetch(`${API_BASE_URL}${withPageParams(endpoint, page)}`, {
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token && { Authorization: `Bearer ${token}` }),
+    },
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
+    throw new Error(errorData.detail || `HTTP ${response.status}`);
+  }
+
+  return {
+    items: await response.json(),
+    nextCursor: response.headers.get(NEXT_CURSOR_HEADER),
+  };
+};
+
+// Fetch every page of a paginated listing, following X-Next-Cursor until it is absent
+const apiRequestAll = async <T>(endpoint: string, authToken?: string): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const page: Page<T> = await apiRequestPage<T>(endpoint, { cursor, limit: MAX_PAGE_SIZE }, authToken);
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return items;
+};
+
 // Auth API
 export const authAPI = {
   // Admin login
@@ -191,6 +278,16 @@ export const userAPI = {
   getCurrentUser: async (): Promise<{ email: string }> => {
     return apiRequest<{ email: string }>('/users/me');
   },
+
+  // Get the current user's bots, one page at a time
+  getUserBots: async (page: PageParams = {}): Promise<Page<Bot>> => {
+    return apiRequestPage<Bot>('/users/me/bots', page);
+  },
+
+  // Get the current user's conversations, newest first
+  getConversations: async (page: PageParams = {}): Promise<Page<ConversationResponse>> => {
+    return apiRequestPage<ConversationResponse>('/users/conversations', page);
+  },
 };
 
 // Bots API
@@ -228,7 +325,7 @@ export const conversationsAPI = {
 
   // Get users by channel for a bot
   getBotUsersByChannel: async (botId: number, channelName: string): Promise<UserResponse[]> => {
-    return apiRequest<UserResponse[]>(`/admin/bots/${botId}/channels/${channelName}/users`);
+    return apiRequestAll<UserResponse>(`/admin/bots/${botId}/channels/${channelName}/users`);
   },
 
   // Get conversations for specific user and channel
@@ -237,14 +334,22 @@ export const conversationsAPI = {
     channelName: string, 
     userId: number
   ): Promise<ConversationResponse[]> => {
-    return apiRequest<ConversationResponse[]>(
+    return apiRequestAll<ConversationResponse>(
       `/admin/bots/${botId}/channels/${channelName}/users/${userId}/conversations`
     );
   },
 
   // Get all conversations for a bot (NEW)
   getBotAllConversations: async (botId: number): Promise<ConversationResponse[]> => {
-    return apiRequest<ConversationResponse[]>(`/admin/bots/${botId}/conversations`);
+    return apiRequestAll<ConversationResponse>(`/admin/bots/${botId}/conversations`);
+  },
+
+  // Get a page of conversations for a bot, newest first
+  getBotConversationsPage: async (
+    botId: number,
+    page: PageParams = {}
+  ): Promise<Page<ConversationResponse>> => {
+    return apiRequestPage<ConversationResponse>(`/admin/bots/${botId}/conversations`, page);
   },
 
   // Get user details (NEW)
@@ -259,7 +364,16 @@ export const conversationsAPI = {
 
   // Get users by date for a bot
   getBotUsersByDate: async (botId: number, date: string): Promise<UserResponse[]> => {
-    return apiRequest<UserResponse[]>(`/admin/bots/${botId}/inbox/users?date=${date}`);
+    return apiRequestAll<UserResponse>(`/admin/bots/${botId}/inbox/users?date=${date}`);
+  },
+
+  // Get a page of users by date for a bot
+  getBotUsersByDatePage: async (
+    botId: number,
+    date: string,
+    page: PageParams = {}
+  ): Promise<Page<UserResponse>> => {
+    return apiRequestPage<UserResponse>(`/admin/bots/${botId}/inbox/users?date=${date}`, page);
   },
 
   // Get conversations by user and date
@@ -268,10 +382,142 @@ export const conversationsAPI = {
     userId: number, 
     date: string
   ): Promise<ConversationResponse[]> => {
-    return apiRequest<ConversationResponse[]>(
+    return apiRequestAll<ConversationResponse>(
       `/admin/bots/${botId}/inbox/conversations?user_id=${userId}&date=${date}`
     );
   },
+
+  // Get a page of conversations by user and date
+  getBotUserConversationsByDatePage: async (
+    botId: number,
+    userId: number,
+    date: string,
+    page: PageParams = {}
+  ): Promise<Page<ConversationResponse>> => {
+    return apiRequestPage<ConversationResponse>(
+      `/admin/bots/${botId}/inbox/conversations?user_id=${userId}&date=${date}`,
+      page
+    );
+  },
+};
+
+// Analytics API
+export const analyticsAPI = {
+  // Hourly or daily aggregates for a bot
+  getBotAnalytics: async (
+    botId: number,
+    granularity: 'hour' | 'day' = 'day',
+    since?: string,
+    until?: string
+  ): Promise<BotAnalytics> => {
+    const params = new URLSearchParams({ granularity });
+    if (since) params.set('since', since);
+    if (until) params.set('until', until);
+    return apiRequest<BotAnalytics>(`/admin/bots/${botId}/analytics?${params.toString()}`);
+  },
+};
+
+// Export API
+interface ExportFilters {
+  since?: string;   // YYYY-MM-DD, inclusive
+  until?: string;   // YYYY-MM-DD, inclusive
+  channel?: string; // conversations only
+  tz?: string;
+}
+
+const downloadExport = async (
+  endpoint: string,
+  format: 'ndjson' | 'csv',
+  filters: ExportFilters
+): Promise<Blob> => {
+  const params = new URLSearchParams({ format });
+  Object.entries(filters).forEach(([key, value]) => {
+    if (value) params.set(key, value);
+  });
+  const token = tokenManager.getToken();
+  // The browser negotiates gzip and inflates the body transparently
+  const response = await fetch(`${API_BASE_URL}${endpoint}?${params.toString()}`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({ detail: 'Export failed' }));
+    throw new Error(errorData.detail || `HTTP ${response.status}`);
+  }
+
+  return response.blob();
+};
+
+export const exportAPI = {
+  // Stream a bot's conversations as NDJSON or CSV
+  exportConversations: async (
+    botId: number,
+    format: 'ndjson' | 'csv' = 'ndjson',
+    filters: ExportFilters = {}
+  ): Promise<Blob> => {
+    return downloadExport(`/admin/bots/${botId}/export/conversations`, format, filters);
+  },
+
+  // Stream a bot's tickets as NDJSON or CSV
+  exportTickets: async (
+    botId: number,
+    format: 'ndjson' | 'csv' = 'ndjson',
+    filters: ExportFilters = {}
+  ): Promise<Blob> => {
+    return downloadExport(`/admin/bots/${botId}/export/tickets`, format, filters);
+  },
+};
+
+// Search API
+interface SearchHit {
+  id: number;
+  user_id: number;
+  bot_id: number | null;
+  created_at: string;
+  score: number;
+  snippet: string;
+  // conversations
+  channel?: string;
+  source?: string;
+  turn_id?: string;
+  content?: string;
+  // tickets
+  topic?: string;
+  description?: string;
+  status?: string;
+}
+
+interface SearchFilters {
+  type?: 'conversations' | 'tickets';
+  botId?: number;
+  since?: string; // YYYY-MM-DD, inclusive
+  until?: string; // YYYY-MM-DD, inclusive
+  tz?: string;
+}
+
+export const searchAPI = {
+  // Ranked full-text search, best matches first
+  search: async (q: string, filters: SearchFilters = {}, page: PageParams = {}): Promise<Page<SearchHit>> => {
+    const params = new URLSearchParams({ q, type: filters.type ?? 'conversations' });
+    if (filters.botId) params.set('bot_id', String(filters.botId));
+    if (filters.since) params.set('since', filters.since);
+    if (filters.until) params.set('until', filters.until);
+    if (filters.tz) params.set('tz', filters.tz);
+    return apiRequestPage<SearchHit>(`/admin/search?${params.toString()}`, page);
+  },
+};
+
+// Tickets API
+export const ticketsAPI = {
+  // Get a page of all tickets, newest first
+  getTickets: async <T = unknown>(page: PageParams = {}): Promise<Page<T>> => {
+    return apiRequestPage<T>('/admin/tickets', page);
+  },
+
+  // Get a page of tickets for a bot, newest first
+  getBotTickets: async <T = unknown>(botId: number, page: PageParams = {}): Promise<Page<T>> => {
+    return apiRequestPage<T>(`/admin/bots/${botId}/tickets`, page);
+  },
 };
 
 // Generic API fetch function for backward compatibility
@@ -301,5 +547,10 @@ export const apiFetch = async <T>(
   return response.json();
 };
 
-export { API_BASE_URL };
-export type { AuthResponse, AdminInfo, Bot, SignupRequest, UserRegisterRequest, ConversationResponse, UserResponse };
+// Every item of a paginated listing (all pages), for callers of apiFetch
+export const apiFetchAll = async <T>(endpoint: string, token?: string): Promise<T[]> => {
+  return apiRequestAll<T>(endpoint, token);
+};
+
+export { API_BASE_URL, NEXT_CURSOR_HEADER };
+export type { AuthResponse, AdminInfo, Bot, SignupRequest, UserRegisterRequest, ConversationResponse, UserResponse, PageParams, Page, BotAnalytics, AnalyticsBucket, AnalyticsSummary, ExportFilters, SearchHit, SearchFilters };
@@ -255,7 +255,7 @@ const Bot = () => {
           {activeTab === "conversations" && <Conversations botId={id} />}
           {/* {activeTab === "marketing" && <Marketing />} */}
           {activeTab === "users" && <UsersComponent botId={id} />}
-          {activeTab === "analytics" && <Analytics />}
+          {activeTab === "analytics" && <Analytics botId={id} />}
           {activeTab === "builder" && <Builder botId={id} />}
           {activeTab === "configure" && <Configure />}
           {activeTab === "help" && <Help />}
@@ -2,7 +2,7 @@
 
 import { useEffect, useRef, useState } from "react"
 import { useAuth } from "@/hooks/use-auth.ts"
-import { apiFetch } from "@/lib/api"
+import { apiFetch, apiFetchAll } from "@/lib/api"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
 import { ScrollArea } from "@/components/ui/scroll-area"
@@ -59,7 +59,7 @@ export default function ChatPage() {
   const fetchAvailableBots = async () => {
     if (!token) return
     try {
-      const bots = await apiFetch<any[]>("/users/me/bots", {}, token)
+      const bots = await apiFetchAll<any>("/users/me/bots", token)
       setAvailableBots(bots)
       // Auto-select first bot if available
       if (bots.length > 0 && !selectedBotId) {
@@ -109,11 +109,7 @@ export default function ChatPage() {
     try {
       // Get the conversation data from the conversation sidebar's conversations list
       // Since each conversation contains one Q&A pair, we'll convert it to messages
-      const response = await apiFetch<any[]>(
-        `/users/conversations`,
-        {},
-        token || undefined
-      )
+      const response = await apiFetchAll<any>(`/users/conversations`, token || undefined)
       
       const selectedConversation = response.find((conv: any) => conv.id.toString() === conversationId)
       